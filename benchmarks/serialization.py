@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+)
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from models.base import Base  # noqa: E402
+from models.user import User  # noqa: E402
+from schemas import UserResponse  # noqa: E402
+from utilities import serialization  # noqa: E402
+from utilities.serialization import (  # noqa: E402
+    FastJSONResponse,
+    rows_to_dicts,
+)
+
+"""
+Compare the cost of building a users list response per page size.
+
+`response_model` is the default FastAPI path: ORM objects are loaded,
+validated against `List[UserResponse]` (running the email validator on every
+row) and encoded with the standard JSON encoder. `rows` is the path used by
+the list endpoint: plain row tuples are turned into dicts and encoded with
+`utilities.serialization.dumps`, measured with and without orjson.
+
+Rows come from an in-memory SQLite database, so no server is needed and the
+numbers isolate Python-side costs.
+
+Usage:
+    python3 benchmarks/serialization.py --sizes 10,100,1000,5000
+"""
+
+FIELDS = tuple(UserResponse.model_fields)
+RESPONSE_FIELD = create_model_field(name="response", type_=List[UserResponse])
+LOOP = asyncio.new_event_loop()
+
+
+def response_model_path(session: Session, limit: int) -> bytes:
+    users = session.scalars(select(User).order_by(User.id).limit(limit)).all()
+    content = LOOP.run_until_complete(
+        serialize_response(
+            field=RESPONSE_FIELD, response_content=users, is_coroutine=True
+        )
+    )
+    session.expunge_all()
+    return JSONResponse(content).body
+
+
+def rows_path(session: Session, limit: int) -> bytes:
+    columns = (User.__table__.c[name] for name in FIELDS)
+    rows = session.execute(
+        select(*columns).order_by(User.id).limit(limit)
+    ).all()
+    return FastJSONResponse(rows_to_dicts(rows)).body
+
+
+@compiles(CreateColumn, "sqlite")
+def skip_computed_columns(element: CreateColumn, compiler, **kw):
+    """
+    Leave out generated columns, such as the full-text search vector, which
+    SQLite cannot compute; none of the measured paths read them.
+    """
+    if element.element.computed is not None:
+        return None
+    return compiler.visit_create_column(element, **kw)
+
+
+@compiles(CreateIndex, "sqlite")
+def skip_computed_indexes(element: CreateIndex, compiler, **kw):
+    """
+    Leave out indexes on generated columns, which are not created.
+    """
+    if any(column.computed is not None for column in element.element.columns):
+        return ""
+    return compiler.visit_create_index(element, **kw)
+
+
+def measure(
+    function: Callable[[Session, int], bytes],
+    session: Session,
+    limit: int,
+    repeat: int,
+) -> float:
+    """
+    Return the median time of one call in milliseconds.
+    """
+    function(session, limit)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(session, limit)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark users list serialization per page size."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[10, 100, 1000, 5000],
+    )
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {
+                    "name": f"User {i}",
+                    "email": f"user{i}@example.com",
+                    "phone": f"(555) {i:07d}",
+                    "note": f"note {i}",
+                }
+                for i in range(max(args.sizes))
+            ],
+        )
+
+    orjson = serialization.orjson
+    variants: Dict[str, Callable[[Session, int], bytes]] = {
+        "response_model": response_model_path,
+        "rows+json": rows_path,
+    }
+    if orjson is not None:
+        variants["rows+orjson"] = rows_path
+
+    print(f"{'page size':>10}" + "".join(f"{name:>16}" for name in variants))
+    with Session(engine) as session:
+        for size in args.sizes:
+            results = {}
+            for name, function in variants.items():
+                serialization.orjson = orjson if "orjson" in name else None
+                results[name] = measure(function, session, size, args.repeat)
+            serialization.orjson = orjson
+            baseline = results["response_model"]
+            print(
+                f"{size:>10}"
+                + "".join(
+                    f"{f'{ms:.2f} ms x{baseline / ms:.1f}':>16}"
+                    for ms in results.values()
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
-import pandas as pd
 import csv
 
-xlsx_file = "userdata.xlsx"
+from openpyxl import load_workbook
 
-df = pd.read_excel(xlsx_file)
+xlsx_file = "userdata.xlsx"
 csv_file = "userdata.csv"
 
-df.to_csv(csv_file, index=False, quoting=csv.QUOTE_MINIMAL)
-
-with open(csv_file, "r") as file:
-    data = file.read()
+workbook = load_workbook(xlsx_file, read_only=True, data_only=True)
 
-data = data.replace('"', "")
+with open(csv_file, "w", newline="") as file:
+    writer = csv.writer(file, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    for row in workbook.active.iter_rows(values_only=True):
+        if len(row) == 1 and isinstance(row[0], str):
+            # the row is a whole CSV line stored in a single cell
+            file.write(row[0] + "\n")
+        else:
+            writer.writerow(row)
 
-with open(csv_file, "w") as file:
-    file.write(data)
+workbook.close()
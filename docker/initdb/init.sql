@@ -3,7 +3,23 @@ CREATE TABLE IF NOT EXISTS "user" (
     name VARCHAR(255),
     email VARCHAR(255),
     phone VARCHAR(255),
-    note VARCHAR(255)
+    note VARCHAR(255),
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    -- filled in by the database, also for rows loaded with COPY
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(note, '')), 'B')
+    ) STORED,
+    -- digest of the data fields, compared by reconciliation
+    content_hash BYTEA GENERATED ALWAYS AS (
+        decode(md5(
+            coalesce('+' || name, '-') || chr(31) ||
+            coalesce('+' || email, '-') || chr(31) ||
+            coalesce('+' || phone, '-') || chr(31) ||
+            coalesce('+' || note, '-')
+        ), 'hex')
+    ) STORED
 );
 
 COPY "user" (id, name, email, phone, note)
@@ -11,3 +27,74 @@ FROM '/docker-entrypoint-initdb.d/userdata.csv'
 DELIMITER ','
 CSV HEADER;
 SELECT setval('user_id_seq', (SELECT MAX(id) FROM "user"));
+
+CREATE INDEX IF NOT EXISTS ix_user_name_id ON "user" (name, id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_user_email_lower ON "user" (lower(email));
+CREATE INDEX IF NOT EXISTS ix_user_phone ON "user" (phone);
+CREATE INDEX IF NOT EXISTS ix_user_id_version ON "user" (id, version);
+CREATE INDEX IF NOT EXISTS ix_user_name_pattern ON "user" (name text_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_user_search_vector ON "user" USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS ix_user_id_content_hash ON "user" (id) INCLUDE (content_hash);
+
+CREATE TABLE IF NOT EXISTS job (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(64) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    params JSONB NOT NULL,
+    checkpoint JSONB NOT NULL DEFAULT '{}',
+    report JSONB NOT NULL DEFAULT '{}',
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT false,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker VARCHAR(255),
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_job_active ON job (id) WHERE status IN ('queued', 'running');
+
+CREATE TABLE IF NOT EXISTS user_change (
+    id BIGSERIAL PRIMARY KEY,
+    -- assigned once every earlier transaction has ended, see crud/user_change.py
+    seq BIGINT UNIQUE,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    op VARCHAR(16) NOT NULL,
+    user_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_user_change_unsequenced ON user_change (id) WHERE seq IS NULL;
+CREATE INDEX IF NOT EXISTS ix_user_change_changed_at ON user_change USING brin (changed_at);
+
+-- one set-based insert and one notification per statement, also for COPY
+CREATE OR REPLACE FUNCTION log_user_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO user_change (op, user_id, version)
+        SELECT 'remove', id, version FROM old_rows;
+    ELSE
+        INSERT INTO user_change (op, user_id, version)
+        SELECT CASE TG_OP WHEN 'INSERT' THEN 'create' ELSE 'update' END,
+               id, version
+        FROM new_rows;
+    END IF;
+    PERFORM pg_notify('user_change', '');
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER user_change_insert AFTER INSERT ON "user"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION log_user_change();
+CREATE OR REPLACE TRIGGER user_change_update AFTER UPDATE ON "user"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION log_user_change();
+CREATE OR REPLACE TRIGGER user_change_delete AFTER DELETE ON "user"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION log_user_change();
@@ -0,0 +1,361 @@
+from typing import Callable, Iterable, List
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
+
+from configs import app_settings
+from crud import crud_user
+from databases import (
+    count_round_trips,
+    get_pool_stats,
+    get_profiler,
+    profile_queries,
+)
+from utilities.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Metric,
+    MetricsMiddleware,
+    Registry,
+)
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by method, route template and status code.",
+        ("method", "route", "status"),
+    )
+)
+http_latency = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by method and route template.",
+        ("method", "route"),
+        buckets=app_settings.METRICS_LATENCY_BUCKETS,
+    )
+)
+http_response_size = registry.register(
+    Histogram(
+        "http_response_size_bytes",
+        "HTTP response body size by method and route template.",
+        ("method", "route"),
+        buckets=(100, 1000, 10_000, 100_000, 1_000_000, 10_000_000),
+    )
+)
+http_in_progress = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "HTTP requests being served, by method.",
+        ("method",),
+    )
+)
+
+db_round_trips = registry.register(
+    Counter(
+        "db_round_trips_total",
+        "Database round trips by method, route template and kind "
+        "(statement, prepare, transaction).",
+        ("method", "route", "kind"),
+    )
+)
+db_round_trips_per_request = registry.register(
+    Histogram(
+        "db_round_trips_per_request",
+        "Database round trips made by one request, by method and route "
+        "template.",
+        ("method", "route"),
+        buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21),
+    )
+)
+
+db_queries_per_request = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements run by one request, by method and route template; "
+        "recorded when the profiler is enabled.",
+        ("method", "route"),
+        buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55),
+    )
+)
+db_query_seconds_per_request = registry.register(
+    Histogram(
+        "db_query_seconds_per_request",
+        "Time one request spent running SQL statements, by method and route "
+        "template; recorded when the profiler is enabled.",
+        ("method", "route"),
+        buckets=app_settings.METRICS_LATENCY_BUCKETS,
+    )
+)
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get(
+    path="/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+async def read_metrics():
+    """
+    Serve the metrics of this worker in Prometheus text format.
+    """
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def collect_pool() -> Iterable[Metric]:
+    """
+    Build gauges and counters from the connection pool statistics.
+    """
+    stats = get_pool_stats()
+    metrics: List[Metric] = []
+    for key, name, kind, documentation in (
+        ("pool_size", "db_pool_size", Gauge, "Connections kept open."),
+        ("checked_out", "db_pool_checked_out", Gauge, "Connections in use."),
+        ("idle", "db_pool_idle", Gauge, "Open connections in the pool."),
+        ("overflow", "db_pool_overflow", Gauge, "Connections beyond size."),
+        ("checkouts", "db_pool_checkouts_total", Counter, "Checkouts."),
+        ("timeouts", "db_pool_timeouts_total", Counter, "Checkout timeouts."),
+        (
+            "wait_seconds_total",
+            "db_pool_wait_seconds_total",
+            Counter,
+            "Time spent waiting for a connection.",
+        ),
+    ):
+        metric = kind(name, documentation)
+        if kind is Counter:
+            metric.inc(amount=stats[key])
+        else:
+            metric.set(stats[key])
+        metrics.append(metric)
+    return metrics
+
+
+def collect_cache() -> Iterable[Metric]:
+    """
+    Build counters and a size gauge from the user cache statistics.
+    """
+    if crud_user.cache is None:
+        return []
+    stats = crud_user.cache.stats()
+    metrics: List[Metric] = []
+    for key in ("hits", "misses", "evictions", "expirations"):
+        counter = Counter(
+            f"cache_{key}_total", f"Cache {key} by model.", ("model",)
+        )
+        counter.inc(("User",), stats[key])
+        metrics.append(counter)
+    size = Gauge("cache_size", "Entries in the cache by model.", ("model",))
+    size.set(stats["size"], ("User",))
+    metrics.append(size)
+    return metrics
+
+
+def collect_loaders() -> Iterable[Metric]:
+    """
+    Build counters from the statistics of the batched user reads by ID.
+    """
+    metrics: List[Metric] = []
+    for key, name, documentation in (
+        ("loads", "read_batch_loads_total", "Reads by ID requested."),
+        (
+            "shared",
+            "read_batch_shared_total",
+            "Reads by ID answered by a read already queued or running.",
+        ),
+        ("batches", "read_batches_total", "Batched queries sent."),
+        ("keys", "read_batch_keys_total", "IDs read by batched queries."),
+    ):
+        counter = Counter(name, documentation, ("model",))
+        counter.inc(
+            ("User",),
+            sum(
+                getattr(loader.stats, key)
+                for loader in crud_user.loaders.values()
+            ),
+        )
+        metrics.append(counter)
+    return metrics
+
+
+def collect_writers() -> Iterable[Metric]:
+    """
+    Build counters from the statistics of the batched user creates.
+    """
+    metrics: List[Metric] = []
+    for key, name, documentation in (
+        ("writes", "write_batch_writes_total", "Creates requested."),
+        ("batches", "write_batches_total", "Batched INSERTs sent."),
+        (
+            "failed",
+            "write_batch_failed_total",
+            "Creates rejected on their own within a batch.",
+        ),
+    ):
+        counter = Counter(name, documentation, ("model",))
+        counter.inc(
+            ("User",),
+            sum(
+                getattr(writer.stats, key)
+                for writer in crud_user.writers.values()
+            ),
+        )
+        metrics.append(counter)
+    return metrics
+
+
+def collect_profiler() -> Iterable[Metric]:
+    """
+    Build counters from the statistics of the statement profiler.
+    """
+    if not app_settings.PROFILER_ENABLED:
+        return []
+    stats = get_profiler().stats
+    slow = Counter(
+        "db_slow_queries_total",
+        "SQL statements slower than the threshold, by method and route "
+        "template.",
+        ("method", "route"),
+    )
+    for labels, value in stats.slow.items():
+        slow.inc(labels, value)
+    explained = Counter(
+        "db_explained_queries_total",
+        "Slow SQL statements explained, by method and route template.",
+        ("method", "route"),
+    )
+    for labels, value in stats.explained.items():
+        explained.inc(labels, value)
+    seq_scans = Counter(
+        "db_seq_scans_total",
+        "Sequential scans in the plans of explained statements, by method, "
+        "route template and table.",
+        ("method", "route", "table"),
+    )
+    for labels, value in stats.seq_scans.items():
+        seq_scans.inc(labels, value)
+    return [slow, explained, seq_scans]
+
+
+registry.add_collector(collect_pool)
+registry.add_collector(collect_cache)
+registry.add_collector(collect_loaders)
+registry.add_collector(collect_writers)
+registry.add_collector(collect_profiler)
+
+
+class RoundTripMiddleware:
+    """
+    ASGI middleware counting the database round trips of every request.
+
+    The total is sent in the `X-DB-Round-Trips` response header and recorded
+    per route; work that finishes after the response has started, such as
+    a streamed body, is recorded but not in the header.
+    """
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_round_trips() as trips:
+
+            async def send_wrapper(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-round-trips", str(trips.total).encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                path = getattr(route, "path", None) or "unmatched"
+                method = scope["method"]
+                for kind, value in (
+                    ("statement", trips.statements),
+                    ("prepare", trips.prepares),
+                    ("transaction", trips.transactions),
+                ):
+                    if value:
+                        db_round_trips.inc((method, path, kind), value)
+                db_round_trips_per_request.observe(trips.total, (method, path))
+
+
+class QueryProfileMiddleware:
+    """
+    ASGI middleware profiling the SQL statements of every request.
+
+    The statements and the time spent in them are sent in a `Server-Timing`
+    response header, which browser developer tools display, and recorded
+    per route; slow statements are logged with the route they ran for.
+    """
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries(scope) as profile:
+
+            async def send_wrapper(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    timing = (
+                        f"db;dur={profile.seconds * 1000:.1f};"
+                        f'desc="{profile.statements} queries"'
+                    )
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", timing.encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                labels = profile.labels
+                db_queries_per_request.observe(profile.statements, labels)
+                db_query_seconds_per_request.observe(profile.seconds, labels)
+
+
+def profile(app: FastAPI) -> None:
+    """
+    Profile the SQL statements of every request of an application.
+
+    Args:
+        app (FastAPI): The application to profile.
+    """
+    app.add_middleware(QueryProfileMiddleware)
+
+
+def instrument(app: FastAPI) -> None:
+    """
+    Record request metrics and database round trips for an application
+    and serve them on /metrics.
+
+    Args:
+        app (FastAPI): The application to instrument.
+    """
+    app.add_middleware(
+        MetricsMiddleware,
+        requests=http_requests,
+        latency=http_latency,
+        response_size=http_response_size,
+        in_progress=http_in_progress,
+    )
+    app.add_middleware(RoundTripMiddleware)
+    app.include_router(metrics_router)
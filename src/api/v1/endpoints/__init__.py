@@ -1,3 +1,9 @@
+from .jobs import router as jobs_router
+from .system import router as system_router
 from .users import router as users_router
 
-__all__ = ("users_router",)
+__all__ = (
+    "jobs_router",
+    "system_router",
+    "users_router",
+)
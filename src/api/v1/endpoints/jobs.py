@@ -0,0 +1,208 @@
+import os
+from tempfile import NamedTemporaryFile
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configs import app_settings
+from crud import crud_job
+from databases import get_async_session
+from jobs import job_runner
+from models.job import Job
+from schemas import (
+    JobKind,
+    JobResponse,
+    UserImportFormat,
+    UserUpdateJobCreate,
+)
+from utilities.exceptions import JobNotFound
+
+router = APIRouter()
+
+
+@router.post(
+    path="/",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    summary="Submit a mass update of users",
+    description=(
+        "Queues a job that sets the given fields on every user matching the "
+        "filters, in chunks of `JOBS_CHUNK_SIZE` users. The response points "
+        "to the job in its `Location` header; poll it for progress."
+    ),
+)
+async def create_job(
+    job_data: UserUpdateJobCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Submit a mass update of users.
+
+    Args:
+        job_data (UserUpdateJobCreate): The filters and the changes.
+        response (Response): The response, to set `Location` on.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        JobResponse: The queued job.
+    """
+    job = await crud_job.enqueue(
+        db=db,
+        kind=job_data.kind.value,
+        params={
+            "filters": job_data.filters.model_dump(exclude_none=True),
+            "changes": job_data.changes.model_dump(exclude_unset=True),
+        },
+    )
+    return _accepted(job, response)
+
+
+@router.post(
+    path="/import/",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    summary="Submit an import of users from a file",
+    description=(
+        "Stores a CSV or XLSX file sent as the raw request body and queues a "
+        "job that imports it like `POST /v1/users/import/`, committing every "
+        "chunk of `IMPORT_CHUNK_SIZE` rows as it goes."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string", "format": "binary"}},
+                (
+                    "application/vnd.openxmlformats-officedocument."
+                    "spreadsheetml.sheet"
+                ): {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def create_import_job(
+    request: Request,
+    response: Response,
+    import_format: UserImportFormat = Query(
+        UserImportFormat.csv, alias="format"
+    ),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Submit an import of users from a file.
+
+    The file is written to `JOBS_DIR`, where it stays until the job ends,
+    so a resumed job reads it again.
+
+    Args:
+        request (Request): The incoming request carrying the file.
+        response (Response): The response, to set `Location` on.
+        import_format (UserImportFormat): The file format, `csv` or `xlsx`.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        JobResponse: The queued job.
+    """
+    os.makedirs(app_settings.JOBS_DIR, exist_ok=True)
+    with NamedTemporaryFile(
+        dir=app_settings.JOBS_DIR,
+        suffix=f".{import_format.value}",
+        delete=False,
+    ) as file:
+        try:
+            async for chunk in request.stream():
+                file.write(chunk)
+        except BaseException:
+            os.remove(file.name)
+            raise
+    try:
+        job = await crud_job.enqueue(
+            db=db,
+            kind=JobKind.import_users.value,
+            params={"path": file.name, "format": import_format.value},
+        )
+    except BaseException:
+        os.remove(file.name)
+        raise
+    return _accepted(job, response)
+
+
+@router.get(
+    path="/{job_id}/",
+    status_code=status.HTTP_200_OK,
+    response_model=JobResponse,
+    summary="Retrieve a job",
+    description=(
+        "Returns the status, progress and report of a background job. "
+        "Progress is updated every time the job commits a chunk."
+    ),
+)
+async def read_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Fetch a background job.
+
+    Args:
+        job_id (int): The ID of the job.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        JobResponse: The job.
+
+    Raises:
+        JobNotFound: If no job has the ID.
+    """
+    job = await crud_job.read_by_id(db=db, obj_id=job_id)
+    if job is None:
+        raise JobNotFound(job_id=job_id)
+    return job
+
+
+@router.post(
+    path="/{job_id}/cancel/",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    summary="Cancel a job",
+    description=(
+        "Asks a job to stop. A running job stops after the chunk in "
+        "progress, whose work is kept; a job that has ended is returned "
+        "unchanged."
+    ),
+)
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Cancel a background job.
+
+    Args:
+        job_id (int): The ID of the job.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        JobResponse: The job, with `cancel_requested` set unless it had
+        ended already.
+
+    Raises:
+        JobNotFound: If no job has the ID.
+    """
+    job = await crud_job.request_cancel(db=db, job_id=job_id)
+    if job is None:
+        raise JobNotFound(job_id=job_id)
+    # a queued job is cancelled once picked up, so pick it up now
+    job_runner.wake()
+    return job
+
+
+def _accepted(job: Job, response: Response) -> Job:
+    """
+    Point the response of a submission to the new job and start looking
+    for it in this worker right away.
+    """
+    response.headers["Location"] = f"/v1/jobs/{job.id}/"
+    job_runner.wake()
+    return job
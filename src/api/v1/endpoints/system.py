@@ -0,0 +1,110 @@
+from typing import List
+
+from fastapi import APIRouter, status
+
+from databases import (
+    get_pool_stats,
+    get_replica_status,
+    get_slow_queries,
+    is_ready,
+)
+from schemas import (
+    PoolStatsResponse,
+    ReadinessResponse,
+    ReplicaStatusResponse,
+    SlowQueryResponse,
+)
+from utilities.exceptions import NotReady
+
+router = APIRouter()
+
+
+@router.get(
+    path="/pool/",
+    status_code=status.HTTP_200_OK,
+    response_model=PoolStatsResponse,
+    summary="Connection pool statistics",
+    description=(
+        "Returns the state of the database connection pool of the worker "
+        "that served the request, and how long checkouts have waited."
+    ),
+)
+async def read_pool_stats():
+    """
+    Fetch connection pool statistics.
+
+    Returns:
+        PoolStatsResponse: Connections checked out, idle and in overflow,
+        and checkout wait counters.
+    """
+    return get_pool_stats()
+
+
+@router.get(
+    path="/replicas/",
+    status_code=status.HTTP_200_OK,
+    response_model=List[ReplicaStatusResponse],
+    summary="Read replica status",
+    description=(
+        "Returns the health and connection pool of every read replica, as "
+        "seen by the worker that served the request."
+    ),
+)
+async def read_replica_status():
+    """
+    Fetch read replica status.
+
+    Returns:
+        List[ReplicaStatusResponse]: One entry per configured replica, empty
+        when reads are served by the primary only.
+    """
+    return get_replica_status()
+
+
+@router.get(
+    path="/slow-queries/",
+    status_code=status.HTTP_200_OK,
+    response_model=List[SlowQueryResponse],
+    summary="Recent slow queries",
+    description=(
+        "Returns the most recent SQL statements that took longer than "
+        "`PROFILER_SLOW_QUERY_SECONDS` in the worker that served the "
+        "request, newest first, with the route they ran for and, for the "
+        "sampled ones, their plan. Empty unless the profiler is enabled."
+    ),
+)
+async def read_slow_queries():
+    """
+    Fetch the recent slow queries.
+
+    Returns:
+        List[SlowQueryResponse]: The slow statements kept by the profiler.
+    """
+    return get_slow_queries()
+
+
+@router.get(
+    path="/ready/",
+    status_code=status.HTTP_200_OK,
+    response_model=ReadinessResponse,
+    summary="Readiness check",
+    description=(
+        "Returns 200 once the worker that served the request has opened its "
+        "database connections and prepared the hot queries, and 503 while "
+        "it is starting or shutting down. Point load balancer and "
+        "orchestrator readiness probes here."
+    ),
+)
+async def read_readiness():
+    """
+    Check whether the worker is ready to serve traffic.
+
+    Raises:
+        NotReady: If the worker is warming up or shutting down.
+
+    Returns:
+        ReadinessResponse: `ready` set to true.
+    """
+    if not is_ready():
+        raise NotReady()
+    return {"ready": True}
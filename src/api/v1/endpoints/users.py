@@ -1,44 +1,801 @@
-from typing import List, Optional
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
 
-from fastapi import APIRouter, Depends, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from crud import crud_user
-from databases import get_async_session
+from changes import change_feed
+from configs import app_settings
+from crud import crud_user, crud_user_change
+from crud.base import BatchResult
+from databases import (
+    async_session,
+    get_async_session,
+    get_read_only_session,
+    read_only_session,
+)
 from models.user import User
-from schemas import UserCreate, UserResponse, UserUpdate
-from utilities.exceptions import UserNotFound
+from schemas import (
+    BatchItemStatus,
+    UserBatchDelete,
+    UserBatchItemResult,
+    UserBatchResponse,
+    UserBatchUpdate,
+    UserCountMode,
+    UserCreate,
+    UserExportFormat,
+    UserImportError,
+    UserImportFormat,
+    UserImportResponse,
+    UserLookup,
+    UserLookupResponse,
+    UserOrderBy,
+    UserReconcileResponse,
+    UserResponse,
+    UserSearchResult,
+    UserUpdate,
+)
+from utilities.etags import (
+    fieldset_variant,
+    http_date,
+    match_versions,
+    none_match,
+    object_etag,
+    page_etag,
+    with_variant,
+)
+from utilities.exceptions import BatchTooLarge, ChangesExpired, UserNotFound
+from utilities.export import changes_to_events, rows_to_csv, rows_to_ndjson
+from utilities.serialization import (
+    FastJSONResponse,
+    object_to_dict,
+    rows_to_dicts,
+)
 
 router = APIRouter()
 
+# Columns of `UserResponse`, in the order its fields are serialized.
+USER_FIELDS: Tuple[str, ...] = tuple(UserResponse.model_fields)
+_FIELD_NAMES = "|".join(USER_FIELDS)
+
+
+def response_fields(
+    fields: Optional[str] = Query(
+        None,
+        pattern=rf"^({_FIELD_NAMES})(,({_FIELD_NAMES}))*$",
+        description=(
+            "Comma-separated fields to return, for example `id,email`; "
+            "all fields by default. Fields left out are not read from the "
+            "database."
+        ),
+    ),
+) -> Tuple[str, ...]:
+    """
+    Parse the `fields` parameter of the endpoints that read users.
+
+    Args:
+        fields (Optional[str]): The requested field names.
+
+    Returns:
+        Tuple[str, ...]: The requested fields in `UserResponse` order, or
+        all of them.
+    """
+    if fields is None:
+        return USER_FIELDS
+    wanted = set(fields.split(","))
+    return tuple(field for field in USER_FIELDS if field in wanted)
+
+
+async def prepare_statements(db: AsyncSession) -> None:
+    """
+    Prepare the statements of the hot user queries on one connection.
+
+    Covers reading, updating and deleting a user by ID, checking a version,
+    lookups of many users, and the first page of the list with and without
+    `If-None-Match`.
+
+    Args:
+        db (AsyncSession): A session bound to the connection to prepare.
+    """
+    await crud_user.prepare(db, page_columns=(USER_FIELDS, ("id", "version")))
+
 
 @router.get(
     path="/",
     response_model=List[UserResponse],
     status_code=status.HTTP_200_OK,
     summary="Retrieve all users",
-    description=("Fetches a list of all users stored in the database."),
+    description=(
+        "Fetches a page of users stored in the database, optionally "
+        "filtered by email, phone or name prefix. Pass the value of the "
+        "`X-Next-Cursor` response header as `after` to fetch the next page "
+        "with constant cost. `X-Has-More` tells whether there is a next "
+        "page; with `count`, `X-Total-Count` carries the number of matching "
+        "users, either exact (cached briefly) or estimated from table "
+        "statistics. Pages carry an ETag; send it back in `If-None-Match` "
+        "to get `304 Not Modified` if the page has not changed. `fields` "
+        "limits the fields returned and read."
+    ),
 )
 async def read_users_multi(
     limit: int = 100,
     offset: int = 0,
+    after: Optional[str] = None,
+    order_by: UserOrderBy = UserOrderBy.id,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    count: Optional[UserCountMode] = None,
+    fields: Tuple[str, ...] = Depends(response_fields),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_async_session),
 ):
     """
     Fetch all users.
 
-    This endpoint returns all users from the database.
+    This endpoint returns a page of users ordered by `order_by` and then by
+    ID. Every filter is served by an index. Page metadata is sent in
+    headers so the body stays a plain list:
+
+    - `X-Has-More`: `true` if another page follows. One extra row is read
+      to tell.
+    - `X-Next-Cursor` and `X-Next-Offset`: where the next page starts, if
+      there is one. The offset is only sent when paging by offset.
+    - `X-Total-Count` and `X-Total-Count-Exact`: the number of matching
+      users, only when `count` is given. An estimate is only used without
+      filters; filtered totals are always exact, since the filters are
+      selective and indexed.
+    - `ETag` and `Last-Modified`: validators of the page. With
+      `If-None-Match`, the IDs and versions of the page are read first and
+      the users themselves only if the page changed. `Last-Modified` is
+      only sent when `updated_at` is among the fields.
+
+    Rows are read as plain tuples and encoded directly, without building ORM
+    objects or running the response model validators. With `fields`, only
+    those columns are selected, plus the ID, the version and the sort key
+    that the ETag and the cursor are built from.
 
     Args:
         limit: Limit of users in response
-        offset: Offset in response
+        offset: Offset in response, ignored when `after` is given
+        after (Optional[str]): Cursor of the previous page.
+        order_by (UserOrderBy): Sort key of the page.
+        email (Optional[str]): Only users with this email, ignoring case.
+        phone (Optional[str]): Only users with this phone number.
+        name_prefix (Optional[str]): Only users whose name starts with this
+        prefix (case-sensitive).
+        count (Optional[UserCountMode]): Whether and how to report the
+        total.
+        fields (Tuple[str, ...]): The fields to return.
+        if_none_match (Optional[str]): ETags of the copies the client has.
         db (AsyncSession): The asynchronous session for database access.
 
     Returns:
         List[UserResponse]: A list of all users if found or empty list
         if not found.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or was issued for a
+        different sort order.
+    """
+    filters = crud_user.build_filters(
+        email=email, phone=phone, name_prefix=name_prefix
+    )
+    if if_none_match is not None:
+        versions = await crud_user.read_multi_rows(
+            db=db,
+            columns=("id", "version"),
+            limit=limit + 1,
+            offset=offset,
+            after=after,
+            order_by=order_by.value,
+            filters=filters,
+        )
+        etag = _fieldset_etag(
+            page_etag(versions[:limit], has_more=len(versions) > limit),
+            fields,
+        )
+        if not none_match(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag},
+            )
+
+    columns = fields + tuple(
+        name
+        for name in ("id", "version", order_by.value)
+        if name not in fields
+    )
+    rows = await crud_user.read_multi_rows(
+        db=db,
+        columns=columns,
+        limit=limit + 1,
+        offset=offset,
+        after=after,
+        order_by=order_by.value,
+        filters=filters,
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = FastJSONResponse(
+        rows_to_dicts(rows, None if columns == fields else fields)
+    )
+    response.headers["ETag"] = _fieldset_etag(
+        page_etag(((row.id, row.version) for row in rows), has_more), fields
+    )
+    if rows and "updated_at" in fields:
+        response.headers["Last-Modified"] = http_date(
+            max(row.updated_at for row in rows)
+        )
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if has_more and rows:
+        response.headers["X-Next-Cursor"] = crud_user.build_cursor(
+            obj=rows[-1], order_by=order_by.value
+        )
+        if after is None:
+            response.headers["X-Next-Offset"] = str(offset + limit)
+    if count is not None:
+        exact = count == UserCountMode.exact or bool(filters)
+        if exact:
+            total = await crud_user.count(
+                db=db, filters=filters, cache_key=(email, phone, name_prefix)
+            )
+        else:
+            total = await crud_user.estimate_count(db=db)
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Exact"] = "true" if exact else "false"
+    return response
+
+
+@router.get(
+    path="/export/",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Export all users",
+    description=(
+        "Streams every user as NDJSON or CSV. Rows are read from a "
+        "server-side cursor and sent in fixed-size chunks, so the download "
+        "starts right away and memory use stays flat."
+    ),
+)
+async def export_users(
+    export_format: UserExportFormat = Query(
+        UserExportFormat.ndjson, alias="format"
+    ),
+    fields: Tuple[str, ...] = Depends(response_fields),
+):
+    """
+    Export all users.
+
+    The response body is produced chunk by chunk while the query is still
+    running. The database session is owned by the stream itself, because it
+    has to outlive the request handler.
+
+    Args:
+        export_format (UserExportFormat): The output format, `ndjson` or
+        `csv`.
+        fields (Tuple[str, ...]): The columns to export, always in table
+        order.
+
+    Returns:
+        StreamingResponse: The users ordered by ID.
+    """
+    media_type = {
+        UserExportFormat.ndjson: "application/x-ndjson",
+        UserExportFormat.csv: "text/csv",
+    }[export_format]
+    return StreamingResponse(
+        _export_chunks(export_format, fields),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename=users.{export_format.value}"
+            )
+        },
+    )
+
+
+@router.get(
+    path="/changes/",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Follow changes to users",
+    description=(
+        "Streams every creation, update and removal of a user as a "
+        "server-sent event, in commit order, starting after the change "
+        "numbered `after` or, on reconnection, after `Last-Event-ID`. "
+        "Without either, the stream starts with the next change. `fields` "
+        "limits the fields of the users sent along."
+    ),
+)
+async def stream_changes(
+    after: Optional[int] = Query(
+        None, ge=0, description="Number of the last change already seen."
+    ),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    fields: Tuple[str, ...] = Depends(response_fields),
+):
+    """
+    Follow changes to users.
+
+    Changes are logged by the database for every write, including imports
+    and background jobs, and numbered in the order they became visible, so
+    a client that resumes after the last number it got misses none and
+    gets none twice. Changes are kept for `CHANGES_RETENTION` seconds.
+
+    The stream reads from the primary, where changes are numbered, and owns
+    its sessions, because it outlives the request handler.
+
+    Args:
+        after (Optional[int]): The number of the last change already seen.
+        last_event_id (Optional[int]): The same, sent by a reconnecting
+        `EventSource`; takes precedence over `after`.
+        fields (Tuple[str, ...]): The fields of the users to send.
+
+    Returns:
+        StreamingResponse: The events, sent until the client disconnects.
+
+    Raises:
+        ChangesExpired: If changes after `after` were deleted already.
     """
-    return await crud_user.read_multi(db=db, limit=limit, offset=offset)
+    if last_event_id is not None:
+        after = last_event_id
+    async with async_session() as db:
+        oldest, latest = await crud_user_change.bounds(db)
+    if after is None:
+        after = latest or 0
+    elif oldest is not None and after < oldest - 1:
+        raise ChangesExpired(after=after, oldest=oldest)
+    return StreamingResponse(
+        _change_events(after, fields),
+        media_type="text/event-stream",
+        # no caching, and no buffering by proxies such as nginx
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    path="/lookup/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserLookupResponse,
+    summary="Retrieve many users by ID",
+    description=(
+        "Returns the users with the given comma-separated IDs, in the order "
+        "given, read with a single query. IDs that no user has are listed "
+        "in `missing` instead of failing the request. At most "
+        "`LOOKUP_MAX_IDS` IDs may be given."
+    ),
+)
+async def lookup_users(
+    ids: str = Query(..., pattern=r"^\d+(,\d+)*$"),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Fetch many users by ID.
+
+    Args:
+        ids (str): Comma-separated user IDs.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserLookupResponse: The users found and the missing IDs.
+
+    Raises:
+        BatchTooLarge: If more than `LOOKUP_MAX_IDS` IDs are given.
+    """
+    return await _lookup(db, [int(user_id) for user_id in ids.split(",")])
+
+
+@router.post(
+    "/lookup/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserLookupResponse,
+    summary="Retrieve many users by ID",
+    description=(
+        "Same as `GET /users/lookup/`, with the IDs in the request body. "
+        "Nothing is written, so the lookup is served by a read replica when "
+        "there is one."
+    ),
+)
+async def lookup_users_by_body(
+    lookup: UserLookup,
+    db: AsyncSession = Depends(get_read_only_session),
+):
+    """
+    Fetch many users by ID given in the request body.
+
+    Args:
+        lookup (UserLookup): The IDs of the users.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserLookupResponse: The users found and the missing IDs.
+
+    Raises:
+        BatchTooLarge: If more than `LOOKUP_MAX_IDS` IDs are given.
+    """
+    return await _lookup(db, lookup.ids)
+
+
+@router.get(
+    path="/search/",
+    status_code=status.HTTP_200_OK,
+    response_model=List[UserSearchResult],
+    summary="Search users by name and note",
+    description=(
+        "Full-text search over user names and notes. `q` uses web search "
+        'syntax: words must all match, `"quoted phrases"` match in order, '
+        "`or` separates alternatives and `-word` excludes a word. Results "
+        "are ranked, names weighing more than notes, and paged by offset; "
+        "`X-Has-More` and `X-Next-Offset` tell whether and where the next "
+        "page starts. With `highlight`, matches in the name and note are "
+        "wrapped in `<mark>` tags."
+    ),
+)
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    highlight: bool = False,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Search users.
+
+    Args:
+        q (str): The search terms.
+        limit (int): Limit of users in response.
+        offset (int): Offset in the ranked results.
+        highlight (bool): Whether to return highlighted names and notes.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        List[UserSearchResult]: The best matching users, best first.
+    """
+    rows = await crud_user.search(
+        db=db,
+        query=q,
+        columns=USER_FIELDS,
+        limit=limit + 1,
+        offset=offset,
+        highlight=highlight,
+        max_candidates=app_settings.SEARCH_MAX_CANDIDATES,
+    )
+    has_more = len(rows) > limit
+    response = FastJSONResponse(rows_to_dicts(rows[:limit]))
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if has_more:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return response
+
+
+@router.post(
+    "/import/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserImportResponse,
+    summary="Import users from a file",
+    description=(
+        "Imports users from a CSV or XLSX file sent as the raw request body. "
+        "Rows are validated like the body of `create_user` and loaded with "
+        "binary COPY in one transaction; invalid rows are skipped and "
+        "reported. An `id` column, if present, is kept."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string", "format": "binary"}},
+                (
+                    "application/vnd.openxmlformats-officedocument."
+                    "spreadsheetml.sheet"
+                ): {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def import_users(
+    request: Request,
+    import_format: UserImportFormat = Query(
+        UserImportFormat.csv, alias="format"
+    ),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Import users from a CSV or XLSX file.
+
+    The request body is spooled to a temporary file (in memory up to
+    `IMPORT_SPOOL_MAX_MEMORY` bytes, on disk beyond that) and then read in
+    chunks, so the size of the file does not affect memory use.
+
+    Args:
+        request (Request): The incoming request carrying the file.
+        import_format (UserImportFormat): The file format, `csv` or `xlsx`.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserImportResponse: The number of imported and rejected rows.
+
+    Raises:
+        ImportFailed: If the file is malformed, lacks a required column or
+        the database rejects the data. Nothing is imported then.
+    """
+    with SpooledTemporaryFile(
+        max_size=app_settings.IMPORT_SPOOL_MAX_MEMORY
+    ) as file:
+        async for chunk in request.stream():
+            file.write(chunk)
+        file.seek(0)
+        report = await crud_user.import_file(
+            db=db,
+            file=file,
+            file_format=import_format.value,
+            chunk_size=app_settings.IMPORT_CHUNK_SIZE,
+            max_errors=app_settings.IMPORT_MAX_REPORTED_ERRORS,
+        )
+    return UserImportResponse(
+        imported=report.imported,
+        rejected=report.rejected,
+        errors=[
+            UserImportError(row=row, error=error)
+            for row, error in report.errors
+        ],
+    )
+
+
+@router.post(
+    "/reconcile/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserReconcileResponse,
+    summary="Reconcile users with a snapshot",
+    description=(
+        "Makes the users match a full snapshot sent as a CSV or XLSX file "
+        "in the raw request body, with an `id` column: users missing from "
+        "it are removed, changed ones updated and new ones created, in one "
+        "transaction. Unchanged users are not written at all. Rows that "
+        "fail validation are reported and their users left as they are. "
+        "With `dry_run`, the changes are only counted."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string", "format": "binary"}},
+                (
+                    "application/vnd.openxmlformats-officedocument."
+                    "spreadsheetml.sheet"
+                ): {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def reconcile_users(
+    request: Request,
+    import_format: UserImportFormat = Query(
+        UserImportFormat.csv, alias="format"
+    ),
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Reconcile users with a snapshot from a CSV or XLSX file.
+
+    The request body is spooled like an import's. Whether a user changed is
+    decided by comparing the digest of its snapshot row with the stored
+    `content_hash`, so a sync with little churn writes little.
+
+    Args:
+        request (Request): The incoming request carrying the file.
+        import_format (UserImportFormat): The file format, `csv` or `xlsx`.
+        dry_run (bool): Whether to only count the changes.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserReconcileResponse: The number of users of every kind of change.
+
+    Raises:
+        ImportFailed: If the file is malformed, lacks a required column,
+        has no valid row, repeats an ID or has a rejected row without a
+        valid ID, or if the database rejects the changes. Nothing is changed
+        then.
+    """
+    with SpooledTemporaryFile(
+        max_size=app_settings.IMPORT_SPOOL_MAX_MEMORY
+    ) as file:
+        async for chunk in request.stream():
+            file.write(chunk)
+        file.seek(0)
+        report = await crud_user.reconcile(
+            db=db,
+            file=file,
+            file_format=import_format.value,
+            chunk_size=app_settings.IMPORT_CHUNK_SIZE,
+            max_errors=app_settings.IMPORT_MAX_REPORTED_ERRORS,
+            dry_run=dry_run,
+        )
+    return UserReconcileResponse(
+        inserted=report.inserted,
+        updated=report.updated,
+        deleted=report.deleted,
+        unchanged=report.unchanged,
+        rejected=report.rejected,
+        errors=[
+            UserImportError(row=row, error=error)
+            for row, error in report.errors
+        ],
+        dry_run=dry_run,
+    )
+
+
+@router.post(
+    "/batch/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserBatchResponse,
+    summary="Create many users",
+    description=(
+        "Creates many users with one multi-row insert in one transaction. "
+        "Every item is reported separately, so invalid items do not fail "
+        "the whole batch."
+    ),
+)
+async def create_users_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Create many users.
+
+    Each item is validated like the body of `create_user`. Valid items are
+    inserted together; invalid or rejected items are reported as failed.
+
+    Args:
+        items (List[Dict[str, Any]]): The data of the users to create.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserBatchResponse: Per-item results, in request order.
+
+    Raises:
+        BatchTooLarge: If the batch exceeds `BATCH_MAX_SIZE` items.
+    """
+    _check_batch_size(items)
+    valid, results = _validate_items(items, UserCreate)
+    outcomes = await crud_user.create_many(
+        db=db, create_data=[data for _, data in valid]
+    )
+    for (index, _), outcome in zip(valid, outcomes):
+        results.append(
+            _item_result(index, BatchItemStatus.created, outcome=outcome)
+        )
+    return _batch_response(results)
+
+
+@router.patch(
+    "/batch/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserBatchResponse,
+    summary="Update many users",
+    description=(
+        "Updates many users by ID in one transaction. Every item is "
+        "reported separately, so missing users or invalid items do not "
+        "fail the whole batch."
+    ),
+)
+async def update_users_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Update many users.
+
+    Each item carries the `id` of the user to update and the fields to
+    change, validated like the body of `update_user`.
+
+    Args:
+        items (List[Dict[str, Any]]): The IDs and data of the users to
+        update.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserBatchResponse: Per-item results, in request order.
+
+    Raises:
+        BatchTooLarge: If the batch exceeds `BATCH_MAX_SIZE` items.
+    """
+    _check_batch_size(items)
+    valid, results = _validate_items(items, UserBatchUpdate)
+    updates: List[Tuple[int, UserBatchUpdate]] = []
+    for index, data in valid:
+        if not data.model_fields_set - {"id"}:
+            results.append(
+                UserBatchItemResult(
+                    index=index,
+                    status=BatchItemStatus.failed,
+                    id=data.id,
+                    error="Please specify at least one field to change.",
+                )
+            )
+            continue
+        updates.append((index, data))
+
+    outcomes = await crud_user.update_many(
+        db=db,
+        update_data=[
+            (
+                data.id,
+                UserUpdate(
+                    **data.model_dump(exclude_unset=True, exclude={"id"})
+                ),
+            )
+            for _, data in updates
+        ],
+    )
+    for (index, data), outcome in zip(updates, outcomes):
+        results.append(
+            _item_result(
+                index, BatchItemStatus.updated, obj_id=data.id, outcome=outcome
+            )
+        )
+    return _batch_response(results)
+
+
+@router.delete(
+    "/batch/",
+    status_code=status.HTTP_200_OK,
+    response_model=UserBatchResponse,
+    summary="Delete many users",
+    description=(
+        "Deletes many users by ID with a single statement. IDs that do not "
+        "exist are reported as failed."
+    ),
+)
+async def remove_users_batch(
+    delete_data: UserBatchDelete,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Delete many users.
+
+    Args:
+        delete_data (UserBatchDelete): The IDs of the users to delete.
+        db (AsyncSession): The asynchronous session for database access.
+
+    Returns:
+        UserBatchResponse: Per-ID results, in request order.
+
+    Raises:
+        BatchTooLarge: If the batch exceeds `BATCH_MAX_SIZE` items.
+    """
+    _check_batch_size(delete_data.ids)
+    removed = set(await crud_user.remove_many(db=db, obj_ids=delete_data.ids))
+    results = [
+        (
+            UserBatchItemResult(
+                index=index, status=BatchItemStatus.deleted, id=user_id
+            )
+            if user_id in removed
+            else UserBatchItemResult(
+                index=index,
+                status=BatchItemStatus.failed,
+                id=user_id,
+                error=UserNotFound(user_id).detail,
+            )
+        )
+        for index, user_id in enumerate(delete_data.ids)
+    ]
+    return _batch_response(results)
 
 
 @router.get(
@@ -48,11 +805,16 @@ async def read_users_multi(
     summary="Retrieve a user by ID",
     description=(
         "Returns information about a specific user by its unique ID. "
-        "If the user is not found, an error is returned."
+        "If the user is not found, an error is returned. The response "
+        "carries an ETag; send it back in `If-None-Match` to get "
+        "`304 Not Modified` if the user has not changed. `fields` limits "
+        "the fields returned."
     ),
 )
 async def read_user(
     user_id: int,
+    fields: Tuple[str, ...] = Depends(response_fields),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_async_session),
 ):
     """
@@ -61,8 +823,18 @@ async def read_user(
     This endpoint returns the details of a specific user by its ID. If the user
     does not exist, an error will be raised.
 
+    With `If-None-Match`, only the version of the user is looked up (from
+    the cache or an index-only scan), and nothing else is read or encoded
+    if the client's copy is current.
+
+    The user is read whole, from the cache when it is there, and `fields`
+    only trims the response: one row by primary key costs the same whatever
+    its columns, and a partial row could not be cached.
+
     Args:
         user_id (int): The unique identifier of the user.
+        fields (Tuple[str, ...]): The fields to return.
+        if_none_match (Optional[str]): ETags of the copies the client has.
         db (AsyncSession): The asynchronous session for database access.
 
     Returns:
@@ -71,10 +843,26 @@ async def read_user(
     Raises:
         UserNotFound: If the user with the given ID does not exist.
     """
+    if if_none_match is not None:
+        version = await crud_user.read_version(db=db, obj_id=user_id)
+        if version is not None:
+            etag = _fieldset_etag(object_etag(user_id, version), fields)
+            if not none_match(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag},
+                )
+
     user: User = await crud_user.read_by_id(db=db, obj_id=user_id)
     if not user:
         raise UserNotFound(user_id)
-    return user
+    return FastJSONResponse(
+        object_to_dict(user, fields),
+        headers={
+            "ETag": _fieldset_etag(object_etag(user.id, user.version), fields),
+            "Last-Modified": http_date(user.updated_at),
+        },
+    )
 
 
 @router.post(
@@ -85,6 +873,7 @@ async def read_user(
     description=("Creates a new user in the database."),
 )
 async def create_user(
+    response: Response,
     create_data: UserCreate,
     db: AsyncSession = Depends(get_async_session),
 ):
@@ -94,13 +883,16 @@ async def create_user(
     This endpoint creates a new user in the database.
 
     Args:
+        response (Response): The outgoing response, used to set the ETag.
         create_data (UserCreate): The data required to create a new user.
         db (AsyncSession): The asynchronous session for database access.
 
     Returns:
         UserResponse: The created user data.
     """
-    return await crud_user.create(db=db, create_data=create_data)
+    user: User = await crud_user.create(db=db, create_data=create_data)
+    response.headers["ETag"] = object_etag(user.id, user.version)
+    return user
 
 
 @router.patch(
@@ -110,12 +902,16 @@ async def create_user(
     summary="Update a user by ID",
     description=(
         "Updates an existing user by its unique ID. "
-        "If the user is not found, 404 error is returned."
+        "If the user is not found, 404 error is returned. With `If-Match`, "
+        "the user is only updated if it still has the given ETag, otherwise "
+        "412 error is returned."
     ),
 )
 async def update_user(
+    response: Response,
     user_id: int,
     update_data: UserUpdate,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_async_session),
 ):
     """
@@ -125,8 +921,11 @@ async def update_user(
     If the user does not exist, an error will be raised.
 
     Args:
+        response (Response): The outgoing response, used to set the ETag.
         user_id (int): The unique identifier of the user to be updated.
         update_data (UserUpdate): The data to update the user with.
+        if_match (Optional[str]): ETags the user must still have, for
+        optimistic concurrency.
         db (AsyncSession): The asynchronous session for database access.
 
     Returns:
@@ -135,14 +934,22 @@ async def update_user(
 
     Raises:
         UserNotFound: If the user with the given ID does not exist.
+        PreconditionFailed: If `If-Match` does not name the current version
+        of the user.
     """
     updated_user: User = await crud_user.update(
         db=db,
         update_data=update_data,
         obj_id=user_id,
+        versions=(
+            match_versions(if_match, user_id) if if_match is not None else None
+        ),
     )
     if not updated_user:
         raise UserNotFound(user_id)
+    response.headers["ETag"] = object_etag(
+        updated_user.id, updated_user.version
+    )
     return updated_user
 
 
@@ -173,3 +980,176 @@ async def remove_user(
         UserNotFound: If the user with the given ID does not exist.
     """
     await crud_user.remove(db=db, obj_id=user_id)
+
+
+def _fieldset_etag(etag: str, fields: Tuple[str, ...]) -> str:
+    """
+    Mark the ETag of a representation limited to some fields.
+    """
+    if fields == USER_FIELDS:
+        return etag
+    return with_variant(etag, fieldset_variant(fields))
+
+
+async def _lookup(db: AsyncSession, user_ids: List[int]) -> Response:
+    """
+    Read users by ID in request order and list the IDs not found.
+
+    Raises:
+        BatchTooLarge: If more than `LOOKUP_MAX_IDS` IDs are given.
+    """
+    if len(user_ids) > app_settings.LOOKUP_MAX_IDS:
+        raise BatchTooLarge(app_settings.LOOKUP_MAX_IDS)
+    rows = await crud_user.read_many(
+        db=db, obj_ids=user_ids, columns=USER_FIELDS
+    )
+    users = [row._asdict() for row in rows if row is not None]
+    missing = dict.fromkeys(
+        user_id for user_id, row in zip(user_ids, rows) if row is None
+    )
+    return FastJSONResponse({"users": users, "missing": list(missing)})
+
+
+def _check_batch_size(items: List[Any]) -> None:
+    """
+    Reject batches larger than the configured maximum.
+
+    Raises:
+        BatchTooLarge: If the batch exceeds `BATCH_MAX_SIZE` items.
+    """
+    if len(items) > app_settings.BATCH_MAX_SIZE:
+        raise BatchTooLarge(app_settings.BATCH_MAX_SIZE)
+
+
+def _validate_items(
+    items: List[Dict[str, Any]], schema: Type[BaseModel]
+) -> Tuple[List[Tuple[int, BaseModel]], List[UserBatchItemResult]]:
+    """
+    Validate batch items one by one.
+
+    Args:
+        items (List[Dict[str, Any]]): The raw batch items.
+        schema (Type[BaseModel]): The schema every item must satisfy.
+
+    Returns:
+        Tuple[List[Tuple[int, BaseModel]], List[UserBatchItemResult]]: The
+        valid items with their positions, and failed results for the rest.
+    """
+    valid: List[Tuple[int, BaseModel]] = []
+    failed: List[UserBatchItemResult] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as err:
+            error = "; ".join(
+                f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}"
+                for detail in err.errors()
+            )
+            failed.append(
+                UserBatchItemResult(
+                    index=index, status=BatchItemStatus.failed, error=error
+                )
+            )
+        except RequestValidationError as err:
+            failed.append(
+                UserBatchItemResult(
+                    index=index,
+                    status=BatchItemStatus.failed,
+                    error=str(err.errors()),
+                )
+            )
+    return valid, failed
+
+
+def _item_result(
+    index: int,
+    item_status: BatchItemStatus,
+    outcome: BatchResult,
+    obj_id: Optional[int] = None,
+) -> UserBatchItemResult:
+    """
+    Convert the outcome of a batch write into a per-item result.
+    """
+    if outcome.error is not None:
+        return UserBatchItemResult(
+            index=index,
+            status=BatchItemStatus.failed,
+            id=obj_id,
+            error=outcome.error,
+        )
+    return UserBatchItemResult(
+        index=index,
+        status=item_status,
+        id=outcome.obj.id,
+        user=UserResponse.model_validate(outcome.obj, from_attributes=True),
+    )
+
+
+def _batch_response(results: List[UserBatchItemResult]) -> UserBatchResponse:
+    """
+    Sort per-item results by position and count the failures.
+    """
+    results.sort(key=lambda result: result.index)
+    failed = sum(
+        1 for result in results if result.status == BatchItemStatus.failed
+    )
+    return UserBatchResponse(
+        succeeded=len(results) - failed, failed=failed, results=results
+    )
+
+
+async def _export_chunks(
+    export_format: UserExportFormat,
+    fields: Tuple[str, ...] = USER_FIELDS,
+) -> AsyncIterator[bytes]:
+    """
+    Read users through a server-side cursor and encode them chunk by chunk.
+
+    Args:
+        export_format (UserExportFormat): The output format.
+        fields (Tuple[str, ...]): The columns to read and encode.
+
+    Yields:
+        bytes: Encoded chunks of at most `EXPORT_CHUNK_SIZE` users.
+    """
+    header = True
+    async with read_only_session() as db:
+        async for rows in crud_user.stream(
+            db=db,
+            chunk_size=app_settings.EXPORT_CHUNK_SIZE,
+            columns=fields,
+        ):
+            if export_format == UserExportFormat.csv:
+                yield rows_to_csv(rows, header=header)
+                header = False
+            else:
+                yield rows_to_ndjson(rows)
+
+
+async def _change_events(
+    after: int, fields: Tuple[str, ...]
+) -> AsyncIterator[bytes]:
+    """
+    Send the changes after a given one, then every new one as it comes.
+
+    Args:
+        after (int): The number of the last change already seen.
+        fields (Tuple[str, ...]): The fields of the users to send.
+
+    Yields:
+        bytes: Events of at most `CHANGES_BATCH_SIZE` changes, or a comment
+        after `CHANGES_KEEPALIVE` seconds without any.
+    """
+    batch_size = app_settings.CHANGES_BATCH_SIZE
+    while True:
+        async with async_session() as db:
+            rows = await crud_user_change.read_after(
+                db=db, after=after, limit=batch_size, columns=fields
+            )
+        if rows:
+            yield changes_to_events(rows, fields)
+            after = rows[-1].seq
+        if len(rows) == batch_size:
+            continue
+        if not await change_feed.wait(after, app_settings.CHANGES_KEEPALIVE):
+            yield b": keepalive\n\n"
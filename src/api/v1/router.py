@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
-from .endpoints import users_router
+from .endpoints import jobs_router, system_router, users_router
 
 api_v1_router = APIRouter(prefix="/v1")
 
 
 api_v1_router.include_router(users_router, prefix="/users", tags=["Users"])
+api_v1_router.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
+api_v1_router.include_router(system_router, prefix="/system", tags=["System"])
@@ -0,0 +1,17 @@
+from configs import app_settings
+
+from .feed import ChangeFeed
+
+change_feed = ChangeFeed(
+    poll_interval=app_settings.CHANGES_POLL_INTERVAL,
+    retention=app_settings.CHANGES_RETENTION,
+)
+"""
+The change feed of this worker, started with the application when
+`CHANGES_ENABLED` is set.
+"""
+
+__all__ = (
+    "ChangeFeed",
+    "change_feed",
+)
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from contextlib import suppress
+from typing import Optional
+
+import asyncpg
+from sqlalchemy.exc import SQLAlchemyError
+
+from crud.user_change import (
+    CHANGE_CHANNEL,
+    SEQUENCED_CHANNEL,
+    crud_user_change,
+)
+from databases import async_session, listen
+
+"""
+Notification of changes to users within a worker.
+
+Every worker that serves change streams listens on the primary: the
+triggers on the 'user' table notify it when changes are committed, it
+numbers them, and every worker is notified of the new numbers in turn and
+wakes its streams. A poll every few seconds catches up on changes whose
+number had to wait for an older transaction, and on notifications lost
+while the listening connection was down.
+"""
+
+
+class ChangeFeed:
+    """
+    Numbers logged changes and tells the change streams of this worker when
+    there are new ones.
+
+    Attributes:
+        poll_interval (float): Seconds between checks for changes without a
+        notification; also how soon a lost listening connection is opened
+        again.
+        retention (float): Seconds numbered changes are kept.
+        prune_interval (float): Seconds between deletions of old changes.
+        latest (int): The highest change number this worker has heard of.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 1.0,
+        retention: float = 7 * 24 * 3600.0,
+        prune_interval: float = 60.0,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.latest = 0
+        self._poller: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncpg.Connection] = None
+        self._pending: Optional[asyncio.Event] = None
+        self._advanced: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """
+        Start listening and polling in the background.
+        """
+        self._pending = asyncio.Event()
+        self._advanced = asyncio.Event()
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """
+        Stop listening and polling.
+        """
+        if self._poller is None:
+            return
+        self._poller.cancel()
+        await asyncio.gather(self._poller, return_exceptions=True)
+        self._poller = None
+        await self._close_listener()
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """
+        Wait until a change numbered after a given one exists.
+
+        Args:
+            after (int): The number of the last change the caller has seen.
+            timeout (float): The most seconds to wait.
+
+        Returns:
+            bool: True if there are new changes, False if the wait timed
+            out. Without a running feed, the wait always times out.
+        """
+        if self.latest > after:
+            return True
+        if self._advanced is None:
+            await asyncio.sleep(timeout)
+            return False
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._advanced.wait(), timeout=timeout)
+            return True
+        return False
+
+    async def _poll(self) -> None:
+        pruned_at = 0.0
+        while True:
+            self._pending.clear()
+            try:
+                if self._listener is None or self._listener.is_closed():
+                    await self._close_listener()
+                    self._listener = await listen(
+                        {
+                            CHANGE_CHANNEL: self._on_change,
+                            SEQUENCED_CHANNEL: self._on_sequenced,
+                        }
+                    )
+                async with async_session() as db:
+                    latest = await crud_user_change.sequence(db)
+                    if time.monotonic() - pruned_at >= self.prune_interval:
+                        await crud_user_change.prune(db, self.retention)
+                        pruned_at = time.monotonic()
+                    if self.latest == 0:
+                        _, latest = await crud_user_change.bounds(db)
+                if latest is not None:
+                    self._advance(latest)
+            except (SQLAlchemyError, OSError, asyncpg.PostgresError):
+                # the database is unreachable; try again at the next poll
+                pass
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._pending.wait(), timeout=self.poll_interval
+                )
+
+    def _on_change(self, payload: str) -> None:
+        self._pending.set()
+
+    def _on_sequenced(self, payload: str) -> None:
+        self._advance(int(payload))
+
+    def _advance(self, latest: int) -> None:
+        if latest <= self.latest:
+            return
+        self.latest = latest
+        # wake every waiter, and let later ones wait for the next change
+        self._advanced.set()
+        self._advanced = asyncio.Event()
+
+    async def _close_listener(self) -> None:
+        if self._listener is not None:
+            with suppress(OSError, asyncpg.PostgresError):
+                await self._listener.close()
+            self._listener = None
@@ -1,6 +1,22 @@
-from .config import app_settings, db_settings
+from typing import Any
 
 __all__ = (
     "db_settings",
     "app_settings",
+    "cache_settings",
 )
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Load the configuration on first use, so importing the package is cheap.
+
+    Raises:
+        AttributeError: If `name` is not a settings object.
+    """
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import config
+
+    value = globals()[name] = getattr(config, name)
+    return value
@@ -1,3 +1,9 @@
+from .job import crud_job
 from .user import crud_user
+from .user_change import crud_user_change
 
-__all__ = ("crud_user",)
+__all__ = (
+    "crud_job",
+    "crud_user",
+    "crud_user_change",
+)
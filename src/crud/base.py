@@ -1,13 +1,71 @@
-from typing import List, Optional, Type
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
+from asyncpg import PostgresError
 from pydantic import BaseModel
-from sqlalchemy import delete, insert, update
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    ARRAY,
+    Boolean,
+    Integer,
+    any_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.engine import Result, Row
+from sqlalchemy.exc import DBAPIError, IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.future import select
 
 from models.base import Base
-from utilities.exceptions import ObjectNotFound
+from utilities.cache import (
+    SKIP_CACHE_READS,
+    SKIP_CACHE_WRITES,
+    LocalCache,
+    ModelCache,
+)
+from utilities.exceptions import (
+    ImportFailed,
+    InvalidCursor,
+    ObjectAlreadyExists,
+    ObjectNotFound,
+    PreconditionFailed,
+)
+from utilities.batching import batcher_for
+from utilities.loader import BatchLoader
+from utilities.pagination import decode_cursor, encode_cursor
+from utilities.writer import BatchWriter
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a single item of a batch write.
+
+    Attributes:
+        obj (Optional[Base]): The written object, if the item succeeded.
+        error (Optional[str]): Why the item failed, if it did.
+    """
+
+    obj: Optional[Base] = None
+    error: Optional[str] = None
 
 
 class CRUDBase:
@@ -17,22 +75,143 @@ class CRUDBase:
     Attributes:
         model (Type[Base]): The SQLAlchemy model to be used for the CRUD
         operations.
+        cache (Optional[ModelCache]): Read-through cache of objects by ID,
+        kept up to date by every write of this class.
+        count_cache (Optional[LocalCache]): Cache of exact totals returned
+        by `count`, expired by TTL only.
+        sort_keys (Tuple[str, ...]): Columns that `read_multi` may order and
+        seek by. Every key except `id` must be backed by an index on
+        (key, id) to keep keyset pages cheap.
+        version_key (Optional[str]): Column incremented by every update,
+        used for conditional requests, or None if the model has none.
+        batch_window (Optional[float]): How long concurrent reads by ID are
+        collected into one query, or None to read each on its own.
+        batch_max_size (int): The most objects read by one batched query.
+        write_batch_window (Optional[float]): How long concurrent creates
+        of single objects are collected into one INSERT and one commit, or
+        None to create each on its own.
+        write_batch_max_size (int): The most objects created by one batched
+        INSERT.
+
+    Writes of single objects use statements built once per instance, whose
+    SQL does not depend on the data, so they hit both SQLAlchemy's compiled
+    cache and the driver's prepared statement cache, and each of them takes
+    one round trip.
     """
 
-    def __init__(self, model: Type[Base]) -> None:
+    sort_keys: Tuple[str, ...] = ("id",)
+    version_key: Optional[str] = None
+
+    def __init__(
+        self,
+        model: Type[Base],
+        cache: Optional[ModelCache] = None,
+        count_cache: Optional[LocalCache] = None,
+        batch_window: Optional[float] = None,
+        batch_max_size: int = 100,
+        write_batch_window: Optional[float] = None,
+        write_batch_max_size: int = 100,
+    ) -> None:
         """
         Initialize the CRUDBase with a specific model.
 
         Args:
             model (Type[Base]): The SQLAlchemy model for CRUD operations.
+            cache (Optional[ModelCache]): Read-through cache of objects by
+            ID, or None to always read from the database.
+            count_cache (Optional[LocalCache]): Cache of exact totals, or
+            None to count on every call.
+            batch_window (Optional[float]): How long concurrent reads by ID
+            are collected into one query, in seconds, or None to read each
+            on its own.
+            batch_max_size (int): The most objects read by one batched
+            query.
+            write_batch_window (Optional[float]): How long concurrent
+            creates are collected into one INSERT, in seconds, or None to
+            create each on its own.
+            write_batch_max_size (int): The most objects created by one
+            batched INSERT.
         """
         self.model = model
+        self.cache = cache
+        self.count_cache = count_cache
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        self.write_batch_window = write_batch_window
+        self.write_batch_max_size = write_batch_max_size
+        # one loader per engine, so a batch never mixes primary and replicas,
+        # and per use of the cache, so replica rows are never cached
+        self.loaders: Dict[Tuple[AsyncEngine, bool], BatchLoader] = {}
+        self.writers: Dict[AsyncEngine, BatchWriter] = {}
+
+        table = model.__table__
+        # generated columns, such as a search vector, only serve queries
+        # and are never returned
+        self._output_columns = tuple(
+            column for column in table.columns if column.computed is None
+        )
+        # columns maintained by the database, such as a version, are left
+        # to their `onupdate` expressions
+        self._columns = tuple(
+            column.key
+            for column in self._output_columns
+            if not column.primary_key and column.onupdate is None
+        )
+        self._insert_stmt = insert(table).returning(*self._output_columns)
+        self._insert_many_stmt = insert(table).returning(
+            *self._output_columns, sort_by_parameter_order=True
+        )
+        # a column is only changed when its `s_` flag is set, so one
+        # statement covers every combination of changed columns
+        self._update_stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                {
+                    column: case(
+                        (
+                            bindparam(f"s_{column}", type_=Boolean),
+                            bindparam(
+                                f"b_{column}", type_=table.c[column].type
+                            ),
+                        ),
+                        else_=table.c[column],
+                    )
+                    for column in self._columns
+                }
+            )
+        )
+        self._update_returning_stmt = self._update_stmt.returning(
+            *self._output_columns
+        )
+        if self.version_key is not None:
+            self._update_if_version_stmt = self._update_returning_stmt.where(
+                table.c[self.version_key]
+                == any_(bindparam("b_versions", type_=ARRAY(Integer)))
+            )
+        self._delete_stmt = (
+            delete(table)
+            .where(table.c.id == bindparam("b_id"))
+            .returning(table.c.id)
+        )
 
     async def read_by_id(
         self, db: AsyncSession, obj_id: int
     ) -> Optional[Base]:
         """
-        Retrieve an object by its ID from the database.
+        Retrieve an object by its ID from the cache or the database.
+
+        A cache hit does not touch the session, so no pooled connection is
+        used. A cache hit returns a new transient object, never one shared
+        with other requests. A session marked with `SKIP_CACHE_READS` reads
+        past the cache and any read already running, and rows read through
+        a session marked with `SKIP_CACHE_WRITES` are not cached.
+
+        With `batch_window` set and no transaction open on the session, the
+        read joins the reads of other tasks on the same engine: their IDs
+        are loaded with one `WHERE id = ANY(...)` query on a connection of
+        its own, concurrent reads of the same ID share it, and the result is
+        a new transient object.
 
         Args:
             db (AsyncSession): The asynchronous database session.
@@ -42,31 +221,373 @@ class CRUDBase:
             Optional[Base]: The retrieved object, or None if no object is
             found.
         """
+        fresh = db.info.get(SKIP_CACHE_READS, False)
+        if self.cache is not None and not fresh:
+            data = await self.cache.get(self.model.__name__, obj_id)
+            if data is not None:
+                return self.model(**data)
+
+        cache_rows = not db.info.get(SKIP_CACHE_WRITES, False)
+        if (
+            self.batch_window is not None
+            and db.bind is not None
+            and not db.in_transaction()
+            and not fresh
+        ):
+            loader = self._loader(db.bind, cache_rows)
+            data = await loader.load(obj_id)
+            return self.model(**data) if data is not None else None
+
         statement = select(self.model).where(self.model.id == obj_id)
-        result = await db.execute(statement)
+        result = await self._execute_single(db, statement, commit=False)
         obj = result.scalars().first()
+        if obj and cache_rows:
+            await self._cache_set(obj)
         return obj if obj else None
 
+    async def read_many(
+        self,
+        db: AsyncSession,
+        obj_ids: Sequence[int],
+        columns: Sequence[str],
+    ) -> List[Optional[Row]]:
+        """
+        Retrieve many objects by ID with one `WHERE id = ANY(...)` query.
+
+        Each distinct ID is read once, bypassing the cache, and the rows are
+        plain column tuples like those of `read_multi_rows`.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            obj_ids (Sequence[int]): The IDs, possibly repeated.
+            columns (Sequence[str]): The columns to select; must include
+            `id`.
+
+        Returns:
+            List[Optional[Row]]: One entry per ID, in the order of
+            `obj_ids`, and None where no object has the ID.
+        """
+        if not obj_ids:
+            return []
+        statement = self._read_many_statement(
+            columns, list(dict.fromkeys(obj_ids))
+        )
+        result = await self._execute_single(db, statement, commit=False)
+        rows = {row.id: row for row in result}
+        return [rows.get(obj_id) for obj_id in obj_ids]
+
+    def _read_many_statement(
+        self, columns: Sequence[str], obj_ids: List[int]
+    ) -> Any:
+        """
+        Build the query of `read_many` for distinct IDs.
+        """
+        table = self.model.__table__
+        return select(*(table.c[name] for name in columns)).where(
+            table.c.id == any_(self._ids_param(obj_ids))
+        )
+
+    async def read_version(
+        self, db: AsyncSession, obj_id: int, use_cache: bool = True
+    ) -> Optional[int]:
+        """
+        Retrieve the version of an object without reading the object.
+
+        The lookup is answered from the cache or from an index-only scan of
+        the index on (id, version), so it is the cheap way to validate a
+        client's copy. A session marked with `SKIP_CACHE_READS` always
+        reads the database.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            obj_id (int): The ID of the object.
+            use_cache (bool): Whether a cached version may be returned.
+
+        Returns:
+            Optional[int]: The current version, or None if no object has
+            the ID.
+        """
+        if (
+            use_cache
+            and self.cache is not None
+            and not db.info.get(SKIP_CACHE_READS, False)
+        ):
+            data = await self.cache.get(self.model.__name__, obj_id)
+            if data is not None:
+                return data[self.version_key]
+
+        column = getattr(self.model, self.version_key)
+        statement = select(column).where(self.model.id == obj_id)
+        result = await self._execute_single(db, statement, commit=False)
+        return result.scalar_one_or_none()
+
     async def read_multi(
-        self, db: AsyncSession, limit: int = 100, offset: int = 0
+        self,
+        db: AsyncSession,
+        limit: int = 100,
+        offset: int = 0,
+        after: Optional[str] = None,
+        order_by: str = "id",
+        filters: Optional[List[Any]] = None,
     ) -> List[Optional[Base]]:
         """
-        Retrieve all objects from the database.
+        Retrieve a page of objects from the database in a stable order.
+
+        When `after` is given, the page starts right after the row encoded in
+        the cursor (keyset pagination) and `offset` is ignored, so the cost of
+        a page does not depend on how deep the client has paged.
 
         Args:
-            limit: Limit of ojcets in response
-            offset: Offset in response
             db (AsyncSession): The asynchronous database session.
+            limit: Limit of objects in response
+            offset: Offset in response
+            after (Optional[str]): Cursor returned by `build_cursor` for the
+            last row of the previous page.
+            order_by (str): One of `sort_keys`; ties are broken by `id`.
+            filters (Optional[List[Any]]): SQL conditions every returned
+            object must satisfy.
+
+        Raises:
+            InvalidCursor: If `order_by` is not supported or the cursor does
+            not match it.
 
         Returns:
-            Optional[List[Base]]: A list of all objects, or an empty list
+            Optional[List[Base]]: A list of objects, or an empty list
             if no objects are found.
         """
-        statement = select(self.model).limit(limit).offset(offset)
-        result = await db.execute(statement)
+        statement = self._page_statement(
+            select(self.model), limit, offset, after, order_by, filters
+        )
+        result = await self._execute_single(db, statement, commit=False)
         objects = result.scalars().all()
         return objects if objects else []
 
+    async def read_multi_rows(
+        self,
+        db: AsyncSession,
+        columns: Sequence[str],
+        limit: int = 100,
+        offset: int = 0,
+        after: Optional[str] = None,
+        order_by: str = "id",
+        filters: Optional[List[Any]] = None,
+    ) -> Sequence[Row]:
+        """
+        Retrieve a page like `read_multi`, as plain column tuples.
+
+        No ORM objects are built and nothing is added to the session, which
+        makes this the cheap path for read-only responses.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            columns (Sequence[str]): The columns to select, in output order.
+            To build a cursor from the last row, they must include the sort
+            key and `id`.
+            limit: Limit of rows in response
+            offset: Offset in response
+            after (Optional[str]): Cursor of the previous page.
+            order_by (str): One of `sort_keys`; ties are broken by `id`.
+            filters (Optional[List[Any]]): SQL conditions every returned
+            row must satisfy.
+
+        Raises:
+            InvalidCursor: If `order_by` is not supported or the cursor does
+            not match it.
+
+        Returns:
+            Sequence[Row]: The rows of the page.
+        """
+        table = self.model.__table__
+        statement = self._page_statement(
+            select(*(table.c[name] for name in columns)),
+            limit,
+            offset,
+            after,
+            order_by,
+            filters,
+        )
+        result = await self._execute_single(db, statement, commit=False)
+        return result.all()
+
+    async def count(
+        self,
+        db: AsyncSession,
+        filters: Optional[List[Any]] = None,
+        cache_key: Optional[Hashable] = (),
+    ) -> int:
+        """
+        Count the objects matching the filters, exactly.
+
+        The total is kept in `count_cache` for its TTL, so repeated page
+        views do not scan the table each time; it may lag behind writes by
+        up to the TTL.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            filters (Optional[List[Any]]): SQL conditions to count by.
+            cache_key (Optional[Hashable]): Identifies the filters in the
+            cache. Equal keys must mean equal filters. None counts without
+            the cache.
+
+        Returns:
+            int: The number of matching objects.
+        """
+        key = (self.model.__name__, cache_key)
+        use_cache = self.count_cache is not None and cache_key is not None
+        if use_cache:
+            total = self.count_cache.get(key)
+            if total is not None:
+                return total
+
+        statement = select(func.count()).select_from(self.model)
+        if filters:
+            statement = statement.where(*filters)
+        result = await self._execute_single(db, statement, commit=False)
+        total = result.scalar_one()
+        if use_cache:
+            self.count_cache.set(key, total)
+        return total
+
+    async def estimate_count(self, db: AsyncSession) -> int:
+        """
+        Estimate the number of objects in the table from its statistics.
+
+        Like the planner, the row count recorded by the last VACUUM, ANALYZE
+        or CREATE INDEX is scaled by the current size of the table, so the
+        estimate follows growth between statistics updates at the cost of a
+        catalog lookup. If the table has never been analyzed, the cached
+        exact count is returned instead.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+
+        Returns:
+            int: The estimated number of objects.
+        """
+        statement = text(
+            "SELECT CASE WHEN relpages > 0 THEN reltuples / relpages "
+            "* (pg_relation_size(oid) / current_setting('block_size')::int) "
+            "ELSE reltuples END::bigint "
+            "FROM pg_class WHERE oid = CAST(:table_name AS regclass)"
+        )
+        result = await self._execute_single(
+            db,
+            statement,
+            {"table_name": f'"{self.model.__tablename__}"'},
+            commit=False,
+        )
+        estimate = result.scalar_one()
+        if estimate < 0:
+            return await self.count(db)
+        return estimate
+
+    def _page_statement(
+        self,
+        statement: Any,
+        limit: int,
+        offset: int,
+        after: Optional[str],
+        order_by: str,
+        filters: Optional[List[Any]],
+    ) -> Any:
+        """
+        Apply ordering, filters and offset or keyset seeking to a query.
+
+        Raises:
+            InvalidCursor: If `order_by` is not supported or the cursor does
+            not match it.
+        """
+        columns = self._sort_columns(order_by)
+        statement = statement.order_by(*columns).limit(limit)
+        if filters:
+            statement = statement.where(*filters)
+        if after is not None:
+            values = decode_cursor(
+                after,
+                order_by,
+                [column.type.python_type for column in columns],
+            )
+            if len(columns) == 1:
+                statement = statement.where(columns[0] > values[0])
+            else:
+                statement = statement.where(tuple_(*columns) > tuple_(*values))
+        else:
+            statement = statement.offset(offset)
+        return statement
+
+    async def stream(
+        self,
+        db: AsyncSession,
+        chunk_size: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream every row of the table in ID order through a server-side
+        cursor.
+
+        Rows are fetched `chunk_size` at a time as plain column tuples, so
+        memory use does not depend on the size of the table and no ORM
+        objects are built.
+
+        Args:
+            db (AsyncSession): The asynchronous database session. It must
+            stay open until the iteration finishes.
+            chunk_size (int): The number of rows fetched per round trip.
+            columns (Optional[Sequence[str]]): The columns to read, in table
+            order whatever the order given, or None for all of them.
+
+        Yields:
+            Sequence[Row]: Consecutive chunks of at most `chunk_size` rows.
+        """
+        selected = [
+            column
+            for column in self._output_columns
+            if columns is None or column.key in columns
+        ]
+        statement = (
+            select(*selected)
+            .order_by(self.model.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            yield partition
+
+    def build_cursor(self, obj: Any, order_by: str = "id") -> str:
+        """
+        Build the cursor pointing right after the given object.
+
+        Args:
+            obj (Any): The last object or row of a page.
+            order_by (str): The sort key the page was ordered by.
+
+        Returns:
+            str: An opaque cursor to pass as `after` to `read_multi`.
+        """
+        values: Tuple[Any, ...] = tuple(
+            getattr(obj, column.key) for column in self._sort_columns(order_by)
+        )
+        return encode_cursor(order_by, values)
+
+    def _sort_columns(self, order_by: str) -> List[Any]:
+        """
+        Resolve a sort key to the columns used for ordering and seeking.
+
+        Args:
+            order_by (str): One of `sort_keys`.
+
+        Raises:
+            InvalidCursor: If the sort key is not supported.
+
+        Returns:
+            List[Any]: The sort column followed by `id` as a tie-breaker.
+        """
+        if order_by not in self.sort_keys:
+            raise InvalidCursor(f"Unsupported sort key: {order_by}")
+        if order_by == "id":
+            return [self.model.id]
+        return [getattr(self.model, order_by), self.model.id]
+
     async def create(
         self,
         db: AsyncSession,
@@ -75,23 +596,60 @@ class CRUDBase:
         """
         Create a new object in the database.
 
+        With `write_batch_window` set and no transaction open on the
+        session, the object joins the creates of other tasks on the same
+        engine (group commit): they are inserted with one multi-row
+        `INSERT ... RETURNING` and one commit on a connection of their own,
+        so a burst of creates pays for one commit instead of one each, at
+        the cost of up to `write_batch_window` seconds of latency. If the
+        database rejects the batch, its objects are inserted one by one in
+        savepoints, so an error only fails the create that caused it.
+
         Args:
             db (AsyncSession): The asynchronous database session.
             create_data (Base): The data needed to create the object.
 
         Raises:
+            ObjectAlreadyExists: If the data violates a unique constraint.
             SQLAlchemyError: If any error occurs during the database operation.
 
         Returns:
-            Base: The newly created object.
+            Base: The newly created object, detached from the session.
         """
+        if (
+            self.write_batch_window is not None
+            and db.bind is not None
+            and not db.in_transaction()
+        ):
+            try:
+                data = await self._writer(db.bind).write(
+                    create_data.model_dump()
+                )
+            except IntegrityError as err:
+                raise ObjectAlreadyExists(
+                    object_name=self.model.__name__, reason=_db_error(err)
+                ) from err
+            except SQLAlchemyError as err:
+                raise RuntimeError(
+                    "Failed to create object in the database."
+                ) from err
+            obj = self.model(**data)
+            await self._cache_set(obj)
+            return obj
+
         try:
-            data = create_data.model_dump()
-            statement = insert(self.model).values(**data).returning(self.model)
-            result = await db.execute(statement)
-            await db.commit()
-            return result.scalars().first()
+            result = await self._execute_single(
+                db, self._insert_stmt, create_data.model_dump()
+            )
+            obj = self.model(**result.one()._mapping)
+            await self._cache_set(obj)
+            return obj
 
+        except IntegrityError as err:
+            await db.rollback()
+            raise ObjectAlreadyExists(
+                object_name=self.model.__name__, reason=_db_error(err)
+            ) from err
         except SQLAlchemyError as err:
             await db.rollback()
             raise RuntimeError(
@@ -103,33 +661,56 @@ class CRUDBase:
         db: AsyncSession,
         update_data: Type[BaseModel],
         obj_id: int,
+        versions: Optional[List[int]] = None,
     ) -> Optional[Base]:
         """
         Update an existing object in the database.
 
+        With `versions`, the object is only changed if its current version
+        is one of them (optimistic concurrency); the check is part of the
+        UPDATE statement, so it costs no extra round trip.
+
         Args:
             db (AsyncSession): The asynchronous database session.
             update_data (Base): The data to update the object with.
             obj_id (int): The ID of the object to update.
+            versions (Optional[List[int]]): The versions the client expects
+            the object to have, or None to update unconditionally.
 
         Raises:
+            ObjectAlreadyExists: If the data violates a unique constraint.
+            PreconditionFailed: If the object exists but its version is not
+            one of `versions`.
             SQLAlchemyError: If any error occurs during the database operation.
 
         Returns:
-            Optional[Base]: The updated object
+            Optional[Base]: The updated object, detached from the session,
+            or None if no object has the ID.
         """
+        params = self._update_params(obj_id, update_data)
+        statement = self._update_returning_stmt
+        if versions is not None:
+            statement = self._update_if_version_stmt
+            params["b_versions"] = versions
         try:
-            data = update_data.model_dump(exclude_unset=True)
-            statement = (
-                update(self.model)
-                .where(self.model.id == obj_id)
-                .values(**data)
-                .returning(self.model)
-            )
-            result = await db.execute(statement)
-            await db.commit()
-            return result.scalars().first()
+            result = await self._execute_single(db, statement, params)
+            row = result.first()
+            if row is None:
+                if versions is not None and (
+                    await self.read_version(db, obj_id, use_cache=False)
+                    is not None
+                ):
+                    raise PreconditionFailed(self.model.__name__, obj_id)
+                return None
+            obj = self.model(**row._mapping)
+            await self._cache_set(obj)
+            return obj
 
+        except IntegrityError as err:
+            await db.rollback()
+            raise ObjectAlreadyExists(
+                object_name=self.model.__name__, reason=_db_error(err)
+            ) from err
         except SQLAlchemyError as err:
             await db.rollback()
             raise RuntimeError(
@@ -142,7 +723,8 @@ class CRUDBase:
         obj_id: int,
     ) -> None:
         """
-        Remove an object from the database by its ID.
+        Remove an object from the database by its ID with a single
+        `DELETE ... RETURNING id`.
 
         Args:
             db (AsyncSession): The asynchronous database session.
@@ -157,17 +739,610 @@ class CRUDBase:
             None
         """
         try:
-            if (obj := await db.get(self.model, obj_id)) is None:  # noqa F841
-                raise ObjectNotFound(
-                    object_name=self.model.__name__, object_id=obj_id
+            result = await self._execute_single(
+                db, self._delete_stmt, {"b_id": obj_id}
+            )
+        except SQLAlchemyError as err:
+            await db.rollback()
+            raise RuntimeError(
+                "Failed to remove object from the database."
+            ) from err
+
+        if result.first() is None:
+            raise ObjectNotFound(
+                object_name=self.model.__name__, object_id=obj_id
+            )
+        await self._cache_delete(obj_id)
+
+    async def create_many(
+        self,
+        db: AsyncSession,
+        create_data: List[BaseModel],
+    ) -> List[BatchResult]:
+        """
+        Create many objects with one multi-row INSERT ... RETURNING.
+
+        All rows are written in a single transaction. If the multi-row insert
+        is rejected by the database, rows are retried one by one inside
+        savepoints so only the offending rows fail.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            create_data (List[BaseModel]): The data of the objects to create.
+
+        Raises:
+            SQLAlchemyError: If any error occurs during the database operation.
+
+        Returns:
+            List[BatchResult]: One result per item, in input order.
+        """
+        rows = [data.model_dump() for data in create_data]
+        if not rows:
+            return []
+        try:
+            try:
+                async with db.begin_nested():
+                    statement = insert(self.model).returning(
+                        self.model, sort_by_parameter_order=True
+                    )
+                    result = await db.execute(statement, rows)
+                    results = [
+                        BatchResult(obj=obj) for obj in result.scalars().all()
+                    ]
+            except DBAPIError:
+                results = []
+                for row in rows:
+                    try:
+                        async with db.begin_nested():
+                            statement = (
+                                insert(self.model)
+                                .values(**row)
+                                .returning(self.model)
+                            )
+                            result = await db.execute(statement)
+                            obj = result.scalars().first()
+                        results.append(BatchResult(obj=obj))
+                    except DBAPIError as err:
+                        results.append(BatchResult(error=_db_error(err)))
+            await db.commit()
+            for result in results:
+                if result.obj is not None:
+                    await self._cache_set(result.obj)
+            return results
+
+        except SQLAlchemyError as err:
+            await db.rollback()
+            raise RuntimeError(
+                "Failed to create objects in the database."
+            ) from err
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        update_data: List[Tuple[int, BaseModel]],
+    ) -> List[BatchResult]:
+        """
+        Update many objects in one transaction.
+
+        Target rows are locked with a single `id = ANY(...)` query, then the
+        updates are sent as one executemany of the shared update statement,
+        and the updated rows are read back with one more query. If the
+        database rejects the batch, its items are retried one by one inside
+        savepoints so only the offending items fail.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            update_data (List[Tuple[int, BaseModel]]): Pairs of object ID and
+            the data to update that object with.
+
+        Raises:
+            SQLAlchemyError: If any error occurs during the database operation.
+
+        Returns:
+            List[BatchResult]: One result per item, in input order.
+        """
+        if not update_data:
+            return []
+        ids = [obj_id for obj_id, _ in update_data]
+        try:
+            statement = (
+                select(self.model.id)
+                .where(self.model.id == any_(self._ids_param(ids)))
+                .with_for_update()
+            )
+            existing = set((await db.execute(statement)).scalars().all())
+
+            errors: Dict[int, str] = {}
+            indexes: List[int] = []
+            for index, (obj_id, data) in enumerate(update_data):
+                if obj_id not in existing:
+                    errors[index] = self._not_found(obj_id)
+                elif data.model_fields_set:
+                    indexes.append(index)
+
+            params = [
+                self._update_params(*update_data[index]) for index in indexes
+            ]
+            if params:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(self._update_stmt, params)
+                except DBAPIError:
+                    for index, row in zip(indexes, params):
+                        try:
+                            async with db.begin_nested():
+                                await db.execute(self._update_stmt, [row])
+                        except DBAPIError as err:
+                            errors[index] = _db_error(err)
+
+            statement = (
+                select(self.model)
+                .where(self.model.id == any_(self._ids_param(ids)))
+                .execution_options(populate_existing=True)
+            )
+            objects = {
+                obj.id: obj for obj in (await db.execute(statement)).scalars()
+            }
+            await db.commit()
+            for obj in objects.values():
+                await self._cache_set(obj)
+            return [
+                (
+                    BatchResult(error=errors[index])
+                    if index in errors
+                    else BatchResult(obj=objects[obj_id])
                 )
+                for index, (obj_id, _) in enumerate(update_data)
+            ]
 
-            statement = delete(self.model).where(self.model.id == obj_id)
-            await db.execute(statement)
+        except SQLAlchemyError as err:
+            await db.rollback()
+            raise RuntimeError(
+                "Failed to update objects in the database."
+            ) from err
+
+    async def remove_many(
+        self,
+        db: AsyncSession,
+        obj_ids: List[int],
+    ) -> List[int]:
+        """
+        Remove many objects with one `DELETE ... WHERE id = ANY(...)`.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            obj_ids (List[int]): The IDs of the objects to be removed.
+
+        Raises:
+            SQLAlchemyError: If any error occurs during the database operation.
+
+        Returns:
+            List[int]: The IDs that existed and were removed.
+        """
+        if not obj_ids:
+            return []
+        try:
+            statement = (
+                delete(self.model)
+                .where(self.model.id == any_(self._ids_param(obj_ids)))
+                .returning(self.model.id)
+            )
+            result = await self._execute_single(db, statement)
+            removed = list(result.scalars().all())
+            for obj_id in removed:
+                await self._cache_delete(obj_id)
+            return removed
+
+        except SQLAlchemyError as err:
+            await db.rollback()
+            raise RuntimeError(
+                "Failed to remove objects from the database."
+            ) from err
+
+    async def copy_records(
+        self,
+        db: AsyncSession,
+        chunks: AsyncIterator[List[Tuple[Any, ...]]],
+        columns: List[str],
+    ) -> int:
+        """
+        Load records into the table with binary COPY.
+
+        Every chunk is sent with asyncpg's `copy_records_to_table` inside one
+        transaction, and the ID sequence is moved past the largest ID
+        afterwards, so imported IDs never collide with later inserts.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            chunks (AsyncIterator[List[Tuple[Any, ...]]]): Records to load,
+            in chunks; every record follows `columns`.
+            columns (List[str]): The table columns of a record.
+
+        Raises:
+            ImportFailed: If the database rejects the data.
+            SQLAlchemyError: If any error occurs during the database operation.
+
+        Returns:
+            int: The number of records loaded.
+        """
+        table = self.model.__table__
+        copied = 0
+        try:
+            connection = await db.connection()
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            async with driver_connection.transaction():
+                async for records in chunks:
+                    await driver_connection.copy_records_to_table(
+                        table.name, records=records, columns=columns
+                    )
+                    copied += len(records)
+                await driver_connection.execute(
+                    "SELECT setval(pg_get_serial_sequence($1, 'id'), "
+                    f'COALESCE(MAX(id), 0) + 1, false) FROM "{table.name}"',
+                    f'"{table.name}"',
+                )
             await db.commit()
+            return copied
 
+        except PostgresError as err:
+            await db.rollback()
+            raise ImportFailed(str(err)) from err
+        except ImportFailed:
+            await db.rollback()
+            raise
         except SQLAlchemyError as err:
             await db.rollback()
             raise RuntimeError(
-                "Failed to remove object from the database."
+                "Failed to import objects into the database."
+            ) from err
+
+    async def copy_chunk(
+        self,
+        db: AsyncSession,
+        records: List[Tuple[Any, ...]],
+        columns: List[str],
+    ) -> None:
+        """
+        Load one chunk of records with binary COPY in the session's open
+        transaction, without committing.
+
+        The session must have run a statement in its transaction already,
+        so the COPY is committed or rolled back together with it. If the
+        records carry IDs, the ID sequence is moved past the largest one.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            records (List[Tuple[Any, ...]]): The records; every record
+            follows `columns`.
+            columns (List[str]): The table columns of a record.
+
+        Raises:
+            ImportFailed: If the database rejects the data.
+            RuntimeError: If no transaction is open on the connection.
+        """
+        table = self.model.__table__
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if not driver_connection.is_in_transaction():
+            raise RuntimeError("COPY would not be part of the transaction.")
+        try:
+            await driver_connection.copy_records_to_table(
+                table.name, records=records, columns=columns
+            )
+            if "id" in columns:
+                await driver_connection.execute(
+                    "SELECT setval(pg_get_serial_sequence($1, 'id'), "
+                    f'COALESCE(MAX(id), 0) + 1, false) FROM "{table.name}"',
+                    f'"{table.name}"',
+                )
+        except PostgresError as err:
+            raise ImportFailed(str(err)) from err
+
+    async def update_next(
+        self,
+        db: AsyncSession,
+        update_data: BaseModel,
+        filters: List[Any],
+        after_id: int,
+        limit: int,
+    ) -> List[int]:
+        """
+        Update the next objects matching the filters, in ID order, in the
+        session's transaction, without committing.
+
+        Walking the table by ID lets a mass update run as a series of short
+        transactions that each pick up where the previous one stopped. The
+        changed objects stay in the cache until `evict` is called after the
+        commit.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            update_data (BaseModel): The fields to set on every object.
+            filters (List[Any]): SQL conditions the objects must satisfy.
+            after_id (int): Only objects with a greater ID are changed.
+            limit (int): The most objects changed.
+
+        Raises:
+            ObjectAlreadyExists: If the data violates a unique constraint.
+
+        Returns:
+            List[int]: The IDs of the changed objects, ascending.
+        """
+        table = self.model.__table__
+        values = {
+            column: value
+            for column, value in update_data.model_dump(
+                exclude_unset=True
+            ).items()
+            if column in self._columns
+        }
+        ids = (
+            select(table.c.id)
+            .where(table.c.id > after_id, *filters)
+            .order_by(table.c.id)
+            .limit(limit)
+        )
+        statement = (
+            update(table)
+            .where(table.c.id.in_(ids))
+            .values(values)
+            .returning(table.c.id)
+        )
+        try:
+            result = await db.execute(statement)
+        except IntegrityError as err:
+            raise ObjectAlreadyExists(
+                object_name=self.model.__name__, reason=_db_error(err)
             ) from err
+        return sorted(result.scalars().all())
+
+    async def evict(self, obj_ids: Sequence[int]) -> None:
+        """
+        Drop objects changed by `update_next` from the cache.
+        """
+        for obj_id in obj_ids:
+            await self._cache_delete(obj_id)
+
+    async def prepare(
+        self,
+        db: AsyncSession,
+        page_columns: Sequence[Sequence[str]] = (),
+    ) -> None:
+        """
+        Prepare the statements of the hot queries on the session's
+        connection.
+
+        Reading (alone and batched), updating and deleting by ID run once
+        with an ID no object has, so nothing is read or changed, and the
+        statements stay in the connection's prepared statement cache.
+        `create` is left out: its statement depends on the fields given, and
+        running it would use up a sequence value.
+
+        Args:
+            db (AsyncSession): A session bound to one connection. The caller
+            rolls its transaction back.
+            page_columns (Sequence[Sequence[str]]): Column sets of
+            `read_multi_rows` pages, in the default order and paged by
+            offset, and of `read_many` lookups to prepare.
+        """
+        table = self.model.__table__
+        params: Dict[str, Any] = {"b_id": 0}
+        for column in self._columns:
+            params[f"s_{column}"] = False
+            params[f"b_{column}"] = None
+        await db.execute(select(self.model).where(self.model.id == 0))
+        await db.execute(
+            select(*self._output_columns).where(
+                table.c.id == any_(self._ids_param([]))
+            )
+        )
+        await db.execute(self._update_returning_stmt, params)
+        if self.version_key is not None:
+            column = getattr(self.model, self.version_key)
+            await db.execute(select(column).where(self.model.id == 0))
+            await db.execute(
+                self._update_if_version_stmt, {**params, "b_versions": []}
+            )
+        await db.execute(self._delete_stmt, {"b_id": 0})
+        for columns in page_columns:
+            statement = self._page_statement(
+                select(*(table.c[name] for name in columns)),
+                1,
+                0,
+                None,
+                self.sort_keys[0],
+                None,
+            )
+            await db.execute(statement)
+            await db.execute(self._read_many_statement(columns, []))
+
+    def _loader(self, engine: AsyncEngine, cache_rows: bool) -> BatchLoader:
+        """
+        Return the loader of reads by ID on an engine, creating it on first
+        use. With `cache_rows`, the rows it reads are cached.
+        """
+        return batcher_for(
+            self.loaders,
+            (engine, cache_rows),
+            lambda: BatchLoader(
+                partial(self._load_by_ids, engine, cache_rows=cache_rows),
+                window=self.batch_window,
+                max_batch_size=self.batch_max_size,
+            ),
+        )
+
+    def _writer(self, engine: AsyncEngine) -> BatchWriter:
+        """
+        Return the writer of creates on an engine, creating it on first use.
+        """
+        return batcher_for(
+            self.writers,
+            engine,
+            lambda: BatchWriter(
+                partial(self._insert_rows, engine),
+                window=self.write_batch_window,
+                max_batch_size=self.write_batch_max_size,
+            ),
+        )
+
+    async def _insert_rows(
+        self, engine: AsyncEngine, rows: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Insert the rows of a batch of creates in one transaction.
+
+        All rows are sent with one multi-row INSERT. If the database rejects
+        it, the rows are inserted one by one inside savepoints, so only the
+        offending rows fail.
+
+        Returns:
+            List[Union[Dict[str, Any], Exception]]: The column values of
+            every created object, or the error that rejected its row, in
+            the order of `rows`.
+        """
+        async with engine.connect() as connection:
+            try:
+                async with connection.begin():
+                    result = await connection.execute(
+                        self._insert_many_stmt, rows
+                    )
+                    return [row._asdict() for row in result]
+            except DBAPIError:
+                pass
+            outcomes: List[Union[Dict[str, Any], Exception]] = []
+            async with connection.begin():
+                for row in rows:
+                    try:
+                        async with connection.begin_nested():
+                            result = await connection.execute(
+                                self._insert_stmt, row
+                            )
+                            outcomes.append(result.one()._asdict())
+                    except DBAPIError as err:
+                        outcomes.append(err)
+            return outcomes
+
+    async def _load_by_ids(
+        self, engine: AsyncEngine, obj_ids: List[int], cache_rows: bool
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Read the rows of objects by ID in one autocommit query and, with
+        `cache_rows`, cache them.
+
+        Returns:
+            Dict[int, Dict[str, Any]]: The column values of the objects
+            found, by ID.
+        """
+        table = self.model.__table__
+        statement = select(*self._output_columns).where(
+            table.c.id == any_(self._ids_param(obj_ids))
+        )
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            result = await connection.execute(statement)
+            rows = {row.id: row._asdict() for row in result}
+        if self.cache is not None and cache_rows:
+            for obj_id, data in rows.items():
+                await self.cache.set(self.model.__name__, obj_id, data)
+        return rows
+
+    async def _cache_set(self, obj: Base) -> None:
+        """
+        Store the current column values of an object in the cache.
+        """
+        if self.cache is not None:
+            data = {
+                column.key: getattr(obj, column.key)
+                for column in self._output_columns
+            }
+            await self.cache.set(self.model.__name__, obj.id, data)
+
+    async def _cache_delete(self, obj_id: int) -> None:
+        """
+        Drop an object from the cache.
+        """
+        if self.cache is not None:
+            await self.cache.delete(self.model.__name__, obj_id)
+
+    async def _execute_single(
+        self,
+        db: AsyncSession,
+        statement: Any,
+        params: Optional[Any] = None,
+        commit: bool = True,
+    ) -> Result:
+        """
+        Run one statement in a single round trip.
+
+        Outside a transaction the session's connection is switched to
+        autocommit for this statement, so neither `BEGIN` nor `COMMIT` is
+        sent, and the connection is released right after. Inside a
+        transaction the statement joins it, and the transaction is
+        committed only if `commit` is set.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            statement (Any): The statement to execute.
+            params (Optional[Any]): Its bind parameters.
+            commit (bool): Whether to commit a transaction already open on
+            the session.
+
+        Returns:
+            Result: The buffered result of the statement.
+        """
+        if not db.in_transaction():
+            await db.connection(
+                execution_options={"isolation_level": "AUTOCOMMIT"}
+            )
+            commit = True
+        result = await db.execute(statement, params)
+        if commit:
+            await db.commit()
+        return result
+
+    def _update_params(self, obj_id: int, data: BaseModel) -> Dict[str, Any]:
+        """
+        Build the bind parameters of the update statement for one object.
+
+        Every column gets a value and an `s_` flag telling whether to set
+        it, so the statement is the same whichever fields are changed.
+        """
+        values = data.model_dump(exclude_unset=True)
+        params: Dict[str, Any] = {"b_id": obj_id}
+        for column in self._columns:
+            params[f"s_{column}"] = column in values
+            params[f"b_{column}"] = values.get(column)
+        return params
+
+    @staticmethod
+    def _ids_param(obj_ids: List[int]) -> Any:
+        """
+        Bind a list of IDs as a single array parameter for `= ANY(...)`.
+        """
+        return bindparam("ids", value=list(obj_ids), type_=ARRAY(Integer))
+
+    def _not_found(self, obj_id: int) -> str:
+        """
+        Build the per-item error message for a missing object.
+        """
+        return ObjectNotFound(
+            object_name=self.model.__name__, object_id=obj_id
+        ).detail
+
+
+def _db_error(err: DBAPIError) -> str:
+    """
+    Extract a client-facing message from a database error.
+
+    Args:
+        err (DBAPIError): The error raised by the driver.
+
+    Returns:
+        str: The first line of the driver's message.
+    """
+    orig = err.orig.__cause__ or err.orig
+    return str(orig).split("\n")[0]
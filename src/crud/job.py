@@ -0,0 +1,310 @@
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import any_, func, insert, or_, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.job import Job
+from schemas.job import JobStatus
+
+from .base import CRUDBase
+
+# matches the predicate of the partial index ix_job_active
+_ACTIVE = text("job.status IN ('queued', 'running')")
+
+
+class CRUDJob(CRUDBase):
+    """
+    CRUDJob class that extends CRUDBase to provide the bookkeeping of
+    background jobs.
+
+    A job is held by one worker at a time through a lease: the worker's
+    name in `worker` and a `heartbeat_at` it keeps fresh. Every write made
+    while running checks the lease, so a worker that lost its job to
+    another one (because it stalled past the stale timeout) cannot record
+    anything for it any more.
+
+    Inherits:
+        CRUDBase: A generic CRUD class for managing SQLAlchemy models.
+    """
+
+    async def enqueue(
+        self, db: AsyncSession, kind: str, params: Dict[str, Any]
+    ) -> Job:
+        """
+        Submit a job.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            kind (str): What the job does.
+            params (Dict[str, Any]): Its input, stored as JSON.
+
+        Returns:
+            Job: The queued job.
+        """
+        statement = insert(Job).values(kind=kind, params=params).returning(Job)
+        result = await self._execute_single(db, statement)
+        return result.scalar_one()
+
+    async def claim(
+        self,
+        db: AsyncSession,
+        worker: str,
+        stale_after: float,
+        max_attempts: int,
+    ) -> Optional[Job]:
+        """
+        Take the oldest job that is queued or whose worker went silent.
+
+        Rows locked by other workers' claims are skipped, so concurrent
+        claims never block each other or take the same job.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            worker (str): The name of the claiming worker.
+            stale_after (float): Seconds without a heartbeat after which a
+            running job is free to take.
+            max_attempts (int): Jobs started this often are not taken.
+
+        Returns:
+            Optional[Job]: The job, now running on `worker`, or None.
+        """
+        candidate = (
+            select(Job.id)
+            .where(
+                _ACTIVE,
+                or_(
+                    Job.status == JobStatus.queued.value,
+                    Job.heartbeat_at
+                    < func.now() - timedelta(seconds=stale_after),
+                ),
+                Job.attempts < max_attempts,
+            )
+            .order_by(Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        statement = (
+            update(Job)
+            .where(Job.id == candidate)
+            .values(
+                status=JobStatus.running.value,
+                worker=worker,
+                heartbeat_at=func.now(),
+                started_at=func.coalesce(Job.started_at, func.now()),
+                attempts=Job.attempts + 1,
+            )
+            .returning(Job)
+        )
+        result = await self._execute_single(db, statement)
+        return result.scalar_one_or_none()
+
+    async def abandon(
+        self, db: AsyncSession, stale_after: float, max_attempts: int
+    ) -> List[Job]:
+        """
+        Fail the jobs whose worker went silent on their last attempt.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            stale_after (float): Seconds without a heartbeat after which a
+            worker is considered gone.
+            max_attempts (int): How many attempts a job gets.
+
+        Returns:
+            List[Job]: The jobs given up.
+        """
+        statement = (
+            update(Job)
+            .where(
+                _ACTIVE,
+                Job.status == JobStatus.running.value,
+                Job.heartbeat_at < func.now() - timedelta(seconds=stale_after),
+                Job.attempts >= max_attempts,
+            )
+            .values(
+                status=JobStatus.failed.value,
+                error=f"Gave up after {max_attempts} attempts",
+                worker=None,
+                finished_at=func.now(),
+            )
+            .returning(Job)
+        )
+        result = await self._execute_single(db, statement)
+        return list(result.scalars().all())
+
+    async def heartbeat(
+        self, db: AsyncSession, worker: str, job_ids: List[int]
+    ) -> None:
+        """
+        Renew the leases a worker holds on its running jobs.
+        """
+        statement = (
+            update(Job)
+            .where(
+                Job.id == any_(self._ids_param(job_ids)),
+                Job.worker == worker,
+            )
+            .values(heartbeat_at=func.now())
+        )
+        await self._execute_single(db, statement)
+
+    async def check_lease(
+        self, db: AsyncSession, job_id: int, worker: str
+    ) -> Optional[bool]:
+        """
+        Start a step of a running job in the session's transaction.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            job_id (int): The ID of the job.
+            worker (str): The worker running it.
+
+        Returns:
+            Optional[bool]: Whether the job was asked to stop, or None if
+            the worker no longer holds it.
+        """
+        statement = select(Job.cancel_requested).where(
+            Job.id == job_id,
+            Job.worker == worker,
+            Job.status == JobStatus.running.value,
+        )
+        result = await db.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def save_progress(
+        self,
+        db: AsyncSession,
+        job_id: int,
+        worker: str,
+        checkpoint: Dict[str, Any],
+        report: Dict[str, Any],
+        processed: int,
+        total: Optional[int],
+    ) -> bool:
+        """
+        Record the progress of a step in the session's transaction, without
+        committing, so it is kept exactly when the work of the step is.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            job_id (int): The ID of the job.
+            worker (str): The worker running it.
+            checkpoint (Dict[str, Any]): Where the job continues if resumed.
+            report (Dict[str, Any]): What the job has done so far.
+            processed (int): Items processed so far.
+            total (Optional[int]): Items to process, if known.
+
+        Returns:
+            bool: False if the worker no longer holds the job.
+        """
+        statement = (
+            update(Job)
+            .where(
+                Job.id == job_id,
+                Job.worker == worker,
+                Job.status == JobStatus.running.value,
+            )
+            .values(
+                checkpoint=checkpoint,
+                report=report,
+                processed=processed,
+                total=total,
+                heartbeat_at=func.now(),
+            )
+        )
+        result = await db.execute(statement)
+        return result.rowcount == 1
+
+    async def finish(
+        self,
+        db: AsyncSession,
+        job_id: int,
+        worker: str,
+        status: JobStatus,
+        error: Optional[str] = None,
+    ) -> bool:
+        """
+        End a job held by a worker.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            job_id (int): The ID of the job.
+            worker (str): The worker running it.
+            status (JobStatus): The final status.
+            error (Optional[str]): Why the job failed.
+
+        Returns:
+            bool: False if the worker no longer held the job.
+        """
+        statement = (
+            update(Job)
+            .where(Job.id == job_id, Job.worker == worker)
+            .values(
+                status=status.value,
+                error=error,
+                worker=None,
+                finished_at=func.now(),
+            )
+        )
+        result = await self._execute_single(db, statement)
+        return result.rowcount == 1
+
+    async def release(self, db: AsyncSession, worker: str) -> None:
+        """
+        Queue the running jobs of a stopping worker again, so any worker
+        resumes them from their last checkpoint right away. The interrupted
+        attempt does not count.
+        """
+        statement = (
+            update(Job)
+            .where(
+                _ACTIVE,
+                Job.status == JobStatus.running.value,
+                Job.worker == worker,
+            )
+            .values(
+                status=JobStatus.queued.value,
+                worker=None,
+                attempts=Job.attempts - 1,
+            )
+        )
+        await self._execute_single(db, statement)
+
+    async def request_cancel(
+        self, db: AsyncSession, job_id: int
+    ) -> Optional[Job]:
+        """
+        Ask a job to stop. A queued job is cancelled when a worker next
+        picks it up, a running one after its current step; a job that has
+        ended is left as it is.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            job_id (int): The ID of the job.
+
+        Returns:
+            Optional[Job]: The job, or None if no job has the ID.
+        """
+        statement = (
+            update(Job)
+            .where(Job.id == job_id, _ACTIVE)
+            .values(cancel_requested=True)
+            .returning(Job)
+        )
+        result = await self._execute_single(db, statement)
+        job = result.scalar_one_or_none()
+        if job is None:
+            job = await self.read_by_id(db, job_id)
+        return job
+
+
+crud_job = CRUDJob(Job)
+"""
+An instance of CRUDJob for managing Job objects.
+
+This instance is used by the job runner and the jobs endpoints to submit,
+claim, checkpoint and end background jobs.
+"""
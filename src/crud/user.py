@@ -1,5 +1,87 @@
-from crud.base import CRUDBase
-from models.user import User
+import asyncio
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from asyncpg import PostgresError
+from sqlalchemy import (
+    any_,
+    bindparam,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal_column,
+    select,
+    text,
+    update,
+)
+from sqlalchemy import table as table_clause
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configs import app_settings, cache_settings
+from crud.base import CRUDBase, _db_error
+from models.user import CONTENT_HASH, SEARCH_CONFIG, User
+from schemas import UserCreate
+from utilities.cache import LocalCache, build_model_cache
+from utilities.exceptions import ImportFailed
+from utilities.importer import ImportReport, read_rows, validate_chunk
+
+# advisory lock held by a reconciliation, so that two of them never remove
+# the users of each other's snapshots
+_RECONCILE_LOCK = 0x7573657273796E63
+
+# Temporary table a snapshot is loaded into. Its digest is computed like
+# `User.content_hash`, so unchanged users are found by comparing digests.
+_SNAPSHOT = table_clause(
+    "user_snapshot",
+    column("id"),
+    *(column(name) for name in UserCreate.model_fields),
+    column("valid"),
+    column("content_hash"),
+)
+_CREATE_SNAPSHOT = text(
+    "CREATE TEMPORARY TABLE user_snapshot ("
+    "id integer NOT NULL, "
+    + "".join(f"{name} varchar(255), " for name in UserCreate.model_fields)
+    + "valid boolean NOT NULL DEFAULT true, "
+    f"content_hash bytea GENERATED ALWAYS AS ({CONTENT_HASH}) STORED"
+    ") ON COMMIT DROP"
+)
+
+
+@dataclass
+class ReconcileReport:
+    """
+    Summary of a reconciliation with a snapshot.
+
+    Attributes:
+        inserted (int): Users in the snapshot only, created.
+        updated (int): Users whose data differed, changed.
+        deleted (int): Users missing from the snapshot, removed.
+        unchanged (int): Users equal to their row of the snapshot.
+        rejected (int): Rows that failed validation; their users were left
+        as they are.
+        errors (List[Tuple[int, str]]): Row number and reason of the first
+        rejected rows.
+    """
+
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
 
 
 class CRUDUser(CRUDBase):
@@ -13,10 +95,398 @@ class CRUDUser(CRUDBase):
         CRUDBase: A generic CRUD class for managing SQLAlchemy models.
     """
 
-    ...
+    sort_keys = ("id", "name")
+    version_key = "version"
+
+    def build_filters(
+        self,
+        ids: Optional[List[int]] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Any]:
+        """
+        Build the list filters of `read_multi`, each backed by an index.
+
+        Args:
+            ids (Optional[List[int]]): IDs, matched through the primary key.
+            email (Optional[str]): Exact email, compared case-insensitively
+            through the unique index on lower(email).
+            phone (Optional[str]): Exact phone number.
+            name_prefix (Optional[str]): Case-sensitive prefix of the name,
+            served by the text_pattern_ops index on name.
+
+        Returns:
+            List[Any]: The SQL conditions of the given filters.
+        """
+        filters = []
+        if ids is not None:
+            filters.append(User.id == any_(self._ids_param(ids)))
+        if email is not None:
+            filters.append(func.lower(User.email) == email.lower())
+        if phone is not None:
+            filters.append(User.phone == phone)
+        if name_prefix is not None:
+            escaped = (
+                name_prefix.replace("\\", "\\\\")
+                .replace("%", "\\%")
+                .replace("_", "\\_")
+            )
+            # rendered inline, so the planner can turn the constant prefix
+            # into an index range even under a generic prepared plan
+            pattern = bindparam(
+                "name_prefix", value=escaped + "%", literal_execute=True
+            )
+            filters.append(User.name.like(pattern, escape="\\"))
+        return filters
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        columns: Sequence[str],
+        limit: int = 20,
+        offset: int = 0,
+        highlight: bool = False,
+        max_candidates: int = 0,
+    ) -> Sequence[Row]:
+        """
+        Find users whose name or note contains the words of a query.
+
+        The query uses web search syntax (`"quoted phrase"`, `or`, `-word`)
+        and is matched against `search_vector` through its GIN index, so
+        only matching rows are read. Matches are ranked by cover density,
+        with words of the name weighing more than words of the note, and
+        ties are broken by ID.
+
+        Ranking has to look at every match, so for words found in a large
+        share of the table `max_candidates` bounds the work: only that many
+        matches, those with the lowest IDs, are ranked. The results are then
+        the best of a sample, but the same sample for every page, so pages
+        neither overlap nor skip rows.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            query (str): The search terms.
+            columns (Sequence[str]): The columns to select, in output order.
+            limit (int): Limit of rows in response.
+            offset (int): Offset in the ranked results.
+            highlight (bool): Whether to add `name_highlight` and
+            `note_highlight`, the name and note with every match wrapped in
+            `<mark>` tags. They are built for the rows of the page only.
+            max_candidates (int): The most matches ranked, or 0 to rank
+            them all.
+
+        Returns:
+            Sequence[Row]: The rows of the page, each with its `rank`.
+        """
+        config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        tsquery = func.websearch_to_tsquery(config, query)
+        table = User.__table__
+        matches = select(*(table.c[name] for name in columns)).where(
+            table.c.search_vector.op("@@")(tsquery)
+        )
+        if max_candidates > 0:
+            candidates = (
+                matches.add_columns(table.c.search_vector)
+                .order_by(table.c.id)
+                .limit(max_candidates)
+                .subquery()
+            )
+            matches = select(
+                *(candidates.c[name].label(name) for name in columns)
+            )
+            vector = candidates.c.search_vector
+            obj_id = candidates.c.id
+        else:
+            vector = table.c.search_vector
+            obj_id = table.c.id
+        rank = func.ts_rank_cd(vector, tsquery).label("rank")
+        statement = (
+            matches.add_columns(rank)
+            .order_by(rank.desc(), obj_id)
+            .limit(limit)
+            .offset(offset)
+        )
+        if highlight:
+            page = statement.subquery()
+            options = "StartSel=<mark>, StopSel=</mark>, HighlightAll=true"
+            statement = select(
+                *(page.c[name].label(name) for name in (*columns, "rank")),
+                func.ts_headline(config, page.c.name, tsquery, options).label(
+                    "name_highlight"
+                ),
+                func.ts_headline(config, page.c.note, tsquery, options).label(
+                    "note_highlight"
+                ),
+            ).order_by(page.c.rank.desc(), page.c.id)
+        result = await self._execute_single(db, statement, commit=False)
+        return result.all()
+
+    def import_columns(self, header: List[str]) -> List[str]:
+        """
+        Choose the table columns loaded from an import file.
+
+        Args:
+            header (List[str]): The column names of the file.
+
+        Raises:
+            ImportFailed: If a field of `UserCreate` has no column.
+
+        Returns:
+            List[str]: The `UserCreate` fields, after `id` if the file has
+            one.
+        """
+        missing = [
+            name for name in UserCreate.model_fields if name not in header
+        ]
+        if missing:
+            raise ImportFailed(f"missing columns: {', '.join(missing)}")
+        columns = ["id"] if "id" in header else []
+        return columns + list(UserCreate.model_fields)
+
+    async def import_file(
+        self,
+        db: AsyncSession,
+        file: BinaryIO,
+        file_format: str,
+        chunk_size: int = 5000,
+        max_errors: int = 1000,
+    ) -> ImportReport:
+        """
+        Import users from a CSV or XLSX file.
+
+        Rows are read and validated with the `UserCreate` rules in chunks of
+        `chunk_size` in a worker thread, and valid rows are loaded with
+        binary COPY as soon as each chunk is ready. Invalid rows are skipped
+        and reported. If the file has an `id` column, IDs are kept.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            file (BinaryIO): The file to import.
+            file_format (str): Either `csv` or `xlsx`.
+            chunk_size (int): The number of rows per validation/COPY chunk.
+            max_errors (int): How many rejected rows to report in detail.
+
+        Raises:
+            ImportFailed: If the file is malformed, lacks a required column
+            or the database rejects the data. Nothing is imported then.
+
+        Returns:
+            ImportReport: The number of imported and rejected rows.
+        """
+        report = ImportReport(max_errors=max_errors)
+        header, rows = await asyncio.to_thread(read_rows, file, file_format)
+        columns = self.import_columns(header)
+
+        async def chunks() -> AsyncIterator[List[Tuple[Any, ...]]]:
+            consumed, exhausted = 0, False
+            while not exhausted:
+                records, consumed, exhausted = await asyncio.to_thread(
+                    validate_chunk,
+                    rows,
+                    UserCreate,
+                    columns,
+                    report,
+                    chunk_size,
+                    consumed,
+                )
+                if records:
+                    yield records
+
+        report.imported = await self.copy_records(
+            db=db, chunks=chunks(), columns=columns
+        )
+        return report
+
+    async def reconcile(
+        self,
+        db: AsyncSession,
+        file: BinaryIO,
+        file_format: str,
+        chunk_size: int = 5000,
+        max_errors: int = 1000,
+        dry_run: bool = False,
+    ) -> ReconcileReport:
+        """
+        Make the users match a full snapshot, changing only what differs.
+
+        The snapshot is validated like an import and loaded with binary COPY
+        into a temporary table, which computes the digest of every row.
+        Then three set-based statements remove the users missing from the
+        snapshot, update those whose digest differs from `content_hash`,
+        and create the new ones, all in one transaction. Unchanged users
+        are only read, through an index-only scan of (id, content_hash),
+        so the writes, index updates and logged changes follow the churn
+        and not the size of the snapshot.
+
+        Users of rows that fail validation are neither changed nor
+        removed.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            file (BinaryIO): The snapshot, with an `id` column.
+            file_format (str): Either `csv` or `xlsx`.
+            chunk_size (int): The number of rows per validation/COPY chunk.
+            max_errors (int): How many rejected rows to report in detail.
+            dry_run (bool): Whether to roll the changes back and only
+            report them.
+
+        Raises:
+            ImportFailed: If the file is malformed, lacks a required column,
+            has no valid row, repeats an ID or has a rejected row without a
+            valid ID, or if the database rejects the changes. Nothing is
+            changed then.
+
+        Returns:
+            ReconcileReport: The number of users of every kind of change.
+        """
+        import_report = ImportReport(max_errors=max_errors)
+        header, rows = await asyncio.to_thread(read_rows, file, file_format)
+        columns = self.import_columns(header)
+        if "id" not in columns:
+            raise ImportFailed("missing columns: id")
+
+        user = self.model.__table__
+        fields = list(UserCreate.model_fields)
+        rejected_ids: List[Optional[int]] = []
+        try:
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"),
+                {"key": _RECONCILE_LOCK},
+            )
+            await db.execute(_CREATE_SNAPSHOT)
+            connection = await db.connection()
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            loaded, consumed, exhausted = 0, 0, False
+            while not exhausted:
+                records, consumed, exhausted = await asyncio.to_thread(
+                    validate_chunk,
+                    rows,
+                    UserCreate,
+                    columns,
+                    import_report,
+                    chunk_size,
+                    consumed,
+                    rejected_ids,
+                )
+                if records:
+                    await driver_connection.copy_records_to_table(
+                        _SNAPSHOT.name, records=records, columns=columns
+                    )
+                    loaded += len(records)
+            if None in rejected_ids:
+                raise ImportFailed(
+                    "a rejected row has no valid id, so its user cannot be "
+                    "told from a removed one"
+                )
+            if not loaded:
+                raise ImportFailed("the snapshot has no valid rows")
+            if rejected_ids:
+                # kept in the snapshot, so their users are not removed
+                await driver_connection.copy_records_to_table(
+                    _SNAPSHOT.name,
+                    records=[(obj_id, False) for obj_id in rejected_ids],
+                    columns=["id", "valid"],
+                )
+            # built after loading, which is faster, and it catches
+            # duplicate IDs; temporary tables are never analyzed otherwise
+            await db.execute(
+                text("ALTER TABLE user_snapshot ADD PRIMARY KEY (id)")
+            )
+            await db.execute(text("ANALYZE user_snapshot"))
+
+            deleted = await db.execute(
+                delete(user)
+                .where(~exists().where(_SNAPSHOT.c.id == user.c.id))
+                .returning(user.c.id)
+            )
+            deleted_ids = deleted.scalars().all()
+            updated = await db.execute(
+                update(user)
+                .where(
+                    user.c.id == _SNAPSHOT.c.id,
+                    _SNAPSHOT.c.valid,
+                    _SNAPSHOT.c.content_hash != user.c.content_hash,
+                )
+                .values({name: _SNAPSHOT.c[name] for name in fields})
+                .returning(user.c.id)
+            )
+            updated_ids = updated.scalars().all()
+            inserted = await db.execute(
+                insert(user)
+                .from_select(
+                    ["id", *fields],
+                    select(
+                        _SNAPSHOT.c.id,
+                        *(_SNAPSHOT.c[name] for name in fields),
+                    ).where(
+                        _SNAPSHOT.c.valid,
+                        ~exists().where(user.c.id == _SNAPSHOT.c.id),
+                    ),
+                )
+                .returning(user.c.id)
+            )
+            inserted_count = len(inserted.all())
+            if inserted_count:
+                await db.execute(
+                    text(
+                        "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                        'COALESCE(MAX(id), 0) + 1, false) FROM "user"'
+                    ),
+                    {"table": '"user"'},
+                )
+        except PostgresError as err:
+            await db.rollback()
+            raise ImportFailed(str(err)) from err
+        except DBAPIError as err:
+            await db.rollback()
+            raise ImportFailed(_db_error(err)) from err
+        except ImportFailed:
+            await db.rollback()
+            raise
+
+        if dry_run:
+            await db.rollback()
+        else:
+            await db.commit()
+            await self.evict([*deleted_ids, *updated_ids])
+        return ReconcileReport(
+            inserted=inserted_count,
+            updated=len(updated_ids),
+            deleted=len(deleted_ids),
+            unchanged=loaded - len(updated_ids) - inserted_count,
+            rejected=import_report.rejected,
+            errors=import_report.errors,
+        )
 
 
-crud_user = CRUDUser(User)
+crud_user = CRUDUser(
+    User,
+    cache=build_model_cache(
+        enabled=cache_settings.CACHE_ENABLED,
+        max_size=cache_settings.CACHE_MAX_SIZE,
+        ttl=cache_settings.CACHE_TTL,
+        shared_path=cache_settings.CACHE_SHARED_PATH,
+    ),
+    count_cache=LocalCache(
+        max_size=cache_settings.COUNT_CACHE_MAX_SIZE,
+        ttl=cache_settings.COUNT_CACHE_TTL,
+    ),
+    batch_window=(
+        app_settings.READ_BATCH_WINDOW
+        if app_settings.READ_BATCH_ENABLED
+        else None
+    ),
+    batch_max_size=app_settings.READ_BATCH_MAX_SIZE,
+    write_batch_window=(
+        app_settings.WRITE_BATCH_WINDOW
+        if app_settings.WRITE_BATCH_ENABLED
+        else None
+    ),
+    write_batch_max_size=app_settings.WRITE_BATCH_MAX_SIZE,
+)
 """
 An instance of CRUDUser for managing User objects.
 
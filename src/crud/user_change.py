@@ -0,0 +1,173 @@
+from datetime import timedelta
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, text
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.user import User
+from models.user_change import UserChange
+
+from .base import CRUDBase
+
+# channel notified by the triggers on "user" when changes are logged
+CHANGE_CHANNEL = "user_change"
+
+# channel notified with the last sequence number when changes are numbered
+SEQUENCED_CHANNEL = "user_change_sequenced"
+
+# advisory lock held while changes are numbered, so only one worker at a
+# time does it
+_SEQUENCE_LOCK = 0x7573657263686E67
+
+# Changes whose transaction ended before every transaction still running
+# are numbered in log order after the highest number given so far. Such a
+# transaction either committed, and its changes are visible, or rolled
+# back, and they never will be; so no change can turn up later with a lower
+# number, and a stream that resumes after a number misses nothing.
+_SEQUENCE = text(
+    """
+    WITH settled AS (
+        SELECT id, row_number() OVER (ORDER BY id) AS n
+        FROM user_change
+        WHERE seq IS NULL
+          AND txid < pg_snapshot_xmin(pg_current_snapshot())
+    ), numbered AS (
+        UPDATE user_change
+        SET seq = last.seq + settled.n
+        FROM settled,
+             (SELECT coalesce(max(seq), 0) AS seq FROM user_change) AS last
+        WHERE user_change.id = settled.id
+        RETURNING user_change.seq
+    )
+    SELECT max(seq), pg_notify(:channel, max(seq)::text)
+    FROM numbered
+    HAVING count(*) > 0
+    """
+)
+
+
+class CRUDUserChange(CRUDBase):
+    """
+    CRUDUserChange class that extends CRUDBase to read and maintain the log
+    of changes to users behind the change feed.
+
+    Changes are logged by triggers with a `txid` but no number. Because
+    transactions commit in a different order than they write, numbers are
+    given afterwards by `sequence`, once the change can no longer be
+    overtaken, so that numbers grow in the order changes become visible.
+
+    Inherits:
+        CRUDBase: A generic CRUD class for managing SQLAlchemy models.
+    """
+
+    async def sequence(self, db: AsyncSession) -> Optional[int]:
+        """
+        Number the changes that are settled and notify the listeners.
+
+        Args:
+            db (AsyncSession): The asynchronous database session, outside a
+            transaction.
+
+        Returns:
+            Optional[int]: The highest number given, or None if no change
+            was numbered.
+        """
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"),
+            {"key": _SEQUENCE_LOCK},
+        )
+        # a new statement, so its snapshot is taken once the lock is held
+        result = await db.execute(_SEQUENCE, {"channel": SEQUENCED_CHANNEL})
+        latest = result.scalar_one_or_none()
+        await db.commit()
+        return latest
+
+    async def prune(self, db: AsyncSession, retention: float) -> int:
+        """
+        Delete numbered changes older than the retention period.
+
+        The last change is always kept, so numbering goes on from it.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            retention (float): Seconds changes are kept.
+
+        Returns:
+            int: The number of changes deleted.
+        """
+        statement = delete(UserChange).where(
+            UserChange.changed_at < func.now() - timedelta(seconds=retention),
+            UserChange.seq
+            < select(func.max(UserChange.seq)).scalar_subquery(),
+        )
+        result = await self._execute_single(db, statement)
+        return result.rowcount
+
+    async def bounds(
+        self, db: AsyncSession
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Return the lowest and highest numbers of the changes kept.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+
+        Returns:
+            Tuple[Optional[int], Optional[int]]: Both None if no change was
+            numbered yet.
+        """
+        statement = select(func.min(UserChange.seq), func.max(UserChange.seq))
+        result = await self._execute_single(db, statement, commit=False)
+        oldest, latest = result.one()
+        return oldest, latest
+
+    async def read_after(
+        self,
+        db: AsyncSession,
+        after: int,
+        limit: int,
+        columns: Sequence[str],
+    ) -> Sequence[Row]:
+        """
+        Read the changes numbered after a given one, with their users.
+
+        Args:
+            db (AsyncSession): The asynchronous database session.
+            after (int): The number of the last change already seen.
+            limit (int): The most changes to read.
+            columns (Sequence[str]): The columns of the user to read along.
+
+        Returns:
+            Sequence[Row]: Rows with the `seq`, `op`, `user_id`, `version`
+            and `changed_at` of the change, `found` telling whether the user
+            still exists, and its current columns, each labelled `u_{name}`.
+        """
+        table = User.__table__
+        statement = (
+            select(
+                UserChange.seq,
+                UserChange.op,
+                UserChange.user_id,
+                UserChange.version,
+                UserChange.changed_at,
+                table.c.id.is_not(None).label("found"),
+                *(table.c[name].label(f"u_{name}") for name in columns),
+            )
+            .outerjoin(User, User.id == UserChange.user_id)
+            .where(UserChange.seq > after)
+            .order_by(UserChange.seq)
+            .limit(limit)
+        )
+        result = await self._execute_single(db, statement, commit=False)
+        return result.all()
+
+
+crud_user_change = CRUDUserChange(UserChange)
+"""
+An instance of CRUDUserChange for managing UserChange objects.
+
+This instance is used by the change feed to number and prune changes and by
+the change stream endpoint to read them.
+"""
@@ -1,3 +1,38 @@
-from .database import get_async_session
+from .database import (
+    async_session,
+    connect,
+    disconnect,
+    get_async_session,
+    get_engine,
+    get_pool_stats,
+    get_profiler,
+    get_read_only_session,
+    get_replica_status,
+    get_slow_queries,
+    is_ready,
+    listen,
+    read_only_session,
+)
+from .profiler import QueryProfile, SlowQuery, profile_queries
+from .roundtrips import RoundTrips, count_round_trips
 
-__all__ = ("get_async_session",)
+__all__ = (
+    "QueryProfile",
+    "RoundTrips",
+    "SlowQuery",
+    "async_session",
+    "connect",
+    "disconnect",
+    "count_round_trips",
+    "get_async_session",
+    "get_engine",
+    "get_pool_stats",
+    "get_profiler",
+    "get_read_only_session",
+    "get_replica_status",
+    "get_slow_queries",
+    "is_ready",
+    "listen",
+    "profile_queries",
+    "read_only_session",
+)
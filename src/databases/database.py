@@ -1,40 +1,443 @@
-from typing import AsyncGenerator
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
+import asyncpg
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
-from configs import db_settings
+import configs
+from utilities.cache import SKIP_CACHE_READS, SKIP_CACHE_WRITES
+
+from .pool import InstrumentedAsyncPool
+from .profiler import QueryProfiler, SlowQuery
+from .replicas import ReplicaSet, is_disconnect
+from .roundtrips import instrument_engine
 
 """
 Database connection setup and session management using SQLAlchemy and asyncpg.
+
+Engines are created on first use, so importing this module neither reads the
+database settings nor connects; a worker creates them when it starts (see
+`connect`).
 """
 
+# requests with these methods only read, so they may use a replica
+READ_ONLY_METHODS = ("GET", "HEAD")
 
-SQLALCHEMY_DATABASE_URL = (
-    "postgresql+asyncpg://"
-    f"{db_settings.POSTGRES_USER}:"  # noqa E231
-    f"{db_settings.POSTGRES_PASSWORD}@"
-    f"{db_settings.POSTGRES_HOST}:"  # noqa E231
-    f"{db_settings.POSTGRES_PORT}/"
-    f"{db_settings.POSTGRES_DB}"
-)
+# cookie holding the time until which a client that wrote reads from the
+# primary
+PIN_COOKIE = "db-primary-until"
 
-async_engine = create_async_engine(url=SQLALCHEMY_DATABASE_URL, echo=False)
+# Prepares statements on a session bound to one connection.
+Preparer = Callable[[AsyncSession], Awaitable[None]]
 
-async_session = async_sessionmaker(
-    async_engine,
+_session_factory = async_sessionmaker(
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+_ready = False
+
+
+def database_url() -> str:
+    """
+    Build the URL of the primary database from the settings.
+    """
+    db_settings = configs.db_settings
+    return (
+        "postgresql+asyncpg://"
+        f"{db_settings.POSTGRES_USER}:"  # noqa E231
+        f"{db_settings.POSTGRES_PASSWORD}@"
+        f"{db_settings.POSTGRES_HOST}:"  # noqa E231
+        f"{db_settings.POSTGRES_PORT}/"
+        f"{db_settings.POSTGRES_DB}"
+    )
+
+
+def pool_limits() -> Tuple[int, int]:
+    """
+    Size the pool of each worker within the connection budget.
+
+    Returns:
+        Tuple[int, int]: The pool size and maximum overflow of one worker.
+        Without `DB_MAX_CONNECTIONS`, the configured values; otherwise the
+        configured values capped at the worker's share of the budget.
+    """
+    db_settings = configs.db_settings
+    pool_size = db_settings.DB_POOL_SIZE
+    max_overflow = db_settings.DB_MAX_OVERFLOW
+    if db_settings.DB_MAX_CONNECTIONS <= 0:
+        return pool_size, max_overflow
+    workers = max(configs.app_settings.APP_WORKERS, 1)
+    share = max(db_settings.DB_MAX_CONNECTIONS // workers, 1)
+    pool_size = min(pool_size, share)
+    return pool_size, min(max_overflow, share - pool_size)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Create an engine with the pool settings shared by all databases.
+
+    Args:
+        url (str): The database URL; any PostgreSQL driver name is replaced
+        with asyncpg.
+
+    Returns:
+        AsyncEngine: The engine, with round trip counting enabled, and
+        statement profiling if `PROFILER_ENABLED` is set.
+    """
+    db_settings = configs.db_settings
+    pool_size, max_overflow = pool_limits()
+    engine = create_async_engine(
+        url=make_url(url).set(drivername="postgresql+asyncpg"),
+        echo=False,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=db_settings.DB_POOL_TIMEOUT,
+        pool_recycle=db_settings.DB_POOL_RECYCLE,
+        pool_pre_ping=db_settings.DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": db_settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": (
+                db_settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+            ),
+        },
+    )
+    instrument_engine(engine.sync_engine)
+    if configs.app_settings.PROFILER_ENABLED:
+        get_profiler().instrument(engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_profiler() -> QueryProfiler:
+    """
+    Return the statement profiler of this worker, creating it on first use.
+    """
+    app_settings = configs.app_settings
+    return QueryProfiler(
+        slow_query_seconds=app_settings.PROFILER_SLOW_QUERY_SECONDS,
+        explain_sample_rate=app_settings.PROFILER_EXPLAIN_SAMPLE_RATE,
+        explain_timeout=app_settings.PROFILER_EXPLAIN_TIMEOUT,
+        history_size=app_settings.PROFILER_HISTORY_SIZE,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> AsyncEngine:
+    """
+    Return the engine of the primary database, creating it on first use.
+    """
+    return create_engine(database_url())
+
+
+@lru_cache(maxsize=None)
+def get_replica_set() -> ReplicaSet:
+    """
+    Return the read replicas, creating their engines on first use.
+    """
+    db_settings = configs.db_settings
+    return ReplicaSet(
+        [create_engine(url) for url in db_settings.DB_REPLICA_URLS],
+        check_interval=db_settings.DB_REPLICA_CHECK_INTERVAL,
+        check_timeout=db_settings.DB_REPLICA_CHECK_TIMEOUT,
+    )
+
+
+def async_session(**kwargs: Any) -> AsyncSession:
+    """
+    Open a session, on the primary unless another `bind` is given.
+
+    Args:
+        **kwargs (Any): Options of `AsyncSession`.
+
+    Returns:
+        AsyncSession: The session; use it as an async context manager.
+    """
+    kwargs.setdefault("bind", get_engine())
+    return _session_factory(**kwargs)
+
+
+async def connect(prepare: Optional[Preparer] = None) -> None:
+    """
+    Create the engines and open their first connections.
+
+    Called when a worker starts, before it accepts requests. On the primary
+    and on every healthy replica, `DB_POOL_WARMUP` connections are opened at
+    once and `prepare` runs on each, so that the first requests after a
+    deploy pay neither for connecting nor for preparing statements. The
+    worker reports ready afterwards.
+
+    Args:
+        prepare (Optional[Preparer]): Prepares the hot statements. It gets a
+        session whose transaction is rolled back afterwards.
+
+    Raises:
+        SQLAlchemyError: If the primary cannot be reached.
+        OSError: If the primary cannot be reached.
+    """
+    global _ready
+    await _warm_up(get_engine(), prepare)
+    replica_set = get_replica_set()
+    if replica_set:
+        await replica_set.check_all()
+        for replica in replica_set.replicas:
+            if not replica.healthy:
+                continue
+            try:
+                await _warm_up(replica.engine, prepare)
+            except (SQLAlchemyError, OSError):
+                replica_set.mark_down(replica.engine)
+    _ready = True
+
+
+async def disconnect() -> None:
+    """
+    Close every pooled connection of the primary and the replicas.
+
+    Called when a worker stops, after in-flight requests have finished.
+    """
+    global _ready
+    _ready = False
+    await get_engine().dispose()
+    await get_replica_set().dispose()
+
+
+def is_ready() -> bool:
+    """
+    Tell whether the worker has warmed up and is not shutting down.
+    """
+    return _ready
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session() as session:
+
+async def _warm_up(engine: AsyncEngine, prepare: Optional[Preparer]) -> None:
+    """
+    Open connections in the pool of an engine and prepare statements on
+    each.
+    """
+    pool_size = engine.sync_engine.pool.size()
+    count = configs.db_settings.DB_POOL_WARMUP
+    count = pool_size if count < 0 else min(count, pool_size)
+    # held together, so that each one is a new connection
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(max(count, 1)))
+    )
+    try:
+        await asyncio.gather(
+            *(
+                _prepare_connection(connection, prepare)
+                for connection in connections
+            )
+        )
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def _prepare_connection(
+    connection: Any, prepare: Optional[Preparer]
+) -> None:
+    if prepare is None:
+        await connection.execute(text("SELECT 1"))
+        await connection.rollback()
+        return
+    async with AsyncSession(bind=connection) as db:
+        await prepare(db)
+        await db.rollback()
+
+
+async def get_async_session(
+    request: Request, response: Response
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Provide a session for one request.
+
+    GET and HEAD requests are served by a healthy replica, if any are
+    configured; all other requests use the primary. After a write, the
+    client gets a cookie that keeps its reads on the primary for
+    `DB_READ_YOUR_WRITES_SECONDS`, so it never reads data older than its own
+    writes.
+
+    Args:
+        request (Request): The incoming request.
+        response (Response): The outgoing response, used to set the cookie.
+
+    Yields:
+        AsyncSession: The session, closed when the request finishes.
+    """
+    if request.method in READ_ONLY_METHODS:
+        session = _request_session(request, read_only=True)
+    else:
+        window = configs.db_settings.DB_READ_YOUR_WRITES_SECONDS
+        if get_replica_set() and window > 0:
+            response.set_cookie(
+                PIN_COOKIE,
+                f"{time.time() + window:.3f}",
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="lax",
+            )
+        session = _request_session(request, read_only=False)
+    async with session as db:
+        yield db
+
+
+async def get_read_only_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Provide a session for a request that only reads, whatever its method.
+
+    For reads sent as POST because their input is large. Like GET requests,
+    they are served by a replica unless the client wrote recently, and they
+    do not pin the client to the primary.
+
+    Args:
+        request (Request): The incoming request.
+
+    Yields:
+        AsyncSession: The session, closed when the request finishes.
+    """
+    async with _request_session(request, read_only=True) as db:
+        yield db
+
+
+@asynccontextmanager
+async def _request_session(
+    request: Request, read_only: bool
+) -> AsyncIterator[AsyncSession]:
+    """
+    Open the session of a request on a replica or on the primary.
+
+    Rows read on a replica are kept out of the cache, and a client that
+    wrote recently reads past the cache, so it never gets a row older than
+    its own writes. A replica whose connection is lost during the request is
+    marked down.
+    """
+    replica_set = get_replica_set()
+    engine = None
+    pinned = _pinned(request)
+    if read_only and replica_set and not pinned:
+        engine = await replica_set.choose()
+    session = async_session(bind=engine) if engine else async_session()
+    session.info[SKIP_CACHE_WRITES] = engine is not None
+    session.info[SKIP_CACHE_READS] = pinned
+    async with session:
         try:
             yield session
-        except Exception:
+        except Exception as err:
             await session.rollback()
+            if engine is not None and is_disconnect(err):
+                replica_set.mark_down(engine)
             raise
+
+
+@asynccontextmanager
+async def read_only_session() -> AsyncIterator[AsyncSession]:
+    """
+    Open a session on a healthy replica, or on the primary if there is none.
+
+    For work outside of a request, such as a streamed response body. Rows
+    read on a replica are kept out of the cache.
+
+    Yields:
+        AsyncSession: The session, closed when the block exits.
+    """
+    replica_set = get_replica_set()
+    engine = await replica_set.choose() if replica_set else None
+    async with async_session(bind=engine or get_engine()) as session:
+        session.info[SKIP_CACHE_WRITES] = engine is not None
+        yield session
+
+
+def _pinned(request: Request) -> bool:
+    """
+    Tell whether a client wrote recently enough to read from the primary.
+    """
+    value = request.cookies.get(PIN_COOKIE)
+    if value is None:
+        return False
+    try:
+        until = float(value)
+    except ValueError:
+        return False
+    now = time.time()
+    # never trust a pin longer than the configured window
+    window = configs.db_settings.DB_READ_YOUR_WRITES_SECONDS
+    return now < until <= now + window
+
+
+async def listen(
+    channels: Dict[str, Callable[[str], None]],
+) -> asyncpg.Connection:
+    """
+    Open a connection to the primary that listens for notifications.
+
+    The connection is outside the pool, since it stays open for as long as
+    the worker runs, and it must not go through a transaction-pooling
+    proxy such as pgbouncer, which does not forward notifications.
+
+    Args:
+        channels (Dict[str, Callable[[str], None]]): The callback of every
+        channel to listen on; it gets the payload of each notification and
+        runs on the event loop, so it must not block.
+
+    Returns:
+        asyncpg.Connection: The connection; close it to stop listening.
+    """
+    url = make_url(database_url()).set(drivername="postgresql")
+    connection = await asyncpg.connect(
+        url.render_as_string(hide_password=False)
+    )
+    for channel, callback in channels.items():
+        await connection.add_listener(
+            channel,
+            lambda _connection, _pid, _channel, payload, callback=callback: (
+                callback(payload)
+            ),
+        )
+    return connection
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Return the state and checkout counters of the connection pool.
+    """
+    return get_engine().sync_engine.pool.stats()
+
+
+def get_replica_status() -> List[Dict[str, Any]]:
+    """
+    Return the health and pool statistics of every read replica.
+    """
+    return get_replica_set().status()
+
+
+def get_slow_queries() -> List[SlowQuery]:
+    """
+    Return the most recent slow statements of this worker, newest first.
+    """
+    return get_profiler().slow_queries()
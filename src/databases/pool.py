@@ -0,0 +1,95 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+"""
+Connection pool with checkout statistics.
+"""
+
+_in_checkout: ContextVar[bool] = ContextVar("_in_checkout", default=False)
+
+
+@dataclass
+class CheckoutStats:
+    """
+    Counters of connection checkouts.
+
+    Attributes:
+        checkouts (int): Connections handed out by the pool.
+        timeouts (int): Checkouts that gave up after `pool_timeout`.
+        wait_seconds_total (float): Time spent waiting for a connection,
+        including opening new ones.
+        wait_seconds_max (float): The longest single wait.
+    """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    An `AsyncAdaptedQueuePool` that measures how long checkouts wait.
+
+    Attributes:
+        checkout_stats (CheckoutStats): Checkout counters of this pool.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _do_get(self) -> Any:
+        # QueuePool._do_get calls itself on overflow races; count the
+        # outermost call only
+        if _in_checkout.get():
+            return super()._do_get()
+
+        token = _in_checkout.set(True)
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_stats.timeouts += 1
+            raise
+        finally:
+            _in_checkout.reset(token)
+            waited = time.perf_counter() - start
+            self.checkout_stats.wait_seconds_total += waited
+            self.checkout_stats.wait_seconds_max = max(
+                self.checkout_stats.wait_seconds_max, waited
+            )
+        self.checkout_stats.checkouts += 1
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the current state and checkout counters of the pool.
+
+        Returns:
+            Dict[str, Any]: Configured size and overflow, connections checked
+            out, idle and in overflow, and checkout counters.
+        """
+        checkout_stats = self.checkout_stats
+        attempts = checkout_stats.checkouts + checkout_stats.timeouts
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": checkout_stats.checkouts,
+            "timeouts": checkout_stats.timeouts,
+            "wait_seconds_total": checkout_stats.wait_seconds_total,
+            "wait_seconds_max": checkout_stats.wait_seconds_max,
+            "wait_seconds_avg": (
+                checkout_stats.wait_seconds_total / attempts
+                if attempts
+                else 0.0
+            ),
+        }
@@ -0,0 +1,421 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+"""
+Profiling of the SQL statements run by each unit of work, such as a request.
+
+Every statement is timed between `before_cursor_execute` and
+`after_cursor_execute`, which with asyncpg includes fetching its rows, and
+its time is added to the profile of the current task. Statements slower than
+a threshold are logged with the method and route they ran for, and the plan
+of a sample of them is captured on a connection of its own, with the
+sequential scans in it.
+
+`EXPLAIN ANALYZE` runs the statement again, and a rollback does not undo
+everything: sequences keep their new values, and functions may act outside
+the database. So only plain reads, which select from tables and call no
+function but well-known side-effect-free ones, are explained with `ANALYZE`
+and `BUFFERS`; every other statement gets its plan only, without running.
+"""
+
+logger = logging.getLogger(__name__)
+
+# statements outside of a profile, such as those of background tasks
+BACKGROUND = ("", "background")
+
+# the most characters of a statement that are logged and kept
+MAX_STATEMENT_LENGTH = 2000
+
+# statements EXPLAIN accepts
+_EXPLAINABLE = re.compile(
+    r"^\s*(SELECT|WITH|VALUES|TABLE|INSERT|UPDATE|DELETE|MERGE)\b",
+    re.IGNORECASE,
+)
+_READ = re.compile(r"^\s*(SELECT|WITH|VALUES|TABLE)\b", re.IGNORECASE)
+# also catches SELECT ... FOR UPDATE, which takes row locks
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+# a function call, or a keyword followed by a parenthesis
+_CALL = re.compile(r"\b(\w+)\s*\(")
+# names that may precede a parenthesis in a plain read: keywords, and
+# functions that neither write nor act outside the transaction; any other
+# call, such as setval() or pg_advisory_xact_lock(), is never run again
+_PLAIN_READ_CALLS = frozenset(
+    (
+        "all",
+        "and",
+        "any",
+        "as",
+        "exists",
+        "filter",
+        "from",
+        "in",
+        "join",
+        "lateral",
+        "not",
+        "on",
+        "or",
+        "over",
+        "select",
+        "values",
+        "where",
+        "array_agg",
+        "avg",
+        "cast",
+        "coalesce",
+        "count",
+        "greatest",
+        "least",
+        "length",
+        "lower",
+        "max",
+        "min",
+        "now",
+        "row_number",
+        "string_agg",
+        "sum",
+        "to_tsvector",
+        "ts_headline",
+        "ts_rank_cd",
+        "upper",
+        "websearch_to_tsquery",
+    )
+)
+
+
+@dataclass
+class QueryProfile:
+    """
+    Statements run while profiling.
+
+    Attributes:
+        scope (Optional[Dict[str, Any]]): The ASGI scope of the request the
+        statements run for; its route is only known once it is routed.
+        statements (int): Statements executed (an executemany counts once).
+        seconds (float): Time spent executing them.
+        slow (int): Statements slower than the threshold.
+    """
+
+    scope: Optional[Dict[str, Any]] = None
+    statements: int = 0
+    seconds: float = 0.0
+    slow: int = 0
+
+    @property
+    def labels(self) -> Tuple[str, str]:
+        """
+        The method and route template the statements are attributed to.
+        """
+        if self.scope is None:
+            return BACKGROUND
+        route = getattr(self.scope.get("route"), "path", None)
+        return self.scope.get("method", ""), route or "unmatched"
+
+
+@dataclass
+class SlowQuery:
+    """
+    A statement slower than the threshold.
+
+    Attributes:
+        statement (str): The SQL, with placeholders for its parameters.
+        seconds (float): How long it took.
+        method (str): The method of the request it ran for.
+        route (str): The route template of the request it ran for.
+        started_at (float): When it started, as a Unix timestamp.
+        plan (Optional[Any]): Its plan in JSON format, if it was explained.
+        analyzed (bool): Whether the plan has actual times and buffers, from
+        running the statement again, or only estimates.
+        seq_scans (Tuple[str, ...]): Tables scanned sequentially in the
+        plan.
+    """
+
+    statement: str
+    seconds: float
+    method: str
+    route: str
+    started_at: float
+    plan: Optional[Any] = None
+    analyzed: bool = False
+    seq_scans: Tuple[str, ...] = ()
+
+
+@dataclass
+class ProfilerStats:
+    """
+    Counters of a profiler, by method and route template.
+
+    Attributes:
+        slow (Dict[Tuple[str, str], int]): Statements slower than the
+        threshold.
+        explained (Dict[Tuple[str, str], int]): Slow statements explained.
+        seq_scans (Dict[Tuple[str, str, str], int]): Sequential scans in
+        the plans explained, by method, route and table.
+    """
+
+    slow: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    explained: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    seq_scans: Dict[Tuple[str, str, str], int] = field(default_factory=dict)
+
+
+_current: ContextVar[Optional[QueryProfile]] = ContextVar(
+    "_current_query_profile", default=None
+)
+
+# set while a statement is explained, so the explain itself is not timed
+_in_explain: ContextVar[bool] = ContextVar("_in_explain", default=False)
+
+
+@contextmanager
+def profile_queries(
+    scope: Optional[Dict[str, Any]] = None,
+) -> Iterator[QueryProfile]:
+    """
+    Profile the statements run by the current task until the block exits.
+
+    Args:
+        scope (Optional[Dict[str, Any]]): The ASGI scope of the request the
+        statements are attributed to.
+
+    Yields:
+        QueryProfile: The counters, updated as statements run.
+    """
+    profile = QueryProfile(scope=scope)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+class QueryProfiler:
+    """
+    Times statements, logs the slow ones and explains a sample of them.
+
+    Attributes:
+        slow_query_seconds (float): Statements taking longer are slow.
+        explain_sample_rate (float): The share of slow statements explained,
+        from 0 (none) to 1 (all).
+        explain_timeout (float): Seconds an explained statement may run.
+        stats (ProfilerStats): Slow, explained and sequential scan counters.
+    """
+
+    def __init__(
+        self,
+        slow_query_seconds: float = 0.1,
+        explain_sample_rate: float = 0.0,
+        explain_timeout: float = 5.0,
+        history_size: int = 100,
+    ) -> None:
+        """
+        Initialize the profiler.
+
+        Args:
+            slow_query_seconds (float): Statements taking longer are slow.
+            explain_sample_rate (float): The share of slow statements
+            explained.
+            explain_timeout (float): Seconds an explained statement may run.
+            history_size (int): The most recent slow statements kept.
+        """
+        self.slow_query_seconds = slow_query_seconds
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_timeout = explain_timeout
+        self.stats = ProfilerStats()
+        self._history: Deque[SlowQuery] = deque(maxlen=history_size)
+        self._explaining = False
+        self._tasks: Set[asyncio.Task] = set()
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """
+        Register the event listeners that time the statements of an engine.
+
+        Args:
+            engine (AsyncEngine): The engine; slow statements are explained
+            on a connection of its own pool.
+        """
+
+        def after_cursor_execute(
+            conn: Connection,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool,
+        ) -> None:
+            self._after_cursor_execute(
+                engine, conn, statement, parameters, executemany
+            )
+
+        sync_engine = engine.sync_engine
+        event.listen(
+            sync_engine, "before_cursor_execute", _before_cursor_execute
+        )
+        event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    def slow_queries(self) -> List[SlowQuery]:
+        """
+        Return the most recent slow statements, newest first.
+        """
+        return list(reversed(self._history))
+
+    def _after_cursor_execute(
+        self,
+        engine: AsyncEngine,
+        conn: Connection,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+    ) -> None:
+        started = conn.info.pop("query_started", None)
+        if started is None or _in_explain.get():
+            return
+        elapsed = time.perf_counter() - started
+        profile = _current.get()
+        if profile is not None:
+            profile.statements += 1
+            profile.seconds += elapsed
+        if elapsed < self.slow_query_seconds:
+            return
+
+        method, route = BACKGROUND
+        if profile is not None:
+            profile.slow += 1
+            method, route = profile.labels
+        key = (method, route)
+        self.stats.slow[key] = self.stats.slow.get(key, 0) + 1
+        query = SlowQuery(
+            statement=" ".join(statement.split())[:MAX_STATEMENT_LENGTH],
+            seconds=elapsed,
+            method=method,
+            route=route,
+            started_at=time.time() - elapsed,
+        )
+        self._history.append(query)
+        # parameters are left out, as they may hold personal data
+        logger.warning(
+            "slow query: %.1f ms %s %s: %s",
+            elapsed * 1000,
+            method or "-",
+            route,
+            query.statement,
+        )
+        if (
+            not executemany
+            and not self._explaining
+            and random.random() < self.explain_sample_rate
+            and _EXPLAINABLE.match(statement)
+        ):
+            self._explaining = True
+            # an empty context, so the statements of the explain are
+            # neither profiled nor counted as round trips of the request
+            task = asyncio.get_running_loop().create_task(
+                self._explain(engine, query, statement, parameters),
+                context=Context(),
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _explain(
+        self,
+        engine: AsyncEngine,
+        query: SlowQuery,
+        statement: str,
+        parameters: Any,
+    ) -> None:
+        """
+        Capture the plan of a slow statement, running it again if it is a
+        plain read.
+
+        At most one statement is explained at a time per worker, so a burst
+        of slow queries does not double the load that made them slow.
+        """
+        analyze = _plain_read(statement)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        _in_explain.set(True)
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql(
+                    "SET LOCAL statement_timeout = "
+                    f"{max(int(self.explain_timeout * 1000), 1)}"
+                )
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN ({options}) {statement}",
+                    parameters,
+                )
+                plan = result.scalar_one()
+                # whatever the statement did is undone
+                await connection.rollback()
+        except (SQLAlchemyError, OSError) as err:
+            logger.info("slow query not explained: %s", err)
+            return
+        finally:
+            self._explaining = False
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        query.plan = plan
+        query.analyzed = analyze
+        query.seq_scans = tuple(sorted(set(_seq_scans(plan))))
+        key = (query.method, query.route)
+        self.stats.explained[key] = self.stats.explained.get(key, 0) + 1
+        for table in query.seq_scans:
+            key = (query.method, query.route, table)
+            self.stats.seq_scans[key] = self.stats.seq_scans.get(key, 0) + 1
+        if query.seq_scans:
+            logger.warning(
+                "slow query on %s %s scans %s sequentially",
+                query.method or "-",
+                query.route,
+                ", ".join(query.seq_scans),
+            )
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    # replaced by the next statement if this one fails
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _plain_read(statement: str) -> bool:
+    """
+    Tell whether a statement only reads tables, so running it again under
+    `EXPLAIN ANALYZE` changes nothing a rollback does not undo.
+    """
+    if not _READ.match(statement) or _WRITE.search(statement):
+        return False
+    return all(
+        name.lower() in _PLAIN_READ_CALLS for name in _CALL.findall(statement)
+    )
+
+
+def _seq_scans(plan: Any) -> Iterator[str]:
+    """
+    Yield the tables scanned sequentially anywhere in a JSON plan.
+    """
+    if isinstance(plan, list):
+        for item in plan:
+            yield from _seq_scans(item)
+    elif isinstance(plan, dict):
+        if plan.get("Node Type") == "Seq Scan" and "Relation Name" in plan:
+            yield plan["Relation Name"]
+        for value in plan.values():
+            if isinstance(value, (list, dict)):
+                yield from _seq_scans(value)
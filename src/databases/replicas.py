@@ -0,0 +1,154 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+"""
+Read replica selection.
+
+Replicas are used in round-robin order. A replica is checked with `SELECT 1`
+at most once per check interval, when it is next due to serve a request,
+and one that fails a check or loses a connection mid-request is skipped
+until the interval has passed. When no replica is healthy, reads go to the
+primary.
+"""
+
+
+@dataclass
+class Replica:
+    """
+    A read replica and its health.
+
+    Attributes:
+        engine (AsyncEngine): The engine connected to the replica.
+        healthy (bool): The result of the last check.
+        checked_at (float): `time.monotonic()` of the last check or failure.
+    """
+
+    engine: AsyncEngine
+    healthy: bool = True
+    checked_at: float = float("-inf")
+
+    @property
+    def name(self) -> str:
+        """
+        The URL of the replica without the password.
+        """
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaSet:
+    """
+    Round-robin selection among healthy replicas.
+
+    Attributes:
+        replicas (List[Replica]): The replicas, in rotation order.
+        check_interval (float): Seconds between checks of a replica.
+        check_timeout (float): Seconds a check may take.
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        check_interval: float = 5.0,
+        check_timeout: float = 1.0,
+    ) -> None:
+        self.replicas = [Replica(engine) for engine in engines]
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._counter = count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    async def choose(self) -> Optional[AsyncEngine]:
+        """
+        Pick the next healthy replica.
+
+        Returns:
+            Optional[AsyncEngine]: Its engine, or None if no replica is
+            healthy.
+        """
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._counter) % len(self.replicas)]
+            if await self._is_healthy(replica):
+                return replica.engine
+        return None
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        """
+        Skip the replica of an engine until its next check is due.
+        """
+        for replica in self.replicas:
+            if replica.engine is engine:
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+
+    async def check_all(self) -> None:
+        """
+        Check every replica now.
+        """
+        await asyncio.gather(
+            *(self._check(replica) for replica in self.replicas)
+        )
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Return the health and pool statistics of every replica.
+        """
+        return [
+            {
+                "url": replica.name,
+                "healthy": replica.healthy,
+                "pool": replica.engine.sync_engine.pool.stats(),
+            }
+            for replica in self.replicas
+        ]
+
+    async def dispose(self) -> None:
+        """
+        Close the connections of every replica.
+        """
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _is_healthy(self, replica: Replica) -> bool:
+        if time.monotonic() - replica.checked_at >= self.check_interval:
+            await self._check(replica)
+        return replica.healthy
+
+    async def _check(self, replica: Replica) -> None:
+        # claim the check first so concurrent requests do not repeat it
+        replica.checked_at = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                self._ping(replica.engine), timeout=self.check_timeout
+            )
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError):
+            replica.healthy = False
+        else:
+            replica.healthy = True
+        replica.checked_at = time.monotonic()
+
+    @staticmethod
+    async def _ping(engine: AsyncEngine) -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+
+def is_disconnect(err: BaseException) -> bool:
+    """
+    Tell whether an error, or one that caused it, is a lost connection.
+    """
+    while err is not None:
+        if isinstance(err, OSError) or (
+            isinstance(err, DBAPIError) and err.connection_invalidated
+        ):
+            return True
+        err = err.__cause__
+    return False
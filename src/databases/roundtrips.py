@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+"""
+Counting of database round trips per unit of work, such as a request.
+
+Every statement is one round trip. The asyncpg dialect may add one to
+prepare a statement that is not in the connection's prepared statement cache
+yet and one to send `BEGIN` before the first statement of a transaction, and
+`COMMIT`/`ROLLBACK` are one more each. Statements run in autocommit mode
+never pay for `BEGIN` or `COMMIT`.
+"""
+
+
+@dataclass
+class RoundTrips:
+    """
+    Round trips made while counting.
+
+    Attributes:
+        statements (int): Statements executed (an executemany counts once).
+        prepares (int): Statements prepared because they were not cached.
+        transactions (int): `BEGIN`, `COMMIT` and `ROLLBACK` commands sent.
+    """
+
+    statements: int = 0
+    prepares: int = 0
+    transactions: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.statements + self.prepares + self.transactions
+
+
+_current: ContextVar[Optional[RoundTrips]] = ContextVar(
+    "_current_round_trips", default=None
+)
+
+
+@contextmanager
+def count_round_trips() -> Iterator[RoundTrips]:
+    """
+    Count the round trips made by the current task until the block exits.
+
+    Yields:
+        RoundTrips: The counters, updated as statements run.
+    """
+    counters = RoundTrips()
+    token = _current.set(counters)
+    try:
+        yield counters
+    finally:
+        _current.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Register the event listeners that feed `count_round_trips`.
+
+    Args:
+        engine (Engine): The engine, for an async engine its `sync_engine`.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "commit", _end_transaction)
+    event.listen(engine, "rollback", _end_transaction)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    counters = _current.get()
+    if counters is None:
+        return
+    counters.statements += 1
+    # the asyncpg adapter keeps its own transaction flag and statement cache
+    adapter = conn.connection.dbapi_connection
+    if not getattr(adapter, "_started", True) and (
+        getattr(adapter, "isolation_level", None) != "autocommit"
+    ):
+        counters.transactions += 1
+    cache = getattr(adapter, "_prepared_statement_cache", None)
+    if cache is not None and statement not in cache:
+        counters.prepares += 1
+
+
+def _end_transaction(conn: Connection) -> None:
+    counters = _current.get()
+    if counters is None:
+        return
+    if getattr(conn.connection.dbapi_connection, "_started", False):
+        counters.transactions += 1
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+import os
+
+from configs import app_settings
+from crud import crud_user
+from databases import async_session
+from utilities.exceptions import ImportFailed
+
+"""
+Command line entry point for bulk user imports.
+
+Usage:
+    python3 import_users.py path/to/users.csv
+    python3 import_users.py path/to/users.xlsx --chunk-size 10000
+"""
+
+
+async def import_users(path: str, file_format: str, chunk_size: int) -> dict:
+    """
+    Import users from a file and return the import report.
+
+    Args:
+        path (str): The path of the CSV or XLSX file.
+        file_format (str): Either `csv` or `xlsx`.
+        chunk_size (int): The number of rows per validation/COPY chunk.
+
+    Returns:
+        dict: The number of imported and rejected rows, and the reasons of
+        the first rejections.
+    """
+    with open(path, "rb") as file:
+        async with async_session() as db:
+            report = await crud_user.import_file(
+                db=db,
+                file=file,
+                file_format=file_format,
+                chunk_size=chunk_size,
+                max_errors=app_settings.IMPORT_MAX_REPORTED_ERRORS,
+            )
+    return {
+        "imported": report.imported,
+        "rejected": report.rejected,
+        "errors": [
+            {"row": row, "error": error} for row, error in report.errors
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import users from a file.")
+    parser.add_argument("path", help="CSV or XLSX file with a header row")
+    parser.add_argument(
+        "--format",
+        choices=("csv", "xlsx"),
+        help="file format, guessed from the extension by default",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=app_settings.IMPORT_CHUNK_SIZE
+    )
+    args = parser.parse_args()
+    file_format = args.format or os.path.splitext(args.path)[1][1:].lower()
+    if file_format not in ("csv", "xlsx"):
+        parser.error("cannot guess the file format, use --format")
+
+    try:
+        report = asyncio.run(
+            import_users(args.path, file_format, args.chunk_size)
+        )
+    except ImportFailed as err:
+        parser.exit(status=1, message=f"{err.detail}\n")
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,23 @@
+from configs import app_settings
+
+from .runner import JobContext, JobHandler, JobRunner
+from .users import handlers
+
+job_runner = JobRunner(
+    handlers=handlers,
+    concurrency=app_settings.JOBS_CONCURRENCY,
+    poll_interval=app_settings.JOBS_POLL_INTERVAL,
+    stale_after=app_settings.JOBS_STALE_AFTER,
+    max_attempts=app_settings.JOBS_MAX_ATTEMPTS,
+)
+"""
+The job runner of this worker, started with the application when
+`JOBS_ENABLED` is set.
+"""
+
+__all__ = (
+    "JobContext",
+    "JobHandler",
+    "JobRunner",
+    "job_runner",
+)
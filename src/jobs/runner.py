@@ -0,0 +1,281 @@
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+)
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud import crud_job
+from databases import async_session
+from models.job import Job
+from schemas.job import JobStatus
+
+"""
+In-process runner of background jobs.
+
+Every worker that runs jobs polls the `job` table and claims queued jobs up
+to its concurrency limit, while it keeps serving requests. A job does its
+work in steps: each step is one transaction holding both the work and the
+job's checkpoint, so after a crash or a restart the job resumes right after
+its last committed step, and no step is applied twice. A stopping worker
+queues its jobs again; one that dies leaves them to be taken over once its
+heartbeat is stale.
+"""
+
+
+class JobCancelled(Exception):
+    """
+    Raised at the start of a step of a job that was asked to stop.
+    """
+
+
+class LeaseLost(Exception):
+    """
+    Raised in a job that another worker took over, so its step is rolled
+    back.
+    """
+
+
+class JobContext:
+    """
+    What a running job knows about itself.
+
+    Set `checkpoint`, `report`, `processed` and `total` inside a step; they
+    are saved when the step commits.
+
+    Attributes:
+        job_id (int): The ID of the job.
+        params (Dict[str, Any]): The input of the job.
+        checkpoint (Dict[str, Any]): Where the job continues; empty on the
+        first attempt.
+        report (Dict[str, Any]): What the job has done so far.
+        processed (int): Items processed so far.
+        total (Optional[int]): Items to process, if known.
+    """
+
+    def __init__(self, job: Job, worker: str) -> None:
+        self.job_id = job.id
+        self.params = job.params
+        self.checkpoint = dict(job.checkpoint)
+        self.report = dict(job.report)
+        self.processed = job.processed
+        self.total = job.total
+        self._worker = worker
+
+    @asynccontextmanager
+    async def step(self) -> AsyncIterator[AsyncSession]:
+        """
+        Run one step of the job in a transaction of its own.
+
+        Raises:
+            JobCancelled: If the job was asked to stop before the step.
+            LeaseLost: If another worker has taken the job over.
+
+        Yields:
+            AsyncSession: The session to do the work of the step in. It is
+            committed together with the progress when the block exits.
+        """
+        async with async_session() as db:
+            cancel_requested = await crud_job.check_lease(
+                db, self.job_id, self._worker
+            )
+            if cancel_requested is None:
+                raise LeaseLost()
+            if cancel_requested:
+                raise JobCancelled()
+            yield db
+            saved = await crud_job.save_progress(
+                db,
+                self.job_id,
+                self._worker,
+                checkpoint=self.checkpoint,
+                report=self.report,
+                processed=self.processed,
+                total=self.total,
+            )
+            if not saved:
+                raise LeaseLost()
+            await db.commit()
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    """
+    How to run one kind of job.
+
+    Attributes:
+        run (Callable[[JobContext], Awaitable[None]]): Does the work, in
+        steps. Any exception fails the job with its message.
+        cleanup (Optional[Callable[[Dict[str, Any]], None]]): Releases what
+        the job's params point to, such as an uploaded file, once the job
+        has ended for good.
+    """
+
+    run: Callable[[JobContext], Awaitable[None]]
+    cleanup: Optional[Callable[[Dict[str, Any]], None]] = None
+
+
+class JobRunner:
+    """
+    Runs background jobs of the known kinds on a bounded number of tasks.
+
+    Attributes:
+        handlers (Dict[str, JobHandler]): The handler of every job kind.
+        concurrency (int): The most jobs run at once by this worker.
+        poll_interval (float): Seconds between checks for new jobs, which
+        also renew the leases of running jobs.
+        stale_after (float): Seconds without a heartbeat after which a job
+        is taken over by another worker; must be well above
+        `poll_interval`.
+        max_attempts (int): How many times a job is started before it is
+        failed.
+        worker (str): The name of this worker in the `job` table.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        stale_after: float = 60.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.worker = ""
+        self._running: Dict[int, asyncio.Task] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """
+        Start polling for jobs in the background.
+        """
+        # named after the process, so every worker holds its own leases
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = asyncio.Event()
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """
+        Stop polling, interrupt the running jobs and queue them again.
+
+        An interrupted job loses only the step in progress, which is rolled
+        back, so stopping does not wait for jobs to end.
+        """
+        if self._poller is None:
+            return
+        tasks = [self._poller, *self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poller = None
+        with suppress(SQLAlchemyError, OSError):
+            async with async_session() as db:
+                await crud_job.release(db, self.worker)
+
+    def wake(self) -> None:
+        """
+        Look for jobs now instead of at the next poll, for example right
+        after one was submitted.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _poll(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                async with async_session() as db:
+                    if self._running:
+                        await crud_job.heartbeat(
+                            db, self.worker, list(self._running)
+                        )
+                    for job in await crud_job.abandon(
+                        db, self.stale_after, self.max_attempts
+                    ):
+                        self._cleanup(job)
+                    while len(self._running) < self.concurrency:
+                        job = await crud_job.claim(
+                            db,
+                            self.worker,
+                            self.stale_after,
+                            self.max_attempts,
+                        )
+                        if job is None:
+                            break
+                        self._running[job.id] = asyncio.create_task(
+                            self._execute(job)
+                        )
+            except (SQLAlchemyError, OSError):
+                # the database is unreachable; try again at the next poll
+                pass
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._wake.wait(), timeout=self.poll_interval
+                )
+
+    async def _execute(self, job: Job) -> None:
+        try:
+            status, error = await self._run(job)
+            if status is None:
+                return
+            async with async_session() as db:
+                finished = await crud_job.finish(
+                    db, job.id, self.worker, status, error
+                )
+            if finished:
+                self._cleanup(job)
+        except (SQLAlchemyError, OSError):
+            # left running; it is taken over once its lease is stale
+            pass
+        finally:
+            del self._running[job.id]
+            self.wake()
+
+    async def _run(
+        self, job: Job
+    ) -> Tuple[Optional[JobStatus], Optional[str]]:
+        handler = self.handlers.get(job.kind)
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+            await handler.run(JobContext(job, self.worker))
+        except JobCancelled:
+            return JobStatus.cancelled, None
+        except LeaseLost:
+            return None, None
+        except Exception as err:
+            return JobStatus.failed, _describe(err)
+        return JobStatus.succeeded, None
+
+    def _cleanup(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        if handler is not None and handler.cleanup is not None:
+            handler.cleanup(job.params)
+
+
+def _describe(err: Exception) -> str:
+    """
+    Turn the exception that failed a job into its error message.
+    """
+    detail = getattr(err, "detail", None)
+    if isinstance(detail, str):
+        return detail
+    return str(err) or type(err).__name__
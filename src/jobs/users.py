@@ -0,0 +1,140 @@
+import asyncio
+import os
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, Iterator
+
+from configs import app_settings
+from crud import crud_user
+from schemas import UserCreate, UserUpdate
+from utilities.importer import ImportReport, read_rows, validate_chunk
+
+from .runner import JobContext, JobHandler
+
+"""
+Background jobs that change many users.
+
+An import job reads its file in chunks and copies every chunk in a step of
+its own, checkpointing the number of rows read. A mass update walks the
+matching users in ID order and checkpoints the last ID changed. Either one
+resumes after its last committed chunk.
+"""
+
+
+async def run_import(context: JobContext) -> None:
+    """
+    Import users from the file uploaded for the job.
+
+    Unlike the synchronous import, chunks committed before a failure or a
+    cancellation are kept; the report tells how far the job got.
+
+    Args:
+        context (JobContext): The running job. Its params hold the `path`
+        and `format` of the file.
+
+    Raises:
+        ImportFailed: If the file is malformed, lacks a required column or
+        the database rejects a chunk.
+    """
+    errors = context.report.get("errors", [])
+    report = ImportReport(
+        imported=context.report.get("imported", 0),
+        rejected=context.report.get("rejected", 0),
+        errors=[(error["row"], error["error"]) for error in errors],
+        max_errors=app_settings.IMPORT_MAX_REPORTED_ERRORS,
+    )
+    with open(context.params["path"], "rb") as file:
+        header, rows = await asyncio.to_thread(
+            read_rows, file, context.params["format"]
+        )
+        columns = crud_user.import_columns(header)
+        consumed = context.checkpoint.get("consumed", 0)
+        if consumed:
+            await asyncio.to_thread(_skip, rows, consumed)
+        exhausted = False
+        while not exhausted:
+            records, consumed, exhausted = await asyncio.to_thread(
+                validate_chunk,
+                rows,
+                UserCreate,
+                columns,
+                report,
+                app_settings.IMPORT_CHUNK_SIZE,
+                consumed,
+            )
+            async with context.step() as db:
+                if records:
+                    await crud_user.copy_chunk(db, records, columns)
+                report.imported += len(records)
+                context.checkpoint = {"consumed": consumed}
+                context.processed = consumed
+                context.report = {
+                    "imported": report.imported,
+                    "rejected": report.rejected,
+                    "errors": [
+                        {"row": row, "error": error}
+                        for row, error in report.errors
+                    ],
+                }
+
+
+def remove_import_file(params: Dict[str, Any]) -> None:
+    """
+    Delete the file of an import job that has ended.
+    """
+    try:
+        os.remove(params["path"])
+    except FileNotFoundError:
+        pass
+
+
+async def run_update(context: JobContext) -> None:
+    """
+    Set the same fields on every user matching the filters.
+
+    Users are changed `JOBS_CHUNK_SIZE` at a time in ID order. Users
+    created behind the position of the job while it runs are not changed.
+
+    Args:
+        context (JobContext): The running job. Its params hold the
+        `filters` and the `changes`.
+
+    Raises:
+        ObjectAlreadyExists: If the changes violate a unique constraint,
+        for example one email set on several users.
+    """
+    filters = crud_user.build_filters(**context.params["filters"])
+    changes = UserUpdate(**context.params["changes"])
+    chunk_size = app_settings.JOBS_CHUNK_SIZE
+    if context.total is None:
+        async with context.step() as db:
+            context.total = await crud_user.count(
+                db, filters=filters, cache_key=None
+            )
+    after_id = context.checkpoint.get("after_id", 0)
+    while True:
+        async with context.step() as db:
+            updated = await crud_user.update_next(
+                db, changes, filters, after_id, chunk_size
+            )
+            if updated:
+                after_id = updated[-1]
+            context.checkpoint = {"after_id": after_id}
+            context.processed += len(updated)
+            context.report = {"updated": context.processed}
+        await crud_user.evict(updated)
+        if len(updated) < chunk_size:
+            return
+
+
+def _skip(rows: Iterator[Dict[str, Any]], count: int) -> None:
+    """
+    Consume the rows a resumed import has already read.
+    """
+    deque(islice(rows, count), maxlen=0)
+
+
+handlers = {
+    "import_users": JobHandler(run=run_import, cleanup=remove_import_file),
+    "update_users": JobHandler(run=run_update),
+}
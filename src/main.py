@@ -1,16 +1,62 @@
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 import uvicorn
 from fastapi import FastAPI
 
+from api.metrics import instrument, profile
+from api.v1.endpoints.users import prepare_statements
 from api.v1.router import api_v1_router
+from changes import change_feed
 from configs import app_settings
+from databases import connect, disconnect
+from jobs import job_runner
+from utilities.compression import CompressionMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Connect to the database and prepare the hot queries when a worker
+    starts, then run background jobs and the change feed if enabled; stop
+    them and disconnect when it stops.
+    """
+    await connect(prepare=prepare_statements)
+    if app_settings.JOBS_ENABLED:
+        await job_runner.start()
+    if app_settings.CHANGES_ENABLED:
+        await change_feed.start()
+    yield
+    await change_feed.stop()
+    await job_runner.stop()
+    await disconnect()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(api_v1_router)
+if app_settings.COMPRESSION_ENABLED:
+    # innermost, so the response size metrics count the bytes sent
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=app_settings.COMPRESSION_MIN_SIZE,
+        gzip_level=app_settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=app_settings.COMPRESSION_BROTLI_QUALITY,
+    )
+if app_settings.PROFILER_ENABLED:
+    profile(app)
+if app_settings.METRICS_ENABLED:
+    instrument(app)
 
 if __name__ == "__main__":
+    workers = 1 if app_settings.APP_RELOAD else app_settings.APP_WORKERS
+    # workers import the settings again and split the connection budget
+    os.environ["APP_WORKERS"] = str(workers)
     uvicorn.run(
-        "__main__:app",
+        "main:app",
         host=app_settings.APP_HOST,
         port=app_settings.APP_PORT,
-        reload=True,
+        reload=app_settings.APP_RELOAD,
+        workers=workers,
+        timeout_graceful_shutdown=app_settings.APP_GRACEFUL_TIMEOUT,
     )
@@ -1,3 +1,9 @@
+from .job import Job
 from .user import User
+from .user_change import UserChange
 
-__all__ = ("User",)
+__all__ = (
+    "Job",
+    "User",
+    "UserChange",
+)
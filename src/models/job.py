@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Job(Base):
+    """
+    Represents the 'job' table in the database, used to store background
+    jobs, their progress and the worker running them.
+
+    Attributes:
+        - id (int): The primary key of the job.
+        - kind (str): What the job does, for example `import_users`.
+        - status (str): `queued`, `running`, `succeeded`, `failed` or
+        `cancelled`.
+        - params (dict): The input of the job.
+        - checkpoint (dict): Where a resumed job continues, written together
+        with the work it covers.
+        - report (dict): What the job has done so far, such as counts and
+        rejected rows.
+        - processed (int): Items processed so far.
+        - total (Optional[int]): Items to process, if known.
+        - error (Optional[str]): Why the job failed.
+        - cancel_requested (bool): Whether a client asked to stop the job.
+        - attempts (int): How many times the job was started.
+        - worker (Optional[str]): The worker holding the job while it runs.
+        - heartbeat_at (Optional[datetime]): When that worker last showed
+        it is alive.
+        - created_at (datetime): When the job was submitted.
+        - started_at (Optional[datetime]): When the job first started.
+        - finished_at (Optional[datetime]): When the job ended.
+    """
+
+    __tablename__ = "job"
+    __table_args__ = (
+        # jobs that still have to run are few, whatever the history
+        Index(
+            "ix_job_active",
+            "id",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(length=64))
+    status: Mapped[str] = mapped_column(
+        String(length=16), server_default=text("'queued'")
+    )
+    params: Mapped[Dict[str, Any]] = mapped_column(JSONB)
+    checkpoint: Mapped[Dict[str, Any]] = mapped_column(
+        JSONB, server_default=text("'{}'")
+    )
+    report: Mapped[Dict[str, Any]] = mapped_column(
+        JSONB, server_default=text("'{}'")
+    )
+    processed: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(
+        Boolean, server_default=text("false")
+    )
+    attempts: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    worker: Mapped[Optional[str]] = mapped_column(
+        String(length=255), nullable=True
+    )
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
@@ -1,8 +1,38 @@
-from sqlalchemy import Integer, String
+from datetime import datetime
+
+from sqlalchemy import (
+    Computed,
+    DateTime,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
 
+# Text search configuration of `User.search_vector`; queries must parse
+# their terms with the same one.
+SEARCH_CONFIG = "english"
+
+# Digest of the data fields of a user, `User.content_hash`. A NULL and an
+# empty string hash differently, and fields are separated by a character
+# that names, emails and phone numbers do not contain. Tables that hold
+# users to compare against must compute it with the same expression.
+CONTENT_HASH = (
+    "decode(md5("
+    "coalesce('+' || name, '-') || chr(31) || "
+    "coalesce('+' || email, '-') || chr(31) || "
+    "coalesce('+' || phone, '-') || chr(31) || "
+    "coalesce('+' || note, '-')"
+    "), 'hex')"
+)
+
 
 class User(Base):
     """
@@ -15,12 +45,67 @@ class User(Base):
         - email (str): User's email.
         - phone (str): User's phone number.
         - note (str): Note about user.
+        - version (int): Incremented by every update; the ETag of the user.
+        - updated_at (datetime): When the user was created or last updated.
+        - search_vector (str): The words of the name (weight A) and the note
+        (weight B), maintained by the database for full-text search and
+        never loaded by default.
+        - content_hash (bytes): The digest of the name, email, phone and
+        note, maintained by the database so that reconciliation finds the
+        users that changed without comparing every field; never loaded by
+        default.
     """
 
     __tablename__ = "user"
+    __table_args__ = (
+        Index("ix_user_name_id", "name", "id"),
+        Index("ux_user_email_lower", text("lower(email)"), unique=True),
+        Index("ix_user_phone", "phone"),
+        Index("ix_user_id_version", "id", "version"),
+        Index(
+            "ix_user_name_pattern",
+            "name",
+            postgresql_ops={"name": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_user_search_vector", "search_vector", postgresql_using="gin"
+        ),
+        # reconciliation compares digests with an index-only scan
+        Index(
+            "ix_user_id_content_hash",
+            "id",
+            postgresql_include=["content_hash"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(length=255))
     email: Mapped[str] = mapped_column(String(length=255))
     phone: Mapped[str] = mapped_column(String(length=255))
     note: Mapped[str] = mapped_column(String(length=255))
+    version: Mapped[int] = mapped_column(
+        Integer,
+        server_default=text("1"),
+        onupdate=literal_column("version") + 1,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')),"
+            " 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(note, '')),"
+            " 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+    content_hash: Mapped[bytes] = mapped_column(
+        LargeBinary,
+        Computed(CONTENT_HASH, persisted=True),
+        deferred=True,
+    )
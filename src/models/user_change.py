@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class UserChange(Base):
+    """
+    Represents the 'user_change' table in the database, the log of changes
+    to users read by the change feed.
+
+    Rows are written by statement-level triggers on the 'user' table, so
+    every write is logged, whichever way it was made. The triggers also
+    fill a `txid` column, the writing transaction, which is left out of the
+    model because only the sequencing query reads it.
+
+    Attributes:
+        - id (int): The primary key, in the order the changes were written.
+        - seq (Optional[int]): The position of the change in the feed, set
+        once every transaction that started before it has ended.
+        - op (str): `create`, `update` or `remove`.
+        - user_id (int): The ID of the changed user.
+        - version (int): The version of the user after the change, or
+        before it for a removal.
+        - changed_at (datetime): When the change was written.
+    """
+
+    __tablename__ = "user_change"
+    __table_args__ = (
+        # the changes still waiting for a sequence number are few
+        Index(
+            "ix_user_change_unsequenced",
+            "id",
+            postgresql_where=text("seq IS NULL"),
+        ),
+        # the log is appended in time order, so a BRIN index is enough to
+        # find old changes and costs next to nothing to maintain
+        Index(
+            "ix_user_change_changed_at",
+            "changed_at",
+            postgresql_using="brin",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    seq: Mapped[Optional[int]] = mapped_column(
+        BigInteger, unique=True, nullable=True
+    )
+    op: Mapped[str] = mapped_column(String(length=16))
+    user_id: Mapped[int] = mapped_column(Integer)
+    version: Mapped[int] = mapped_column(Integer)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
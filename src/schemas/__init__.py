@@ -1,7 +1,63 @@
-from .user import UserCreate, UserResponse, UserUpdate
+from .job import (
+    JobKind,
+    JobResponse,
+    JobStatus,
+    UserJobFilters,
+    UserUpdateJobCreate,
+)
+from .system import (
+    PoolStatsResponse,
+    ReadinessResponse,
+    ReplicaStatusResponse,
+    SlowQueryResponse,
+)
+from .user import (
+    BatchItemStatus,
+    UserBatchDelete,
+    UserBatchItemResult,
+    UserBatchResponse,
+    UserBatchUpdate,
+    UserCountMode,
+    UserCreate,
+    UserExportFormat,
+    UserImportError,
+    UserImportFormat,
+    UserImportResponse,
+    UserLookup,
+    UserLookupResponse,
+    UserOrderBy,
+    UserReconcileResponse,
+    UserResponse,
+    UserSearchResult,
+    UserUpdate,
+)
 
 __all__ = (
     "UserResponse",
+    "UserSearchResult",
     "UserCreate",
     "UserUpdate",
+    "UserOrderBy",
+    "UserCountMode",
+    "UserExportFormat",
+    "UserImportFormat",
+    "UserImportError",
+    "UserImportResponse",
+    "UserReconcileResponse",
+    "UserLookup",
+    "UserLookupResponse",
+    "UserBatchUpdate",
+    "UserBatchDelete",
+    "UserBatchItemResult",
+    "UserBatchResponse",
+    "BatchItemStatus",
+    "JobKind",
+    "JobStatus",
+    "JobResponse",
+    "UserJobFilters",
+    "UserUpdateJobCreate",
+    "PoolStatsResponse",
+    "ReadinessResponse",
+    "ReplicaStatusResponse",
+    "SlowQueryResponse",
 )
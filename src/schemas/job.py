@@ -0,0 +1,98 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+from .user import UserUpdate
+
+
+class JobStatus(str, Enum):
+    """
+    States of a background job. `succeeded`, `failed` and `cancelled` are
+    final.
+    """
+
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class JobKind(str, Enum):
+    """
+    Kinds of background jobs.
+    """
+
+    import_users = "import_users"
+    update_users = "update_users"
+
+
+class UserJobFilters(BaseModel):
+    """
+    Selects the users a mass update changes. Every given filter must hold;
+    with no filter at all, every user is changed.
+
+    Attributes:
+        - ids (Optional[List[int]]): IDs of the users.
+        - email (Optional[str]): Email, matched case-insensitively.
+        - phone (Optional[str]): Phone number, matched exactly.
+        - name_prefix (Optional[str]): Case-sensitive prefix of the name.
+    """
+
+    ids: Optional[List[int]] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    name_prefix: Optional[str] = None
+
+
+class UserUpdateJobCreate(BaseModel):
+    """
+    Model for submitting a mass update of users as a background job.
+
+    Attributes:
+        - kind (str): Always `update_users`.
+        - filters (UserJobFilters): Which users to change.
+        - changes (UserUpdate): The fields to set on every one of them.
+    """
+
+    kind: Literal[JobKind.update_users] = JobKind.update_users
+    filters: UserJobFilters
+    changes: UserUpdate
+
+
+class JobResponse(BaseModel):
+    """
+    Response model for a background job.
+
+    Attributes:
+        - id (int): The ID of the job; poll `/v1/jobs/{id}/` for progress.
+        - kind (JobKind): What the job does.
+        - status (JobStatus): Where the job is in its life cycle.
+        - processed (int): Items processed so far: rows read from the file
+        by imports, users changed by mass updates.
+        - total (Optional[int]): Items to process, if known up front.
+        - report (Dict[str, Any]): What the job has done so far. Imports
+        report like the synchronous import endpoint.
+        - error (Optional[str]): Why the job failed. Work checkpointed
+        before the failure is kept.
+        - cancel_requested (bool): Whether the job was asked to stop.
+        - attempts (int): How many times the job was started.
+        - created_at (datetime): When the job was submitted.
+        - started_at (Optional[datetime]): When the job first started.
+        - finished_at (Optional[datetime]): When the job ended.
+    """
+
+    id: int
+    kind: JobKind
+    status: JobStatus
+    processed: int
+    total: Optional[int]
+    report: Dict[str, Any]
+    error: Optional[str]
+    cancel_requested: bool
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class PoolStatsResponse(BaseModel):
+    """
+    Response model for the state of the database connection pool of the
+    worker that served the request.
+
+    Attributes:
+        - pool_size (int): Connections kept open by the pool.
+        - max_overflow (int): Extra connections allowed under load.
+        - checked_out (int): Connections currently in use.
+        - idle (int): Open connections waiting in the pool.
+        - overflow (int): Connections currently open beyond `pool_size`.
+        - checkouts (int): Connections handed out since startup.
+        - timeouts (int): Checkouts that timed out since startup.
+        - wait_seconds_total (float): Time spent waiting for connections.
+        - wait_seconds_max (float): The longest single wait.
+        - wait_seconds_avg (float): The average wait per checkout attempt.
+    """
+
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    wait_seconds_avg: float
+
+
+class ReplicaStatusResponse(BaseModel):
+    """
+    Response model for the state of one read replica, as seen by the worker
+    that served the request.
+
+    Attributes:
+        - url (str): The replica URL, without the password.
+        - healthy (bool): Whether the last check or query succeeded.
+        - pool (PoolStatsResponse): The replica's connection pool.
+    """
+
+    url: str
+    healthy: bool
+    pool: PoolStatsResponse
+
+
+class ReadinessResponse(BaseModel):
+    """
+    Response model for the readiness check of the worker that served the
+    request.
+
+    Attributes:
+        - ready (bool): Whether the worker has opened and warmed up its
+        database connections.
+    """
+
+    ready: bool
+
+
+class SlowQueryResponse(BaseModel):
+    """
+    Response model for a SQL statement that was slower than the profiler's
+    threshold in the worker that served the request.
+
+    Attributes:
+        - statement (str): The SQL, with placeholders for its parameters.
+        - seconds (float): How long it took.
+        - method (str): The method of the request it ran for, empty outside
+        of a request.
+        - route (str): The route template of the request it ran for, or
+        `background`.
+        - started_at (datetime): When it started.
+        - plan (Optional[Any]): Its `EXPLAIN` output in JSON format, if it
+        was sampled and has been explained.
+        - analyzed (bool): Whether the plan comes from running the statement
+        again, with actual times and buffers, or has estimates only.
+        - seq_scans (List[str]): Tables scanned sequentially in the plan.
+    """
+
+    statement: str
+    seconds: float
+    method: str
+    route: str
+    started_at: datetime
+    plan: Optional[Any] = None
+    analyzed: bool
+    seq_scans: List[str]
@@ -1,4 +1,6 @@
-from typing import Dict, Optional
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
 
 from email_validator import EmailNotValidError
 from fastapi.exceptions import RequestValidationError
@@ -46,11 +48,19 @@ class UserResponse(UserBase):
     to return user data from the API, such as when retrieving a user or
     listing users.
 
+    Attributes:
+        - id (int): The ID of the user.
+        - version (int): The version of the user, incremented by every
+        update. Its ETag is `"{id}-{version}"`.
+        - updated_at (datetime): When the user was last changed.
+
     Inherits:
         UserBase: The base user attributes (name, email, phone, note).
     """
 
     id: int
+    version: int
+    updated_at: datetime
 
 
 class UserCreate(UserBase):
@@ -110,3 +120,209 @@ class UserUpdate(UserBase):
                 "Please specify at least one field to change."
             )
         return update_data
+
+
+class UserOrderBy(str, Enum):
+    """
+    Sort keys accepted by the users list endpoint. Every key is backed by an
+    index, so keyset pages stay cheap however deep the client goes.
+    """
+
+    id = "id"
+    name = "name"
+
+
+class UserCountMode(str, Enum):
+    """
+    How the users list endpoint computes the total it reports.
+
+    `exact` counts matching rows and caches the result for a short time;
+    `estimate` reads the planner statistics of the table and never scans it.
+    """
+
+    exact = "exact"
+    estimate = "estimate"
+
+
+class UserExportFormat(str, Enum):
+    """
+    Formats supported by the users export endpoint.
+    """
+
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class UserImportFormat(str, Enum):
+    """
+    File formats accepted by the users import endpoint.
+    """
+
+    csv = "csv"
+    xlsx = "xlsx"
+
+
+class UserImportError(BaseModel):
+    """
+    A row rejected by a bulk import.
+
+    Attributes:
+        - row (int): Number of the data row in the file, starting at 1.
+        - error (str): Why the row was rejected.
+    """
+
+    row: int
+    error: str
+
+
+class UserImportResponse(BaseModel):
+    """
+    Response model for bulk imports.
+
+    Attributes:
+        - imported (int): Number of users written to the database.
+        - rejected (int): Number of rows that failed validation.
+        - errors (List[UserImportError]): Details of the first rejected rows.
+    """
+
+    imported: int
+    rejected: int
+    errors: List[UserImportError]
+
+
+class UserReconcileResponse(BaseModel):
+    """
+    Response model for reconciliations with a snapshot.
+
+    Attributes:
+        - inserted (int): Number of users created.
+        - updated (int): Number of users whose data changed.
+        - deleted (int): Number of users removed.
+        - unchanged (int): Number of users left as they were.
+        - rejected (int): Number of rows that failed validation.
+        - errors (List[UserImportError]): Details of the first rejected rows.
+        - dry_run (bool): Whether the changes were only counted.
+    """
+
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+    rejected: int
+    errors: List[UserImportError]
+    dry_run: bool
+
+
+class UserBatchUpdate(UserUpdate):
+    """
+    Model for one item of a batch update. It carries the ID of the user to
+    update next to the fields to change.
+
+    Inherits:
+        UserUpdate: The optional user attributes to update.
+    """
+
+    id: int
+
+
+class UserBatchDelete(BaseModel):
+    """
+    Model for a batch delete request.
+
+    Attributes:
+        - ids (List[int]): IDs of the users to delete.
+    """
+
+    ids: List[int]
+
+
+class UserSearchResult(UserResponse):
+    """
+    Response model for a user found by a full-text search.
+
+    Attributes:
+        - rank (float): Relevance of the user to the query; higher is
+        better.
+        - name_highlight (Optional[str]): The name with matches wrapped in
+        `<mark>` tags, if highlighting was requested. The text itself is not
+        HTML-escaped.
+        - note_highlight (Optional[str]): The note, highlighted likewise.
+    """
+
+    rank: float
+    name_highlight: Optional[str] = None
+    note_highlight: Optional[str] = None
+
+
+class UserLookup(BaseModel):
+    """
+    Model for a lookup of many users by ID.
+
+    Attributes:
+        - ids (List[int]): IDs of the users to fetch, in the order wanted.
+    """
+
+    ids: List[int]
+
+
+class UserLookupResponse(BaseModel):
+    """
+    Response model for a lookup of many users by ID.
+
+    Attributes:
+        - users (List[UserResponse]): The users found, in request order.
+        An ID given twice yields the user twice.
+        - missing (List[int]): Requested IDs that no user has, in request
+        order and without repeats.
+    """
+
+    users: List[UserResponse]
+    missing: List[int]
+
+
+class BatchItemStatus(str, Enum):
+    """
+    Outcome of a single item of a batch request.
+    """
+
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    failed = "failed"
+
+
+class UserBatchItemResult(BaseModel):
+    """
+    Result of a single item of a batch request.
+
+    Attributes:
+        - index (int): Position of the item in the request.
+        - status (BatchItemStatus): Outcome of the item.
+        - id (Optional[int]): ID of the affected user, if known.
+        - user (Optional[UserResponse]): The written user, for creates and
+        updates that succeeded.
+        - error (Optional[str]): Why the item failed, if it did.
+    """
+
+    index: int
+    status: BatchItemStatus
+    id: Optional[int] = None
+    user: Optional[UserResponse] = None
+    error: Optional[str] = None
+
+
+class UserBatchResponse(BaseModel):
+    """
+    Response model for batch requests. Items are reported one by one, so a
+    client only needs to retry the items that failed.
+
+    Attributes:
+        - succeeded (int): Number of items that succeeded.
+        - failed (int): Number of items that failed.
+        - results (List[UserBatchItemResult]): Per-item results, in request
+        order.
+    """
+
+    succeeded: int
+    failed: int
+    results: List[UserBatchItemResult]
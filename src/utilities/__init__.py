@@ -1,3 +1,21 @@
-from .exceptions import UserNotFound
+from .exceptions import (
+    BatchTooLarge,
+    ChangesExpired,
+    ImportFailed,
+    InvalidCursor,
+    JobNotFound,
+    NotReady,
+    PreconditionFailed,
+    UserNotFound,
+)
 
-__all__ = ("UserNotFound",)
+__all__ = (
+    "BatchTooLarge",
+    "ChangesExpired",
+    "ImportFailed",
+    "InvalidCursor",
+    "JobNotFound",
+    "NotReady",
+    "PreconditionFailed",
+    "UserNotFound",
+)
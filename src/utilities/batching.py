@@ -0,0 +1,152 @@
+import asyncio
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+"""
+Scheduling of batches of concurrent calls.
+
+A `Batcher` queues the items submitted by concurrent tasks, sends them as one
+batch once a window has passed or the batch is full, and settles the future
+of every item with its own outcome. Subclasses only decide how a batch is
+processed.
+"""
+
+T = TypeVar("T")
+B = TypeVar("B", bound="Batcher")
+
+
+class Batcher(Generic[T]):
+    """
+    Base class of the batchers, collecting items into batched calls.
+
+    A batch is sent when `window` seconds have passed since its first item
+    was queued, or as soon as it holds `max_batch_size` items. With a window
+    of 0 the batch holds the items queued before the event loop next gets to
+    run scheduled callbacks, which adds no delay.
+
+    Attributes:
+        window (float): How long items are collected, in seconds.
+        max_batch_size (int): The most items sent in one batch.
+    """
+
+    def __init__(self, window: float = 0.0, max_batch_size: int = 100) -> None:
+        """
+        Initialize the batcher.
+
+        Args:
+            window (float): How long items are collected, in seconds.
+            max_batch_size (int): The most items sent in one batch.
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queued: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _process(self, items: List[T]) -> List[Any]:
+        """
+        Process a batch.
+
+        Args:
+            items (List[T]): The items, in the order they were queued.
+
+        Raises:
+            Exception: Any error, which fails every item of the batch.
+
+        Returns:
+            List[Any]: One outcome per item, in order: its result, or the
+            exception that failed it alone.
+        """
+        raise NotImplementedError
+
+    def _submit(self, item: T) -> asyncio.Future:
+        """
+        Queue an item for the next batch.
+
+        Returns:
+            asyncio.Future: Settled with the outcome of the item. Await it
+            shielded, so a caller that gives up does not cancel it for the
+            others.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queued.append((item, future))
+        if len(self._queued) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            if self.window > 0:
+                self._timer = loop.call_later(self.window, self._dispatch)
+            else:
+                self._timer = loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queued = self._queued, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        try:
+            outcomes = await self._process([item for item, _ in batch])
+        except Exception as err:
+            for _, future in batch:
+                _settle(future, err)
+        else:
+            for (_, future), outcome in zip(batch, outcomes):
+                _settle(future, outcome)
+        finally:
+            for _, future in batch:
+                # only left pending if the batch itself was cancelled
+                if not future.done():
+                    future.cancel()
+
+
+def batcher_for(
+    batchers: Dict[Hashable, B], key: Hashable, create: Callable[[], B]
+) -> B:
+    """
+    Return the batcher registered under a key, creating it on first use.
+
+    Batchers are kept apart by what their batches must not mix, such as
+    the engine they run on, so one batch never spans two databases.
+
+    Args:
+        batchers (Dict[Hashable, B]): The registry.
+        key (Hashable): What the batcher is for.
+        create (Callable[[], B]): Builds the batcher.
+
+    Returns:
+        B: The batcher.
+    """
+    batcher = batchers.get(key)
+    if batcher is None:
+        batcher = batchers[key] = create()
+    return batcher
+
+
+def _settle(future: asyncio.Future, outcome: Any) -> None:
+    if future.done():
+        return
+    if isinstance(outcome, Exception):
+        future.set_exception(outcome)
+        # retrieved here, so it is not reported as unhandled when every
+        # caller has gone
+        future.exception()
+    else:
+        future.set_result(outcome)
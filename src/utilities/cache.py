@@ -0,0 +1,283 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+"""
+Read-through caching of database rows.
+
+`ModelCache` keeps rows as plain dicts keyed by (model name, ID) in a bounded
+per-worker LRU with a TTL (`LocalCache`), optionally backed by a cache that
+several workers share (`SharedCacheBackend`).
+"""
+
+# Keys of `AsyncSession.info` restricting how reads through a session use the
+# cache. A client that must see its own writes skips cached rows, and rows
+# read from a replica, which may lag behind the primary, are never stored.
+SKIP_CACHE_READS = "skip_cache_reads"
+SKIP_CACHE_WRITES = "skip_cache_writes"
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a cache.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that were not in the cache or had expired.
+        evictions (int): Entries dropped to stay within the size limit.
+        expirations (int): Entries dropped because their TTL had passed.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class LocalCache:
+    """
+    A bounded in-process LRU cache with a per-entry TTL.
+
+    Attributes:
+        max_size (int): The maximum number of entries.
+        ttl (float): How long an entry stays valid, in seconds.
+        stats (CacheStats): Hit, miss, eviction and expiration counters.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for a key, or None if absent or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entries if needed.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Drop a key if it is cached.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drop every entry.
+        """
+        self._entries.clear()
+
+
+class SharedCacheBackend(ABC):
+    """
+    Interface of a cache shared between workers, such as Redis.
+
+    Keys are strings and values are dicts of JSON-serializable values and
+    datetimes.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the value stored for a key, or None.
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        """
+        Store a value for `ttl` seconds.
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        Drop a key.
+        """
+
+
+class SQLiteSharedBackend(SharedCacheBackend):
+    """
+    A shared cache stored in a local SQLite file.
+
+    It is a stand-in for a networked cache: every worker process on the host
+    that opens the same file sees the same entries.
+
+    Attributes:
+        path (str): The path of the SQLite file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+        )
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        await asyncio.to_thread(
+            self._set, key, json.dumps(value, default=_encode), ttl
+        )
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "DELETE FROM cache WHERE key = ?", key
+        )
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) "
+            "VALUES (?, ?, ?)",
+            key,
+            value,
+            time.time() + ttl,
+        )
+
+    def _execute(self, sql: str, *params: Any) -> None:
+        with self._lock:
+            self._connection.execute(sql, params)
+
+
+class ModelCache:
+    """
+    A read-through cache of rows keyed by model and ID.
+
+    Lookups go to the local LRU first, then to the shared backend if there is
+    one. Writes update both tiers, so reads within a worker always see that
+    worker's writes; entries written by other workers are picked up once the
+    local entry expires.
+
+    Attributes:
+        local (LocalCache): The per-worker tier.
+        shared (Optional[SharedCacheBackend]): The tier shared by workers.
+    """
+
+    def __init__(
+        self,
+        local: LocalCache,
+        shared: Optional[SharedCacheBackend] = None,
+    ) -> None:
+        self.local = local
+        self.shared = shared
+
+    async def get(self, model: str, obj_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached row of an object, or None.
+        """
+        key = (model, obj_id)
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = await self.shared.get(f"{model}:{obj_id}")
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def set(
+        self, model: str, obj_id: int, value: Dict[str, Any]
+    ) -> None:
+        """
+        Store the row of an object.
+        """
+        self.local.set((model, obj_id), value)
+        if self.shared is not None:
+            await self.shared.set(f"{model}:{obj_id}", value, self.local.ttl)
+
+    async def delete(self, model: str, obj_id: int) -> None:
+        """
+        Drop the row of an object.
+        """
+        self.local.delete((model, obj_id))
+        if self.shared is not None:
+            await self.shared.delete(f"{model}:{obj_id}")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters of the local tier and its current size.
+        """
+        return {**asdict(self.local.stats), "size": len(self.local)}
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    if value.keys() == {"__datetime__"}:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+def build_model_cache(
+    enabled: bool, max_size: int, ttl: float, shared_path: str = ""
+) -> Optional[ModelCache]:
+    """
+    Build a `ModelCache` from settings.
+
+    Args:
+        enabled (bool): Whether caching is enabled at all.
+        max_size (int): The maximum number of entries per worker.
+        ttl (float): How long an entry stays valid, in seconds.
+        shared_path (str): The SQLite file of the shared tier, if any.
+
+    Returns:
+        Optional[ModelCache]: The cache, or None if caching is disabled.
+    """
+    if not enabled:
+        return None
+    shared = SQLiteSharedBackend(shared_path) if shared_path else None
+    return ModelCache(
+        local=LocalCache(max_size=max_size, ttl=ttl), shared=shared
+    )
@@ -0,0 +1,225 @@
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .etags import parse_etags, with_variant
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+"""
+Negotiated compression of response bodies.
+
+Bodies are compressed with brotli or gzip, whichever the client prefers
+among those available (brotli only when the `brotli` package is installed),
+if they are at least a minimum size and of a textual type. Streamed bodies
+are compressed chunk by chunk and flushed after every chunk, so an export
+still reaches the client as it is produced.
+"""
+
+Headers = List[Tuple[bytes, bytes]]
+
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"text/",
+)
+
+
+def available_codings() -> Tuple[str, ...]:
+    """
+    Return the content codings that can be produced, best first.
+    """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str, codings: Sequence[str]) -> Optional[str]:
+    """
+    Pick the content coding of a response from `Accept-Encoding`.
+
+    Args:
+        accept_encoding (str): The header value, for example
+        `gzip;q=0.8, br`.
+        codings (Sequence[str]): The codings available, in order of
+        preference when the client weighs them equally.
+
+    Returns:
+        Optional[str]: The coding with the highest weight above 0, or None
+        to send the body as it is.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in codings:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class _Compressor:
+    """
+    Incremental compressor of one response body.
+    """
+
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        if coding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._brotli = None
+            # wbits 16 + 15 writes the gzip header and trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            chunk = self._brotli.process(data)
+            return chunk + (
+                self._brotli.finish() if final else self._brotli.flush()
+            )
+        chunk = self._zlib.compress(data)
+        return chunk + self._zlib.flush(
+            zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        )
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies for clients that accept it.
+
+    A compressed response gets `Content-Encoding`, and its `ETag` gets the
+    coding as a variant, so it never shares a strong tag with the plain
+    body. Responses of a compressible type carry `Vary: Accept-Encoding`
+    whether they were compressed or not. Bodies that already have a
+    content coding are left alone.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.codings = available_codings()
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        coding = negotiate(
+            request_headers.get(b"accept-encoding", b"").decode("latin-1"),
+            self.codings,
+        )
+        if_none_match = request_headers.get(b"if-none-match")
+        start: Optional[dict] = None
+        compressor: Optional[_Compressor] = None
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # held back until the first body chunk tells the size
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers: Headers = list(start.get("headers", []))
+                compressible = _compressible(headers)
+                if compressible:
+                    _add_vary(headers)
+                if (
+                    coding is not None
+                    and compressible
+                    and start["status"] not in (204, 304)
+                    and (more_body or len(body) >= self.minimum_size)
+                ):
+                    compressor = _Compressor(
+                        coding, self.gzip_level, self.brotli_quality
+                    )
+                    headers = [
+                        (name, value)
+                        for name, value in headers
+                        if name != b"content-length"
+                    ]
+                    headers.append((b"content-encoding", coding.encode()))
+                    _set_etag_variant(headers, coding)
+                elif start["status"] == 304 and coding and if_none_match:
+                    _echo_etag_variant(headers, coding, if_none_match)
+                if compressor is not None:
+                    body = compressor.compress(body, final=not more_body)
+                    if not more_body:
+                        headers.append(
+                            (b"content-length", str(len(body)).encode())
+                        )
+                await send({**start, "headers": headers})
+                start = None
+            elif compressor is not None:
+                body = compressor.compress(body, final=not more_body)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+        if start is not None:
+            # a response without a body message, sent as it is
+            await send(start)
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: Headers) -> None:
+    for index, (name, value) in enumerate(headers):
+        if name == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[index] = (name, value + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+def _set_etag_variant(headers: Headers, coding: str) -> None:
+    for index, (name, value) in enumerate(headers):
+        if name == b"etag":
+            tag = with_variant(value.decode("latin-1"), coding)
+            headers[index] = (name, tag.encode("latin-1"))
+
+
+def _echo_etag_variant(
+    headers: Headers, coding: str, if_none_match: bytes
+) -> None:
+    """
+    Give a `304` the tag of the compressed body when that is the copy the
+    client has, so its cache keeps treating them as the same.
+    """
+    client_tags = parse_etags(if_none_match.decode("latin-1"))
+    for index, (name, value) in enumerate(headers):
+        if name == b"etag":
+            tag = with_variant(value.decode("latin-1"), coding)
+            if tag in client_tags or f"W/{tag}" in client_tags:
+                headers[index] = (name, tag.encode("latin-1"))
@@ -0,0 +1,147 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+"""
+Entity tags and HTTP dates for conditional requests.
+
+An object's tag is built from its ID and version, and a page's tag from the
+IDs and versions of its rows. Both change exactly when the representation
+does, so they are strong validators and can be checked without reading or
+encoding the representation itself.
+
+A representation other than the full one gets a variant appended to the tag
+after a `;`: `f=...` for a subset of the fields, and the bare name of the
+content coding for a compressed body, as in `"5-3;f=1a2b3c4d;gzip"`. The
+content coding does not change the content, so conditional requests ignore
+it.
+"""
+
+
+def object_etag(obj_id: int, version: int) -> str:
+    """
+    Build the strong ETag of one object.
+    """
+    return f'"{obj_id}-{version}"'
+
+
+def page_etag(versions: Iterable[Tuple[int, int]], has_more: bool) -> str:
+    """
+    Build the strong ETag of a page of objects.
+
+    Args:
+        versions (Iterable[Tuple[int, int]]): (ID, version) of every object
+        on the page, in page order.
+        has_more (bool): Whether another page follows.
+
+    Returns:
+        str: The quoted tag.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for obj_id, version in versions:
+        digest.update(f"{obj_id}-{version},".encode())
+    digest.update(b"+" if has_more else b".")
+    return f'"p-{digest.hexdigest()}"'
+
+
+def with_variant(etag: str, variant: str) -> str:
+    """
+    Append a variant to a quoted tag, keeping a weak `W/` prefix.
+    """
+    return f'{etag[:-1]};{variant}"'
+
+
+def fieldset_variant(fields: Sequence[str]) -> str:
+    """
+    Build the variant of a representation limited to some fields.
+
+    Args:
+        fields (Sequence[str]): The fields, in response order.
+
+    Returns:
+        str: `f=` and a short digest of the field names.
+    """
+    digest = hashlib.blake2b(",".join(fields).encode(), digest_size=4)
+    return f"f={digest.hexdigest()}"
+
+
+def without_coding(tag: str) -> str:
+    """
+    Remove the content coding variant from a tag, if it has one.
+    """
+    body, _, last = tag[:-1].rpartition(";")
+    if body and "=" not in last:
+        return f'{body}"'
+    return tag
+
+
+def parse_etags(header: str) -> List[str]:
+    """
+    Split an `If-Match`/`If-None-Match` header into its tags.
+
+    Args:
+        header (str): The header value.
+
+    Returns:
+        List[str]: The tags, quoted and with the weak `W/` prefix kept, or
+        `["*"]`.
+    """
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: Optional[str], etag: str) -> bool:
+    """
+    Evaluate `If-None-Match` against the current tag.
+
+    Tags are compared weakly, as RFC 9110 requires for this header, and
+    without their content coding, so a tag received with a compressed body
+    still matches.
+
+    Returns:
+        bool: False if the client's copy is current (answer 304), True if
+        the representation has to be sent.
+    """
+    if header is None:
+        return True
+    for tag in parse_etags(header):
+        if tag == "*" or without_coding(tag.removeprefix("W/")) == etag:
+            return False
+    return True
+
+
+def match_versions(header: str, obj_id: int) -> Optional[List[int]]:
+    """
+    Extract the versions of an object named by an `If-Match` header.
+
+    Tags are compared strongly, so weak tags and tags of other objects never
+    match. Variants are ignored: every representation of a version names
+    that version.
+
+    Args:
+        header (str): The header value.
+        obj_id (int): The ID of the object being changed.
+
+    Returns:
+        Optional[List[int]]: The acceptable versions, possibly empty, or
+        None if the header is `*` and any version will do.
+    """
+    versions: List[int] = []
+    prefix = f'"{obj_id}-'
+    for tag in parse_etags(header):
+        if tag == "*":
+            return None
+        if tag.startswith(prefix) and tag.endswith('"'):
+            value = tag[len(prefix) : -1].split(";")[0]  # noqa: E203
+            if value.isdigit():
+                versions.append(int(value))
+    return versions
+
+
+def http_date(value: datetime) -> str:
+    """
+    Format a datetime for `Last-Modified`.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
@@ -24,6 +24,28 @@ class ObjectNotFound(HTTPException):
         super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
 
 
+class ObjectAlreadyExists(HTTPException):
+    """
+    Custom exception for handling writes that conflict with existing data.
+    This exception is raised when the database rejects a write because of a
+    unique constraint, for example a second user with the same email.
+
+    Attributes:
+        - detail (str): A message describing the error (default: "{Object}
+        already exists").
+        - status_code (int): The HTTP status code associated with the error
+        (default: 409 Conflict).
+    """
+
+    def __init__(self, object_name: str = "Object", reason: str = None):
+        detail = (
+            f"{object_name} already exists: {reason}"
+            if reason
+            else f"{object_name} already exists"
+        )
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
 class UserNotFound(ObjectNotFound):
     """
     Custom exception for handling cases when a user is not found.
@@ -34,3 +56,139 @@ class UserNotFound(ObjectNotFound):
 
     def __init__(self, user_id: int = None):
         super().__init__(object_name="User", object_id=user_id)
+
+
+class JobNotFound(ObjectNotFound):
+    """
+    Custom exception for handling cases when a background job is not found.
+    This exception is raised when a requested job cannot be located in the
+    database. Inherits from ObjectNotFound and sets a specific message
+    for jobs.
+    """
+
+    def __init__(self, job_id: int = None):
+        super().__init__(object_name="Job", object_id=job_id)
+
+
+class InvalidCursor(HTTPException):
+    """
+    Custom exception for handling malformed or foreign pagination cursors.
+    This exception is raised when a client sends an `after` cursor that cannot
+    be decoded or that was issued for a different sort order.
+
+    Attributes:
+        - detail (str): A message describing the error (default: "Invalid
+        pagination cursor").
+        - status_code (int): The HTTP status code associated with the error
+        (default: 400 Bad Request).
+    """
+
+    def __init__(self, detail: str = "Invalid pagination cursor"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=detail
+        )
+
+
+class BatchTooLarge(HTTPException):
+    """
+    Custom exception for handling batch requests with too many items.
+    This exception is raised when a batch request carries more items than the
+    configured maximum.
+
+    Attributes:
+        - detail (str): A message describing the error.
+        - status_code (int): The HTTP status code associated with the error
+        (default: 413 Request Entity Too Large).
+    """
+
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {max_size} items",
+        )
+
+
+class ImportFailed(HTTPException):
+    """
+    Custom exception for handling bulk imports that cannot be completed.
+    This exception is raised when an import file cannot be read or the
+    database rejects the imported data as a whole, for example because of a
+    duplicate ID. Nothing is written in that case.
+
+    Attributes:
+        - detail (str): A message describing the error.
+        - status_code (int): The HTTP status code associated with the error
+        (default: 422 Unprocessable Entity).
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Import failed: {detail}",
+        )
+
+
+class PreconditionFailed(HTTPException):
+    """
+    Custom exception for handling conditional writes whose precondition does
+    not hold. This exception is raised when the `If-Match` header of an
+    update names a version other than the current one, which means the
+    object was changed since the client read it.
+
+    Attributes:
+        - detail (str): A message describing the error.
+        - status_code (int): The HTTP status code associated with the error
+        (default: 412 Precondition Failed).
+    """
+
+    def __init__(self, object_name: str, object_id: int):
+        super().__init__(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=(
+                f"{object_name} with ID {object_id} was modified, "
+                "fetch it again and retry"
+            ),
+        )
+
+
+class NotReady(HTTPException):
+    """
+    Custom exception for handling requests to a worker that cannot serve
+    traffic. This exception is raised by the readiness check while the
+    worker is still warming up its database connections or is shutting
+    down.
+
+    Attributes:
+        - detail (str): A message describing the error.
+        - status_code (int): The HTTP status code associated with the error
+        (default: 503 Service Unavailable).
+    """
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The service is starting or stopping",
+        )
+
+
+class ChangesExpired(HTTPException):
+    """
+    Custom exception for handling change streams that cannot be resumed.
+    This exception is raised when a client asks for the changes after a
+    number whose successors were already deleted, so the client has to
+    read the users again before following the changes.
+
+    Attributes:
+        - detail (str): A message describing the error.
+        - status_code (int): The HTTP status code associated with the error
+        (default: 410 Gone).
+    """
+
+    def __init__(self, after: int, oldest: int):
+        super().__init__(
+            status_code=status.HTTP_410_GONE,
+            detail=(
+                f"Changes after {after} are no longer kept, the oldest is "
+                f"{oldest}; read the users again and resume from there"
+            ),
+        )
@@ -0,0 +1,84 @@
+import csv
+import io
+from typing import Sequence
+
+from sqlalchemy.engine import Row
+
+from .serialization import dumps
+
+"""
+Row serializers used by the streaming export and change stream endpoints.
+
+Each function turns one chunk of rows into bytes that can be sent as-is, so
+a chunk is encoded once and never held together with the next one.
+"""
+
+
+def rows_to_ndjson(rows: Sequence[Row]) -> bytes:
+    """
+    Encode rows as newline-delimited JSON objects.
+
+    Args:
+        rows (Sequence[Row]): A chunk of rows.
+
+    Returns:
+        bytes: One JSON object per line.
+    """
+    return b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def rows_to_csv(rows: Sequence[Row], header: bool = False) -> bytes:
+    """
+    Encode rows as CSV.
+
+    Args:
+        rows (Sequence[Row]): A chunk of rows.
+        header (bool): Whether to start with a header line.
+
+    Returns:
+        bytes: The CSV lines of the chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header and rows:
+        writer.writerow(rows[0]._fields)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def changes_to_events(rows: Sequence[Row], fields: Sequence[str]) -> bytes:
+    """
+    Encode logged changes as server-sent events.
+
+    Every event is named after the operation and carries its number as the
+    event ID, which the client sends back in `Last-Event-ID` to resume.
+
+    Args:
+        rows (Sequence[Row]): Changes read by `CRUDUserChange.read_after`.
+        fields (Sequence[str]): The fields of the user read along.
+
+    Returns:
+        bytes: One event per change. Its data holds the change and, unless
+        it is a removal or the user was removed since, the user as it is
+        now, which may be newer than the change.
+    """
+    events = []
+    for row in rows:
+        user = None
+        if row.found and row.op != "remove":
+            user = {field: row._mapping[f"u_{field}"] for field in fields}
+        data = dumps(
+            {
+                "seq": row.seq,
+                "op": row.op,
+                "id": row.user_id,
+                "version": row.version,
+                "changed_at": row.changed_at,
+                "user": user,
+            }
+        )
+        events.append(
+            b"id: %d\nevent: %s\ndata: %s\n\n"
+            % (row.seq, row.op.encode(), data)
+        )
+    return b"".join(events)
@@ -0,0 +1,190 @@
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+from zipfile import BadZipFile
+
+from fastapi.exceptions import RequestValidationError
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from pydantic import BaseModel, ValidationError
+
+from utilities.exceptions import ImportFailed
+
+"""
+Streaming readers and validation for bulk user imports.
+
+Files are read row by row (CSV through the csv module, XLSX through openpyxl
+in read-only mode) and validated in fixed-size chunks, so memory use depends
+on the chunk size and not on the size of the file.
+"""
+
+
+@dataclass
+class ImportReport:
+    """
+    Summary of a bulk import.
+
+    Attributes:
+        imported (int): Number of rows written to the database.
+        rejected (int): Number of rows that failed validation.
+        errors (List[Tuple[int, str]]): Row number and reason of the first
+        `max_errors` rejected rows.
+        max_errors (int): How many rejected rows are reported in detail.
+    """
+
+    imported: int = 0
+    rejected: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    max_errors: int = 1000
+
+    def reject(self, row: int, error: str) -> None:
+        """
+        Count a rejected row and keep its reason if there is room.
+        """
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row, error))
+
+
+def read_rows(
+    file: BinaryIO, file_format: str
+) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    """
+    Open a CSV or XLSX file with a header row for lazy reading.
+
+    Args:
+        file (BinaryIO): The file to read. XLSX files must be seekable.
+        file_format (str): Either `csv` or `xlsx`.
+
+    Raises:
+        ImportFailed: If the file cannot be opened as the given format.
+
+    Returns:
+        Tuple[List[str], Iterator[Dict[str, Any]]]: The header, and an
+        iterator yielding one mapping of header to value per data row.
+    """
+    try:
+        if file_format == "xlsx":
+            workbook = load_workbook(file, read_only=True, data_only=True)
+            values = workbook.active.iter_rows(values_only=True)
+            first = next(values, ())
+            if len(first) == 1 and "," in str(first[0]):
+                # every row is a whole CSV line stored in a single cell
+                lines = (str(row[0]) for row in values if row[0] is not None)
+                reader = csv.DictReader(
+                    lines, fieldnames=next(csv.reader(first))
+                )
+                return list(reader.fieldnames), reader
+
+            header = [str(name).strip() for name in first]
+            rows = (
+                dict(zip(header, row))
+                for row in values
+                if any(value is not None for value in row)
+            )
+            return header, rows
+
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        reader = csv.DictReader(text)
+        return list(reader.fieldnames or []), reader
+
+    except (BadZipFile, InvalidFileException, KeyError) as err:
+        raise ImportFailed(f"not a valid {file_format} file") from err
+    except (csv.Error, UnicodeDecodeError) as err:
+        raise ImportFailed(str(err)) from err
+
+
+def validate_chunk(
+    rows: Iterator[Dict[str, Any]],
+    schema: Type[BaseModel],
+    columns: List[str],
+    report: ImportReport,
+    size: int,
+    start: int,
+    rejected_ids: Optional[List[Optional[int]]] = None,
+) -> Tuple[List[Tuple[Any, ...]], int, bool]:
+    """
+    Validate the next `size` rows and turn the valid ones into records.
+
+    Args:
+        rows (Iterator[Dict[str, Any]]): Rows produced by `read_rows`.
+        schema (Type[BaseModel]): The schema every row must satisfy.
+        columns (List[str]): The table columns of a record, in order. An
+        `id` column is taken from the file as is.
+        report (ImportReport): Collects rejected rows.
+        size (int): How many rows to consume.
+        start (int): Number of rows consumed so far, for error reporting.
+        rejected_ids (Optional[List[Optional[int]]]): If given, collects
+        the `id` of every rejected row, or None for a row without a valid
+        one.
+
+    Raises:
+        ImportFailed: If the file turns out to be malformed.
+
+    Returns:
+        Tuple[List[Tuple[Any, ...]], int, bool]: The records, the number of
+        rows consumed so far, and whether the file is exhausted.
+    """
+    records: List[Tuple[Any, ...]] = []
+    consumed = start
+    try:
+        for row in rows:
+            consumed += 1
+            try:
+                data = {
+                    name: _as_text(row.get(name))
+                    for name in schema.model_fields
+                }
+                obj = schema.model_validate(data).model_dump()
+                if "id" in columns:
+                    obj["id"] = int(row.get("id"))
+                records.append(tuple(obj[column] for column in columns))
+            except ValidationError as err:
+                report.reject(
+                    consumed,
+                    "; ".join(
+                        f"{'.'.join(map(str, detail['loc']))}: "
+                        f"{detail['msg']}"
+                        for detail in err.errors()
+                    ),
+                )
+                if rejected_ids is not None:
+                    rejected_ids.append(_as_id(row.get("id")))
+            except (RequestValidationError, TypeError, ValueError) as err:
+                report.reject(consumed, str(err))
+                if rejected_ids is not None:
+                    rejected_ids.append(_as_id(row.get("id")))
+            if consumed - start >= size:
+                return records, consumed, False
+    except (csv.Error, UnicodeDecodeError) as err:
+        raise ImportFailed(f"row {consumed + 1}: {err}") from err
+    return records, consumed, True
+
+
+def _as_text(value: Any) -> Any:
+    """
+    Turn spreadsheet cell values into text, keeping empty cells empty.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def _as_id(value: Any) -> Optional[int]:
+    """
+    Read the ID of a rejected row, if it has a valid one.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,117 @@
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .batching import Batcher
+
+"""
+Batching of concurrent lookups by key.
+
+A `BatchLoader` collects the keys requested by concurrent tasks for a short
+window, resolves them with one call, and hands every task its own result.
+A key that is already being loaded is not requested again; its waiters share
+the pending result.
+"""
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class LoaderStats:
+    """
+    Counters of a loader.
+
+    Attributes:
+        loads (int): Keys requested.
+        shared (int): Requests answered by a load already queued or running.
+        batches (int): Calls made to load keys.
+        keys (int): Keys loaded by those calls.
+    """
+
+    loads: int = 0
+    shared: int = 0
+    batches: int = 0
+    keys: int = 0
+
+
+class BatchLoader(Batcher[K], Generic[K, V]):
+    """
+    Coalesces concurrent lookups by key into batched calls.
+
+    Batches are sent as described in `Batcher`, and each holds distinct
+    keys.
+
+    Attributes:
+        window (float): How long keys are collected, in seconds.
+        max_batch_size (int): The most keys loaded by one call.
+        stats (LoaderStats): Load, sharing and batch counters.
+    """
+
+    def __init__(
+        self,
+        load_many: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        window: float = 0.0,
+        max_batch_size: int = 100,
+    ) -> None:
+        """
+        Initialize the loader.
+
+        Args:
+            load_many (Callable[[List[K]], Awaitable[Dict[K, V]]]): Loads
+            distinct keys and returns the values found; missing keys resolve
+            to None.
+            window (float): How long keys are collected, in seconds.
+            max_batch_size (int): The most keys loaded by one call.
+        """
+        super().__init__(window=window, max_batch_size=max_batch_size)
+        self.stats = LoaderStats()
+        self._load_many = load_many
+        # the loads queued or running, by key
+        self._pending: Dict[K, asyncio.Future] = {}
+
+    async def load(self, key: K) -> Optional[V]:
+        """
+        Load the value of a key as part of the next batch.
+
+        Args:
+            key (K): The key.
+
+        Raises:
+            Exception: Whatever the batch call raised, in every waiter.
+
+        Returns:
+            Optional[V]: The value, or None if it was not found.
+        """
+        self.stats.loads += 1
+        future = self._pending.get(key)
+        if future is not None:
+            self.stats.shared += 1
+        else:
+            future = self._pending[key] = self._submit(key)
+        # a waiter that gives up must not cancel the load for the others
+        return await asyncio.shield(future)
+
+    async def _process(self, keys: List[K]) -> List[Optional[V]]:
+        self.stats.batches += 1
+        self.stats.keys += len(keys)
+        values = await self._load_many(keys)
+        return [values.get(key) for key in keys]
+
+    async def _run(self, batch: List[Tuple[K, asyncio.Future]]) -> None:
+        try:
+            await super()._run(batch)
+        finally:
+            for key, future in batch:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
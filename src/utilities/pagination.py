@@ -0,0 +1,86 @@
+import base64
+import binascii
+import json
+from typing import Any, Sequence, Tuple
+
+from utilities.exceptions import InvalidCursor
+
+"""
+Opaque cursor helpers for keyset (seek) pagination.
+
+A cursor holds the sort key name and the values of the last row of a page.
+It is encoded as URL-safe base64 JSON so clients treat it as an opaque token.
+"""
+
+# the range of a PostgreSQL `integer`, the type of the integer sort columns
+_MIN_INT = -(2**31)
+_MAX_INT = 2**31 - 1
+
+
+def encode_cursor(order_by: str, values: Tuple[Any, ...]) -> str:
+    """
+    Encode the position after a row into an opaque cursor.
+
+    Args:
+        order_by (str): The sort key the page was ordered by.
+        values (Tuple[Any, ...]): The sort values of the last row on the page.
+
+    Returns:
+        str: The URL-safe cursor token.
+    """
+    payload = json.dumps([order_by, *values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, order_by: str, types: Sequence[type]
+) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    The values are checked against the types of the sort columns, so a
+    tampered cursor is rejected before it reaches the database.
+
+    Args:
+        cursor (str): The cursor token sent by the client.
+        order_by (str): The sort key of the current request.
+        types (Sequence[type]): The Python types of the sort columns, in
+        order.
+
+    Raises:
+        InvalidCursor: If the token is malformed, was issued for a
+        different sort key, or holds values that do not fit the sort
+        columns.
+
+    Returns:
+        Tuple[Any, ...]: The sort values to seek after.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise InvalidCursor() from err
+
+    if not isinstance(payload, list) or len(payload) < 2:
+        raise InvalidCursor()
+    if payload[0] != order_by:
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    values = tuple(payload[1:])
+    if len(values) != len(types) or not all(
+        _fits(value, type_) for value, type_ in zip(values, types)
+    ):
+        raise InvalidCursor()
+    return values
+
+
+def _fits(value: Any, type_: type) -> bool:
+    """
+    Tell whether a decoded value can be compared with a column of a type.
+    """
+    if type_ is int:
+        # bool is an int to Python, not to PostgreSQL
+        return type(value) is int and _MIN_INT <= value <= _MAX_INT
+    if type_ is str:
+        # PostgreSQL text cannot hold NUL characters
+        return isinstance(value, str) and "\x00" not in value
+    return False
@@ -0,0 +1,83 @@
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+"""
+Fast JSON output for data read from our own database.
+
+Rows that come from the database were validated when they were written, so
+responses built from them skip the response model: rows are turned into
+dicts directly and encoded with orjson when it is installed, falling back to
+the standard library encoder otherwise.
+"""
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON.
+
+    Args:
+        content (Any): Dicts, lists, strings, numbers, booleans, None,
+        dates and datetimes. UTC datetimes end with `Z`, like in responses
+        encoded by pydantic.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode()
+
+
+def rows_to_dicts(
+    rows: Sequence[Row], fields: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Convert rows to dicts keyed by column name, in select order, or with
+    only the given columns, in that order.
+    """
+    if fields is None:
+        return [row._asdict() for row in rows]
+    return [{field: row._mapping[field] for field in fields} for row in rows]
+
+
+def object_to_dict(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Read the given attributes of an object into a dict, in order.
+    """
+    return {field: getattr(obj, field) for field in fields}
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    A JSON response encoded with `dumps`.
+
+    Return it from an endpoint to bypass response model validation; the
+    content must already have the shape of the response model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
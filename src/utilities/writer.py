@@ -0,0 +1,96 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, List, TypeVar, Union
+
+from .batching import Batcher
+
+"""
+Group commit of concurrent writes.
+
+A `BatchWriter` collects the items submitted by concurrent tasks for a short
+window, writes them with one call, typically one statement and one commit,
+and hands every task its own outcome: its written row, or the error that
+rejected its item alone.
+"""
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class WriterStats:
+    """
+    Counters of a writer.
+
+    Attributes:
+        writes (int): Items submitted.
+        batches (int): Calls made to write items.
+        failed (int): Items rejected on their own.
+    """
+
+    writes: int = 0
+    batches: int = 0
+    failed: int = 0
+
+
+class BatchWriter(Batcher[T], Generic[T, R]):
+    """
+    Coalesces concurrent writes into batched calls.
+
+    Batches are sent as described in `Batcher`. The window is the most
+    latency a write takes on while it waits for others.
+
+    Attributes:
+        window (float): How long items are collected, in seconds.
+        max_batch_size (int): The most items written by one call.
+        stats (WriterStats): Write, batch and failure counters.
+    """
+
+    def __init__(
+        self,
+        write_many: Callable[[List[T]], Awaitable[List[Union[R, Exception]]]],
+        window: float = 0.0,
+        max_batch_size: int = 100,
+    ) -> None:
+        """
+        Initialize the writer.
+
+        Args:
+            write_many (Callable[[List[T]], Awaitable[List[Union[R,
+            Exception]]]]): Writes items and returns one outcome per item,
+            in order: the result of the item, or the exception that
+            rejected it. An exception raised by the call itself fails the
+            whole batch.
+            window (float): How long items are collected, in seconds.
+            max_batch_size (int): The most items written by one call.
+        """
+        super().__init__(window=window, max_batch_size=max_batch_size)
+        self.stats = WriterStats()
+        self._write_many = write_many
+
+    async def write(self, item: T) -> R:
+        """
+        Write an item as part of the next batch.
+
+        Args:
+            item (T): The item.
+
+        Raises:
+            Exception: The error that rejected the item, or whatever the
+            batch call raised, in every writer of the batch.
+
+        Returns:
+            R: The result of the item.
+        """
+        self.stats.writes += 1
+        # a writer that gives up must not cancel the batch for the others;
+        # its item is written all the same
+        return await asyncio.shield(self._submit(item))
+
+    async def _process(self, items: List[T]) -> List[Union[R, Exception]]:
+        self.stats.batches += 1
+        outcomes = await self._write_many(items)
+        self.stats.failed += sum(
+            isinstance(outcome, Exception) for outcome in outcomes
+        )
+        return outcomes